@@ -0,0 +1,93 @@
+"""
+Audit event cost on the calling thread, and sink throughput per fsync policy.
+
+- log_json_in_json: previous path (model_dump_json() as the message, JsonFormatter wraps it)
+- log_structured:   model fields on the record, one json.dumps in JsonFormatter
+- sink_enqueue:     AuditSink.enqueue (serialization happens on the writer thread)
+- sink_<fsync>:     end-to-end events/sec to disk (enqueue + flush) per fsync policy
+
+Usage:
+    uv run python -m benchmarks.bench_audit_sink [--n 20000]
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks._common import print_table
+from src.core.audit_models import ToolAttemptEvent
+from src.core.audit_sink import AuditSink
+from src.middleware.logging import JsonFormatter
+
+
+def _event(i: int) -> ToolAttemptEvent:
+    return ToolAttemptEvent(
+        timestamp_ms=int(time.time() * 1000),
+        trace_id=f"T-{i}",
+        tool_name="read_file",
+        decision="allow",
+        reason="allowlisted",
+        outcome="ok",
+        params_redacted={"path": "data/sample.txt"},
+        result_summary="bytes=8 cache=hit",
+    )
+
+
+def _logger() -> logging.Logger:
+    lg = logging.getLogger("bench.audit")
+    lg.handlers = []
+    lg.propagate = False
+    h = logging.StreamHandler(io.StringIO())
+    h.setFormatter(JsonFormatter())
+    lg.addHandler(h)
+    lg.setLevel(logging.INFO)
+    return lg
+
+
+def main(n: int) -> None:
+    events = [_event(i) for i in range(n)]
+    lg = _logger()
+    rows: list[dict[str, object]] = []
+
+    t0 = time.perf_counter()
+    for e in events:
+        lg.info(e.model_dump_json(), extra={"trace_id": e.trace_id})
+    rows.append({"path": "log_json_in_json", "us_per_event": (time.perf_counter() - t0) / n * 1e6, "events_per_s": 0.0})
+
+    t0 = time.perf_counter()
+    for e in events:
+        lg.info("tool_attempt", extra={"trace_id": e.trace_id, "fields": e.model_dump(exclude={"event", "trace_id"})})
+    rows.append({"path": "log_structured", "us_per_event": (time.perf_counter() - t0) / n * 1e6, "events_per_s": 0.0})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = AuditSink(str(Path(tmp) / "enqueue.ndjson"), queue_size=n + 1, fsync="never")
+        t0 = time.perf_counter()
+        for e in events:
+            sink.enqueue(e)
+        rows.append({"path": "sink_enqueue", "us_per_event": (time.perf_counter() - t0) / n * 1e6, "events_per_s": 0.0})
+        sink.close()
+
+        for policy in ("never", "interval", "batch"):
+            sink = AuditSink(str(Path(tmp) / f"{policy}.ndjson"), queue_size=n + 1, fsync=policy)  # type: ignore[arg-type]
+            t0 = time.perf_counter()
+            for e in events:
+                sink.enqueue(e)
+            sink.flush(timeout=60)
+            elapsed = time.perf_counter() - t0
+            s = sink.stats()
+            rows.append({"path": f"sink_{policy}", "us_per_event": elapsed / n * 1e6, "events_per_s": n / elapsed})
+            print(f"sink_{policy}: batches={s.batches} fsyncs={s.fsyncs}")
+            sink.close()
+
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.n)
@@ -0,0 +1,108 @@
+"""
+GET /audit query latency as the SQLite audit store grows.
+
+The table is filled in steps (bulk inserts, same schema / indexes as AuditStore);
+after each step, first-page and deep-cursor page latency is measured per filter:
+
+- trace:         trace_id=<random trace> (~10 events each)
+- tool_outcome:  tool_name + outcome=error (rare)
+- tool_window:   tool_name + a 1 s time range
+- time_cursor:   no filter, page from a cursor in the middle of the table
+
+Also reports the writer's sustained insert rate (events/s through the batch queue).
+
+Usage:
+    uv run python -m benchmarks.bench_audit_store [--steps 100000,1000000,10000000] [--queries 200]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from benchmarks._common import percentile, print_table
+from src.core.audit_models import ToolAttemptEvent
+from src.core.audit_store import AuditStore, encode_cursor
+
+TOOLS = ["read_file", "list_files", "stat_files", "search_data"]
+
+
+def _event(ts: int, trace: str, tool: str, outcome: str) -> ToolAttemptEvent:
+    return ToolAttemptEvent(
+        timestamp_ms=ts,
+        trace_id=trace,
+        tool_name=tool,
+        decision="allow",
+        reason="allowlisted",
+        outcome=outcome,  # type: ignore[arg-type]
+        params_redacted={"path": "data/sample.txt"},
+        result_summary="bytes=8",
+    )
+
+
+def _fill(store: AuditStore, start: int, stop: int, rng: random.Random) -> None:
+    # one event per ms, ~10 events per trace, errors ~0.1%
+    template = _event(0, "T", "read_file", "ok").model_dump_json()
+    rows = []
+    for i in range(start, stop):
+        tool = TOOLS[i % len(TOOLS)]
+        outcome = "error" if rng.random() < 0.001 else "ok"
+        rows.append((i, f"T-{i // 10}", tool, "allow", outcome, None, template))
+        if len(rows) == 100_000:
+            store._insert_rows(rows)
+            rows = []
+    if rows:
+        store._insert_rows(rows)
+
+
+def _latencies_ms(fn: Callable[[], object], n: int) -> list[float]:
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return sorted(out)
+
+
+def main(steps: list[int], queries: int) -> None:
+    rng = random.Random(0)
+    rows: list[dict[str, object]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        store = AuditStore(str(Path(tmp) / "audit.db"))
+
+        events = [_event(i, f"W-{i // 10}", "read_file", "ok") for i in range(50_000)]
+        t0 = time.perf_counter()
+        for e in events:
+            while not store.enqueue(e):
+                time.sleep(0.001)
+        store.flush(timeout=60)
+        print(f"writer: {len(events) / (time.perf_counter() - t0):,.0f} events/s through the queue")
+
+        size = 0
+        for target in steps:
+            _fill(store, size, target, rng)
+            size = target
+            cases: dict[str, Callable[[], object]] = {
+                "trace": lambda: store.query(trace_id=f"T-{rng.randrange(size // 10)}"),
+                "tool_outcome": lambda: store.query(tool_name=rng.choice(TOOLS), outcome="error"),
+                "tool_window": lambda: store.query(
+                    tool_name=rng.choice(TOOLS), since_ms=(s := rng.randrange(size)), until_ms=s + 1000
+                ),
+                "time_cursor": lambda: store.query(cursor=encode_cursor((m := rng.randrange(size)), m)),
+            }
+            for name, fn in cases.items():
+                lat = _latencies_ms(fn, queries)
+                rows.append({"rows": size, "query": name, "p50_ms": percentile(lat, 50), "p99_ms": percentile(lat, 99)})
+        store.close()
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", default="100000,1000000,10000000")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    main([int(s) for s in args.steps.split(",")], args.queries)
@@ -0,0 +1,121 @@
+"""
+Cost of checkpointing a run, and what resuming saves.
+
+- per-run latency of max_steps loops without a checkpointer, with the memory
+  checkpointer and with the SQLite one (batched writer), many distinct threads
+- checkpoint storage after all runs: rows / file size stay at `keep` per thread
+- rerun-from-scratch vs resume when the run fails at the last plan
+
+Usage:
+    uv run python -m benchmarks.bench_checkpoint [--runs 500] [--max-steps 20] [--keep 2]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from langgraph.types import Command
+
+from benchmarks._common import percentile, print_table
+from src.graphs.basic_agent import nodes
+from src.graphs.basic_agent.checkpoint import MemoryCheckpointer, SqliteCheckpointer
+from src.graphs.basic_agent.graph import build_graph
+from src.graphs.basic_agent.state import GraphState
+
+
+def _run_all(graph: Any, runs: int, max_steps: int, threaded: bool) -> list[float]:
+    out = []
+    for i in range(runs):
+        config: dict[str, Any] = {"recursion_limit": 2 * max_steps + 2}
+        if threaded:
+            config["configurable"] = {"thread_id": f"bench-{i}"}
+        t0 = time.perf_counter()
+        graph.invoke(GraphState(trace_id=f"T-{i}", input="x", max_steps=max_steps), config)
+        out.append((time.perf_counter() - t0) * 1000)
+    return sorted(out)
+
+
+def _resume_cost(max_steps: int, keep: int) -> tuple[float, float]:
+    """ms to rerun a run that failed at its last plan from scratch vs resuming it."""
+    real = nodes._plan
+
+    def failing_plan(state: Any) -> dict[str, Any]:
+        if state.step == max_steps - 1:
+            raise RuntimeError("forced")
+        return real(state)
+
+    nodes._plan = failing_plan
+    try:
+        saver = MemoryCheckpointer(keep=keep)
+        graph = build_graph(checkpointer=saver)
+        config = {"configurable": {"thread_id": "resume"}, "recursion_limit": 2 * max_steps + 2}
+        try:
+            graph.invoke(GraphState(trace_id="T", input="f", max_steps=max_steps), config)
+        except RuntimeError:
+            pass
+    finally:
+        nodes._plan = real
+    plain = build_graph()
+    t0 = time.perf_counter()
+    plain.invoke(GraphState(trace_id="T", input="f", max_steps=max_steps), {"recursion_limit": 2 * max_steps + 2})
+    scratch = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    graph.invoke(Command(update={"trace_id": "T-2"}), config)
+    return scratch, (time.perf_counter() - t0) * 1000
+
+
+def main(runs: int, max_steps: int, keep: int) -> None:
+    logging.disable(logging.CRITICAL)  # node_start/node_end logs would dominate
+    rows: list[dict[str, object]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "checkpoints.db")
+        backends: list[tuple[str, Any]] = [
+            ("none", None),
+            ("memory", MemoryCheckpointer(keep=keep)),
+            ("sqlite", SqliteCheckpointer(path, keep=keep)),
+        ]
+        for name, saver in backends:
+            lat = _run_all(build_graph(checkpointer=saver), runs, max_steps, threaded=saver is not None)
+            row: dict[str, object] = {
+                "backend": name,
+                "p50_ms": percentile(lat, 50),
+                "p99_ms": percentile(lat, 99),
+                "stored": "-",
+                "compacted": "-",
+            }
+            if saver is not None:
+                saver.flush(timeout=60)
+                s = saver.stats()
+                row["compacted"] = s.compacted
+                row["stored"] = s.checkpoints
+                if name == "sqlite":
+                    db = sqlite3.connect(path)
+                    row["stored"] = db.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+                    db.close()
+                    row["batches"] = s.batches
+                    wal = path + "-wal"
+                    row["db_kb"] = (os.path.getsize(path) + (os.path.getsize(wal) if os.path.exists(wal) else 0)) // 1024
+                    saver.close()
+            rows.append(row)
+    for row in rows:
+        row.setdefault("batches", "-")
+        row.setdefault("db_kb", "-")
+    print_table(rows)
+
+    scratch, resumed = _resume_cost(max_steps, keep)
+    print(f"\nfailed at plan #{max_steps}: rerun from scratch {scratch:.2f} ms, resume {resumed:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--max-steps", type=int, default=20)
+    parser.add_argument("--keep", type=int, default=2)
+    args = parser.parse_args()
+    main(args.runs, args.max_steps, args.keep)
@@ -0,0 +1,89 @@
+"""
+Cold start of the API process, measured in fresh interpreters (no warm imports).
+
+Per run, in a new `python` process:
+- import_ms:  `import src.app.main` (what uvicorn does before it can accept connections)
+- healthz_ms: import + startup (lifespan) + first /healthz answered
+- ready_ms:   until the background warmup has compiled every registered graph
+- first_run_ms: the first POST /run after that
+- process_ms: wall time of the whole child, interpreter startup included
+
+Exits non-zero when the median import_ms or ready_ms is over its budget, so it can
+gate CI against cold-start regressions.
+
+Usage:
+    uv run python -m benchmarks.bench_cold_start [--runs 7] [--budget-import-ms 400] [--budget-ready-ms 1000]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks._common import percentile, print_table
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+_CHILD = """
+import json, logging, time
+t0 = time.perf_counter()
+import src.app.main as main
+t_import = time.perf_counter()
+logging.disable(logging.CRITICAL)
+from fastapi.testclient import TestClient
+from src.graphs import registry
+t1 = time.perf_counter()
+with TestClient(main.app) as client:
+    client.get("/healthz")
+    t_healthz = time.perf_counter() - t1 + (t_import - t0)
+    registry._WARMUP.join()
+    t_ready = time.perf_counter() - t1 + (t_import - t0)
+    t2 = time.perf_counter()
+    assert client.post("/run", json={"input": "x"}).json()["status"] == "done"
+    t_run = time.perf_counter() - t2
+print(json.dumps({"import_ms": (t_import - t0) * 1000, "healthz_ms": t_healthz * 1000,
+                  "ready_ms": t_ready * 1000, "first_run_ms": t_run * 1000}))
+"""
+
+
+def _one() -> dict[str, float]:
+    env = {**os.environ, "GRAPH_WARMUP": "background"}
+    t0 = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - t0) * 1000
+    return result
+
+
+def main(runs: int, budget_import_ms: float, budget_ready_ms: float) -> int:
+    _one()  # populate __pycache__ so every measured run sees the same bytecode state
+    results = [_one() for _ in range(runs)]
+    rows: list[dict[str, object]] = []
+    medians: dict[str, float] = {}
+    for metric in ("import_ms", "healthz_ms", "ready_ms", "first_run_ms", "process_ms"):
+        values = sorted(r[metric] for r in results)
+        medians[metric] = percentile(values, 50)
+        rows.append({"metric": metric, "min": values[0], "p50": medians[metric], "max": values[-1]})
+    print_table(rows)
+
+    failed = False
+    for metric, budget in (("import_ms", budget_import_ms), ("ready_ms", budget_ready_ms)):
+        ok = medians[metric] <= budget
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {metric} p50 {medians[metric]:.0f} ms (budget {budget:.0f} ms)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-import-ms", type=float, default=400)
+    parser.add_argument("--budget-ready-ms", type=float, default=1000)
+    args = parser.parse_args()
+    sys.exit(main(args.runs, args.budget_import_ms, args.budget_ready_ms))
@@ -0,0 +1,97 @@
+"""
+DataIndex build / refresh / listing latency over a generated tree.
+
+- build:        first full scandir walk
+- refresh_idle: incremental refresh with nothing changed (one stat per dir)
+- refresh_1:    incremental refresh after adding one file
+- list_*:       one page (limit 100) from the snapshot, p50 / p99 over --queries calls
+- walk:         os.walk + fnmatch over the same tree, for reference
+
+Usage:
+    uv run python -m benchmarks.bench_data_index [--files 100000] [--per-dir 1000] [--queries 2000]
+"""
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from benchmarks._common import percentile, print_table
+from src.tools.data_index import DataIndex
+
+
+def _make_tree(root: Path, files: int, per_dir: int) -> None:
+    for i in range(files):
+        d = root / f"d{i // per_dir:04d}"
+        if i % per_dir == 0:
+            d.mkdir(parents=True)
+        (d / f"f{i:07d}.{'txt' if i % 4 else 'log'}").write_bytes(b"x")
+
+
+def _timed_ms(fn: Callable[[], object]) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) * 1000
+
+
+def _latencies_ms(fn: Callable[[int], object], n: int) -> list[float]:
+    out = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn(i)
+        out.append((time.perf_counter() - t0) * 1000)
+    return sorted(out)
+
+
+def main(files: int, per_dir: int, queries: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "data"
+        _make_tree(root, files, per_dir)
+        dirs = max(1, files // per_dir)
+        idx = DataIndex(root, full_rescan_s=3600)
+
+        rows: list[dict[str, object]] = [
+            {"op": "build", "p50_ms": _timed_ms(idx.refresh), "p99_ms": 0.0},
+            {"op": "refresh_idle", "p50_ms": _timed_ms(idx.refresh), "p99_ms": 0.0},
+        ]
+        (root / "d0000" / "new.txt").write_bytes(b"y")
+        rows.append({"op": "refresh_1", "p50_ms": _timed_ms(idx.refresh), "p99_ms": 0.0})
+
+        rng = random.Random(0)
+        snap = idx.snapshot()
+        cursors = [rng.choice(snap.paths) for _ in range(queries)]
+        cases: dict[str, Callable[[int], object]] = {
+            "list_first_page": lambda i: idx.list("data", limit=100),
+            "list_cursor": lambda i: idx.list("data", cursor=cursors[i], limit=100),
+            "list_glob_dir": lambda i: idx.list("data", glob=f"data/d{i % dirs:04d}/*.log", limit=100),
+            "list_glob_any": lambda i: idx.list("data", glob="*.log", cursor=cursors[i], limit=100),
+            "list_dir_flat": lambda i: idx.list(f"data/d{i % dirs:04d}", recursive=False, limit=100),
+        }
+        for op, fn in cases.items():
+            lat = _latencies_ms(fn, queries)
+            rows.append({"op": op, "p50_ms": percentile(lat, 50), "p99_ms": percentile(lat, 99)})
+
+        def walk() -> None:
+            hits = []
+            for dirpath, _, names in os.walk(root):
+                hits += [n for n in names if fnmatch.fnmatch(n, "*.log")]
+                if len(hits) >= 100:
+                    return
+
+        rows.append({"op": "walk", "p50_ms": _timed_ms(walk), "p99_ms": 0.0})
+        print(f"files={files} dirs={dirs}")
+        print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--per-dir", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.files, args.per_dir, args.queries)
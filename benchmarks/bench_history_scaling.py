@@ -0,0 +1,59 @@
+"""
+Graph run cost vs max_steps (3 .. 10,000).
+
+With the append-only History reducer each step should cost the same, so
+us/step and peak-KiB/step stay flat as max_steps grows (linear total).
+
+Usage:
+    uv run python -m benchmarks.bench_history_scaling [--steps 3,10,100,1000,10000]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+import tracemalloc
+
+from benchmarks._common import print_table
+from src.graphs.basic_agent.run import run_graph
+
+
+def _measure(max_steps: int) -> dict[str, object]:
+    t0 = time.perf_counter()
+    final = run_graph(input="bench", trace_id="BENCH", max_steps=max_steps)
+    wall = time.perf_counter() - t0
+    assert len(final.history) == 2 * max_steps + 1
+
+    tracemalloc.start()
+    run_graph(input="bench", trace_id="BENCH", max_steps=max_steps)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "max_steps": max_steps,
+        "wall_ms": wall * 1000,
+        "us_per_step": wall / max_steps * 1e6,
+        "peak_kib": peak / 1024,
+        "peak_kib_per_step": peak / 1024 / max_steps,
+    }
+
+
+def main(steps: list[int]) -> None:
+    run_graph(input="warmup", trace_id="BENCH", max_steps=3)
+    rows = [_measure(n) for n in steps]
+    print_table(rows)
+
+    # Quadratic work would make us/step grow ~linearly with max_steps.
+    mid = [r for r in rows if r["max_steps"] >= 100]
+    if len(mid) >= 2:
+        growth = mid[-1]["us_per_step"] / mid[0]["us_per_step"]
+        print(f"\nus/step growth {mid[0]['max_steps']} -> {mid[-1]['max_steps']} steps: x{growth:.2f} (1.0 = linear)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", default="3,10,100,1000,10000")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)  # node logs would dominate at 10k steps
+    main([int(x) for x in args.steps.split(",")])
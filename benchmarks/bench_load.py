@@ -0,0 +1,317 @@
+"""
+Load/latency suite for the API: throughput, p50/p95/p99, peak RSS and allocations per
+endpoint and concurrency, written to JSON and gated against a committed baseline.
+
+Endpoints: POST /run, POST /mcp/tools/read_file (data/sample.txt), GET /healthz.
+
+Per (endpoint, concurrency): `--requests` requests from `concurrency` client tasks, then
+(in-process only) a shorter pass under tracemalloc for the allocation peak, so tracing
+never inflates the latency numbers.
+- in-process (default): the ASGI app through httpx.ASGITransport, lifespan run once with
+  graphs compiled up front; app logs are formatted as usual but written to /dev/null
+- live: `--url http://127.0.0.1:8000` against a running server (uvicorn or src.app.serve);
+  memory is read from `--server-pid` if given (/proc); read_file needs the server started
+  with MCP_ALLOWED_TOOLS=read_file (in-process sets it)
+peak_rss_mb is the process high-water mark during the endpoint's pass (VmHWM, reset per
+pass where /proc/<pid>/clear_refs allows; otherwise the lifetime peak).
+
+Regression gate: `--baseline FILE` exits 1 when, for any endpoint/concurrency, a request
+errors, req/s drops by more than `--max-throughput-drop`, p95 grows by more than
+`--max-latency-growth` (and by more than `--latency-slack-ms`) or alloc_peak_kb by more
+than `--max-alloc-growth`. Throughput and p95 are compared relative to GET /healthz
+measured in the same run (always included when gating): the baseline stores each
+endpoint's req/s and p95 as ratios to /healthz at the same concurrency, not absolute
+numbers, so it carries over between machines of different speed. Refresh it with
+`--update-baseline`.
+
+Usage:
+    uv run python -m benchmarks.bench_load [--requests 1000] [--concurrency 1,16] [--endpoints run,read_file,healthz]
+        [--url http://127.0.0.1:8000 [--server-pid PID]] [--out results.json]
+        [--baseline benchmarks/baselines/bench_load.json [--update-baseline]]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from benchmarks._common import percentile, print_table
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "bench_load.json"
+REFERENCE = "healthz"  # in-run yardstick for the gate: framework + middleware, no work
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    name: str
+    method: str
+    path: str
+    body: dict[str, Any] | None = None
+
+
+ENDPOINTS = {
+    "run": Endpoint("run", "POST", "/run", {"input": "load", "max_steps": 3}),
+    "read_file": Endpoint("read_file", "POST", "/mcp/tools/read_file", {"path": "data/sample.txt"}),
+    "healthz": Endpoint("healthz", "GET", "/healthz"),
+}
+
+
+@dataclass(frozen=True)
+class Result:
+    endpoint: str
+    concurrency: int
+    requests: int
+    errors: int
+    req_per_s: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    peak_rss_mb: float | None
+    alloc_peak_kb: float | None
+
+
+# --- memory -------------------------------------------------------------------
+
+
+def _reset_peak_rss(pid: int) -> None:
+    with contextlib.suppress(OSError):
+        Path(f"/proc/{pid}/clear_refs").write_text("5")  # resets VmHWM to the current RSS
+
+
+def _peak_rss_mb(pid: int) -> float | None:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if pid == os.getpid():
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    return None
+
+
+# --- load -----------------------------------------------------------------------
+
+
+async def _drive(client: httpx.AsyncClient, ep: Endpoint, n: int, concurrency: int) -> tuple[list[float], int, float]:
+    latencies: list[float] = []
+    errors = 0
+    issued = 0
+
+    async def worker() -> None:
+        nonlocal errors, issued
+        while issued < n:
+            issued += 1
+            t0 = time.perf_counter()
+            try:
+                r = await client.request(ep.method, ep.path, json=ep.body)
+                ok = r.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - t0)
+            else:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return sorted(latencies), errors, time.perf_counter() - t0
+
+
+async def _measure(
+    client: httpx.AsyncClient, ep: Endpoint, n: int, concurrency: int, mem_pid: int | None, trace_allocs: bool
+) -> Result:
+    await _drive(client, ep, max(concurrency, 20), concurrency)  # warm caches and connections
+    if mem_pid is not None:
+        _reset_peak_rss(mem_pid)
+    latencies, errors, elapsed = await _drive(client, ep, n, concurrency)
+    peak_rss = _peak_rss_mb(mem_pid) if mem_pid is not None else None
+
+    alloc_peak = None
+    if trace_allocs:
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        await _drive(client, ep, min(n, 200), concurrency)
+        alloc_peak = (tracemalloc.get_traced_memory()[1] - start) / 1024
+        tracemalloc.stop()
+
+    return Result(
+        endpoint=ep.name,
+        concurrency=concurrency,
+        requests=n,
+        errors=errors,
+        req_per_s=len(latencies) / elapsed if elapsed else 0.0,
+        p50_ms=percentile(latencies, 50) * 1000,
+        p95_ms=percentile(latencies, 95) * 1000,
+        p99_ms=percentile(latencies, 99) * 1000,
+        peak_rss_mb=peak_rss,
+        alloc_peak_kb=alloc_peak,
+    )
+
+
+async def run_inprocess(endpoints: list[Endpoint], n: int, levels: list[int]) -> list[Result]:
+    os.environ.setdefault("GRAPH_WARMUP", "eager")
+    os.environ.setdefault("MCP_ALLOWED_TOOLS", "read_file")
+    devnull = open(os.devnull, "w")  # left open: the app's log handler keeps writing to it
+    with contextlib.redirect_stderr(devnull):
+        from src.app.main import app  # configure_logging(): same handlers and formatting, to /dev/null
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for ep in endpoints:
+                for c in levels:
+                    results.append(await _measure(client, ep, n, c, os.getpid(), trace_allocs=True))
+    return results
+
+
+async def run_live(url: str, server_pid: int | None, endpoints: list[Endpoint], n: int, levels: list[int]) -> list[Result]:
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    results = []
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        (await client.get("/readyz")).raise_for_status()
+        for ep in endpoints:
+            for c in levels:
+                results.append(await _measure(client, ep, n, c, server_pid, trace_allocs=False))
+    return results
+
+
+# --- baseline -----------------------------------------------------------------
+
+
+def relative(results: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Baseline rows: req/s and p95 of each endpoint as ratios to REFERENCE at the same concurrency."""
+    refs = {r["concurrency"]: r for r in results if r["endpoint"] == REFERENCE}
+    rows = []
+    for r in results:
+        ref = refs.get(r["concurrency"])
+        if r["endpoint"] == REFERENCE or ref is None or not ref["req_per_s"] or not ref["p95_ms"]:
+            continue
+        rows.append(
+            {
+                "endpoint": r["endpoint"],
+                "concurrency": r["concurrency"],
+                "req_per_s_ratio": r["req_per_s"] / ref["req_per_s"],
+                "p95_ratio": r["p95_ms"] / ref["p95_ms"],
+                "alloc_peak_kb": r["alloc_peak_kb"],
+            }
+        )
+    return rows
+
+
+def compare(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    *,
+    max_throughput_drop: float,
+    max_latency_growth: float,
+    latency_slack_ms: float,
+    max_alloc_growth: float,
+) -> list[str]:
+    """Regressions of `current` (an --out document) against `baseline` (relative rows), as messages."""
+    if current["meta"]["mode"] != baseline["meta"]["mode"]:
+        return [f"baseline mode {baseline['meta']['mode']!r} != {current['meta']['mode']!r}"]
+    base = {(r["endpoint"], r["concurrency"]): r for r in baseline["results"]}
+    refs = {r["concurrency"]: r for r in current["results"] if r["endpoint"] == REFERENCE}
+    problems = []
+    for r in current["results"]:
+        key = f"{r['endpoint']}@{r['concurrency']}"
+        if r["errors"]:
+            problems.append(f"{key}: {r['errors']} errors")
+        b = base.get((r["endpoint"], r["concurrency"]))
+        ref = refs.get(r["concurrency"])
+        if b is None or ref is None:
+            continue
+        # the baseline's ratios scaled by this run's reference: what this machine should do
+        want_rps = b["req_per_s_ratio"] * ref["req_per_s"]
+        want_p95 = b["p95_ratio"] * ref["p95_ms"]
+        if r["req_per_s"] < want_rps * (1 - max_throughput_drop):
+            problems.append(f"{key}: req_per_s {r['req_per_s']:.0f} < expected {want_rps:.0f} ({REFERENCE}-relative)")
+        # sub-millisecond p95s jitter by more than any sane ratio: growth must also exceed the slack
+        if r["p95_ms"] > max(want_p95 * (1 + max_latency_growth), want_p95 + latency_slack_ms):
+            problems.append(f"{key}: p95_ms {r['p95_ms']:.2f} > expected {want_p95:.2f} ({REFERENCE}-relative)")
+        if r["alloc_peak_kb"] is not None and b.get("alloc_peak_kb") is not None:
+            if r["alloc_peak_kb"] > b["alloc_peak_kb"] * (1 + max_alloc_growth):
+                problems.append(f"{key}: alloc_peak_kb {r['alloc_peak_kb']:.0f} > baseline {b['alloc_peak_kb']:.0f}")
+    return problems
+
+
+def main(args: argparse.Namespace) -> int:
+    endpoints = [ENDPOINTS[name] for name in args.endpoints.split(",")]
+    if args.baseline and ENDPOINTS[REFERENCE] not in endpoints:
+        endpoints.append(ENDPOINTS[REFERENCE])  # the gate is relative to it
+    levels = [int(c) for c in args.concurrency.split(",")]
+    if args.url:
+        results = asyncio.run(run_live(args.url, args.server_pid, endpoints, args.requests, levels))
+    else:
+        results = asyncio.run(run_inprocess(endpoints, args.requests, levels))
+
+    doc = {
+        "meta": {
+            "mode": "live" if args.url else "inprocess",
+            "requests": args.requests,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "created_at": int(time.time()),
+        },
+        "results": [asdict(r) for r in results],
+    }
+    print_table([{k: ("-" if v is None else v) for k, v in asdict(r).items()} for r in results])
+    if args.out:
+        Path(args.out).write_text(json.dumps(doc, indent=2) + "\n")
+
+    if not args.baseline:
+        return 0
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {k: doc["meta"][k] for k in ("mode", "requests", "python", "created_at")}
+        baseline = {"meta": {**meta, "reference": REFERENCE}, "results": relative(doc["results"])}
+        baseline_path.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"baseline written: {baseline_path}")
+        return 0
+    problems = compare(
+        doc,
+        json.loads(baseline_path.read_text()),
+        max_throughput_drop=args.max_throughput_drop,
+        max_latency_growth=args.max_latency_growth,
+        latency_slack_ms=args.latency_slack_ms,
+        max_alloc_growth=args.max_alloc_growth,
+    )
+    for p in problems:
+        print(f"FAIL {p}")
+    if not problems:
+        print(f"ok   no regressions against {baseline_path}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", default="1,16", help="comma-separated client concurrency levels")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--url", help="benchmark a live server instead of the in-process app")
+    parser.add_argument("--server-pid", type=int, help="live mode: read the server's peak RSS from /proc")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--baseline", nargs="?", const=str(DEFAULT_BASELINE), help="compare against (or with --update-baseline, write) this file")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--max-throughput-drop", type=float, default=0.25)
+    parser.add_argument("--max-latency-growth", type=float, default=0.35)
+    parser.add_argument("--latency-slack-ms", type=float, default=0.5)
+    parser.add_argument("--max-alloc-growth", type=float, default=0.25)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,140 @@
+"""
+Per-request middleware overhead: pure ASGI RequestContextMiddleware vs the
+BaseHTTPMiddleware stack it replaced (kept verbatim below as the baseline).
+
+Stacks (all serve the same trivial JSON + streaming routes):
+- bare:    no middleware
+- legacy:  @app.middleware("http") trace_middleware + RequestLoggingMiddleware
+- asgi:    RequestContextMiddleware
+
+Logging is routed to a NullHandler so the numbers are middleware mechanics only.
+
+Usage:
+    uv run python -m benchmarks.bench_middleware_overhead [--n 3000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+
+from benchmarks._common import percentile, print_table
+from src.middleware.request_context import RequestContextMiddleware
+
+TRACE_HEADER = "X-Trace-Id"
+legacy_logger = logging.getLogger("bench.legacy")
+
+
+class LegacyRequestLoggingMiddleware(BaseHTTPMiddleware):
+    # as shipped in src/middleware/logging.py before the ASGI rewrite
+    async def dispatch(self, request: Request, call_next):
+        start = time.time()
+
+        def get_trace_id() -> str | None:
+            return getattr(request.state, "trace_id", None) or request.headers.get(TRACE_HEADER)
+
+        legacy_logger.info("request_start", extra={"trace_id": get_trace_id()})
+        try:
+            response = await call_next(request)
+        except Exception:
+            trace_id = get_trace_id()
+            legacy_logger.exception("request_error", extra={"trace_id": trace_id})
+            resp = PlainTextResponse("Internal Server Error", status_code=500)
+            if trace_id:
+                resp.headers[TRACE_HEADER] = trace_id
+            return resp
+
+        duration_ms = int((time.time() - start) * 1000)
+        legacy_logger.info(
+            "request_end",
+            extra={"trace_id": get_trace_id(), "status_code": response.status_code, "duration_ms": duration_ms},
+        )
+        trace_id = get_trace_id()
+        if trace_id:
+            response.headers.setdefault(TRACE_HEADER, trace_id)
+        return response
+
+
+def _routes(app: FastAPI) -> FastAPI:
+    @app.get("/ping")
+    async def ping() -> dict[str, str]:
+        return {"status": "ok"}
+
+    @app.get("/stream")
+    async def stream() -> StreamingResponse:
+        async def gen():
+            for i in range(10):
+                yield f"{i}\n"
+        return StreamingResponse(gen(), media_type="text/plain")
+
+    return app
+
+
+def build(stack: str) -> FastAPI:
+    app = FastAPI()
+    if stack == "legacy":
+        app.add_middleware(LegacyRequestLoggingMiddleware)
+
+        @app.middleware("http")
+        async def trace_middleware(request: Request, call_next):
+            trace_id = request.headers.get(TRACE_HEADER) or uuid.uuid4().hex
+            request.state.trace_id = trace_id
+            response = await call_next(request)
+            response.headers[TRACE_HEADER] = trace_id
+            return response
+    elif stack == "asgi":
+        app.add_middleware(RequestContextMiddleware)
+    return _routes(app)
+
+
+async def _drive(app: FastAPI, path: str, n: int) -> list[float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(50):
+            await client.get(path)
+        out = []
+        for _ in range(n):
+            t0 = time.perf_counter_ns()
+            r = await client.get(path)
+            out.append((time.perf_counter_ns() - t0) / 1000)
+            assert r.status_code == 200
+        return sorted(out)
+
+
+async def main(n: int) -> None:
+    rows = []
+    for path in ("/ping", "/stream"):
+        base_p50 = None
+        for stack in ("bare", "legacy", "asgi"):
+            lat = await _drive(build(stack), path, n)
+            p50 = percentile(lat, 50)
+            base_p50 = p50 if stack == "bare" else base_p50
+            rows.append(
+                {
+                    "route": path,
+                    "stack": stack,
+                    "p50_us": p50,
+                    "p99_us": percentile(lat, 99),
+                    "overhead_p50_us": p50 - base_p50,
+                }
+            )
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=3000)
+    args = parser.parse_args()
+
+    root = logging.getLogger()
+    root.handlers = [logging.NullHandler()]
+    root.setLevel(logging.INFO)
+    asyncio.run(main(args.n))
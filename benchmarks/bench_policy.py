@@ -0,0 +1,92 @@
+"""
+Tool policy decisions/sec with ~1k rules.
+
+- compiled: CompiledPolicy.decide (dict lookups + one precompiled regex per rule set)
+- naive:    same rules, evaluated per call with fnmatch over every glob
+- env:      legacy per-call MCP_ALLOWED_TOOLS parse (tool-level only, for reference)
+
+Rules: 300 tools, 500 deny globs, 150 allow globs, 50 approval globs.
+
+Usage:
+    uv run python -m benchmarks.bench_policy [--n 200000]
+"""
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import os
+import random
+import time
+from typing import Any, Callable
+
+from benchmarks._common import print_table
+from src.core.policy import compile_policy
+
+
+def _doc() -> dict[str, Any]:
+    tools = {f"tool_{i}": "allow" if i % 3 else "deny" for i in range(300)}
+    tools["read_file"] = "allow"
+    paths = [{"glob": f"data/deny_{i}/*", "effect": "deny"} for i in range(450)]
+    paths += [{"tool": "read_file", "glob": f"data/*.tmp{i}", "effect": "deny"} for i in range(50)]
+    paths += [{"glob": f"data/area_{i}/*", "effect": "allow"} for i in range(149)]
+    paths.append({"glob": "data/*.txt", "effect": "allow"})
+    approval = [f"*.secret{i}" for i in range(49)] + ["*.secret"]
+    return {"version": "bench", "default": "deny", "tools": tools, "paths": paths, "approval": approval}
+
+
+def _naive(doc: dict[str, Any]) -> Callable[[str, str], bool]:
+    def decide(tool: str, path: str) -> bool:
+        if doc["tools"].get(tool) != "allow":
+            return False
+        rules = [r for r in doc["paths"] if r.get("tool", tool) == tool]
+        if any(fnmatch.fnmatchcase(path, r["glob"]) for r in rules if r["effect"] == "deny"):
+            return False
+        allows = [r for r in rules if r["effect"] == "allow"]
+        if allows and not any(fnmatch.fnmatchcase(path, r["glob"]) for r in allows):
+            return False
+        any(fnmatch.fnmatchcase(path, g) for g in doc["approval"])
+        return True
+
+    return decide
+
+
+def _env(tool: str, path: str) -> bool:
+    allow = {item.strip() for item in os.getenv("MCP_ALLOWED_TOOLS", "").split(",") if item.strip()}
+    return tool in allow
+
+
+def _calls(n: int) -> list[tuple[str, str]]:
+    rng = random.Random(0)
+    paths = ["data/sample.txt", "data/deny_7/x", "data/area_100/y", "data/plans.secret", "etc/passwd", "data/a.tmp3"]
+    tools = ["read_file", "tool_1", "tool_3", "unknown"]
+    return [(rng.choice(tools), rng.choice(paths)) for _ in range(n)]
+
+
+def _rate(fn: Callable[[str, str], Any], calls: list[tuple[str, str]]) -> float:
+    t0 = time.perf_counter()
+    for tool, path in calls:
+        fn(tool, path)
+    return len(calls) / (time.perf_counter() - t0)
+
+
+def main(n: int) -> None:
+    doc = _doc()
+    t0 = time.perf_counter()
+    policy = compile_policy(doc, version="bench")
+    compile_ms = (time.perf_counter() - t0) * 1000
+    os.environ["MCP_ALLOWED_TOOLS"] = ",".join(t for t, v in doc["tools"].items() if v == "allow")
+
+    calls = _calls(n)
+    rows = [
+        {"engine": "compiled", "decisions_per_s": _rate(policy.decide, calls), "compile_ms": compile_ms},
+        {"engine": "naive", "decisions_per_s": _rate(_naive(doc), calls[: n // 20]), "compile_ms": 0.0},
+        {"engine": "env", "decisions_per_s": _rate(_env, calls), "compile_ms": 0.0},
+    ]
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=200000)
+    args = parser.parse_args()
+    main(args.n)
@@ -0,0 +1,175 @@
+"""
+Throughput scaling of the prefork server (`src.app.serve`) from 1 to N workers.
+
+Per worker count: start `python -m src.app.serve --workers W`, wait for /readyz, then
+drive POST /run from `--clients` load processes (keep-alive connections, `--conns`
+each) for `--seconds`. Reports req/s, latency percentiles, the speedup over 1 worker,
+memory (RSS summed over the workers vs PSS, which splits copy-on-write pages shared
+with the master) and checks that /metrics, answered by any one worker, counts every
+request sent to all of them.
+
+Client processes share the machine with the workers: on a box with fewer cores than
+workers + clients the speedup is bounded by the cores, not by the server.
+
+Usage:
+    uv run python -m benchmarks.bench_prefork_scaling [--workers 1,2,4] [--seconds 5] [--clients 2] [--conns 8]
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import multiprocessing as mp
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from benchmarks._common import percentile, print_table
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+_RUN_COUNT = re.compile(r'http_request_duration_seconds_count\{method="POST",route="/run",status_code="200"\} (\S+)')
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(port: int, path: str) -> tuple[int, str]:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        conn.request("GET", path)
+        r = conn.getresponse()
+        return r.status, r.read().decode()
+    except OSError:
+        return 0, ""
+    finally:
+        conn.close()
+
+
+def _client(port: int, conns: int, seconds: float, out: mp.Queue) -> None:
+    body = json.dumps({"input": "bench", "max_steps": 3})
+    headers = {"content-type": "application/json"}
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def loop() -> None:
+        nonlocal errors
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        mine: list[float] = []
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                conn.request("POST", "/run", body=body, headers=headers)
+                r = conn.getresponse()
+                r.read()
+                ok = r.status == 200
+            except OSError:
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+                ok = False
+            if ok:
+                mine.append(time.perf_counter() - t0)
+            else:
+                with lock:
+                    errors += 1
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=loop) for _ in range(conns)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    out.put((latencies, errors))
+
+
+def _memory_mb(master_pid: int) -> tuple[float, float]:
+    # (sum of worker RSS, sum of worker PSS); PSS charges each shared page 1/n to its n sharers
+    children = Path(f"/proc/{master_pid}/task/{master_pid}/children").read_text().split()
+    rss = pss = 0
+    for pid in children:
+        for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+            if line.startswith("Rss:"):
+                rss += int(line.split()[1])
+            elif line.startswith("Pss:"):
+                pss += int(line.split()[1])
+    return rss / 1024, pss / 1024
+
+
+def _one(workers: int, seconds: float, clients: int, conns: int) -> dict[str, object]:
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "src.app.serve", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)],
+        cwd=REPO_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 60
+        while _get(port, "/readyz")[0] != 200:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f"serve --workers {workers} did not become ready")
+            time.sleep(0.1)
+        for _ in range(20 * workers):  # warm every worker's first request
+            _get(port, "/healthz")
+
+        out: mp.Queue = mp.Queue()
+        procs = [mp.Process(target=_client, args=(port, conns, seconds, out)) for _ in range(clients)]
+        t0 = time.perf_counter()
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        elapsed = time.perf_counter() - t0
+        for p in procs:
+            p.join()
+
+        rss_mb, pss_mb = _memory_mb(proc.pid)
+        latencies = sorted(lat for lats, _ in results for lat in lats)
+        errors = sum(e for _, e in results)
+        match = _RUN_COUNT.search(_get(port, "/metrics")[1])
+        counted = int(float(match.group(1))) if match else 0
+        return {
+            "workers": workers,
+            "requests": len(latencies),
+            "errors": errors,
+            "req_per_s": len(latencies) / elapsed,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "rss_mb": rss_mb,
+            "pss_mb": pss_mb,
+            "metrics_ok": counted == len(latencies),
+        }
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main(workers: list[int], seconds: float, clients: int, conns: int) -> None:
+    print(f"cpus={os.cpu_count()} clients={clients}x{conns} seconds={seconds}")
+    rows = [_one(w, seconds, clients, conns) for w in workers]
+    base = rows[0]["req_per_s"]
+    for row in rows:
+        row["speedup"] = row["req_per_s"] / base  # type: ignore[operator]
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({1, *(w for w in (2, 4, 8, 16) if w <= cpus), cpus})
+    parser.add_argument("--workers", default=",".join(map(str, default_workers)), help="comma-separated worker counts")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=2)
+    parser.add_argument("--conns", type=int, default=8)
+    args = parser.parse_args()
+    main([int(w) for w in args.workers.split(",")], args.seconds, args.clients, args.conns)
@@ -0,0 +1,70 @@
+"""
+Sync vs async graph execution under concurrency.
+
+- sync:  what a `def` route does: run_graph on anyio's worker threads
+         (default limiter = 40 threads, same as Starlette)
+- async: what the `async def /run` route does: await run_graph_async on the loop
+
+Usage:
+    uv run python -m benchmarks.bench_run_sync_vs_async [--levels 1,100,1000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+
+import anyio.to_thread
+
+from benchmarks._common import percentile, print_table
+from src.graphs.basic_agent.run import run_graph, run_graph_async
+
+
+async def _one_sync(i: int) -> float:
+    t0 = time.perf_counter()
+    await anyio.to_thread.run_sync(lambda: run_graph(input=f"in-{i}", trace_id=f"B-{i}"))
+    return time.perf_counter() - t0
+
+
+async def _one_async(i: int) -> float:
+    t0 = time.perf_counter()
+    await run_graph_async(input=f"in-{i}", trace_id=f"B-{i}")
+    return time.perf_counter() - t0
+
+
+async def _level(mode: str, concurrency: int) -> dict[str, object]:
+    one = _one_sync if mode == "sync" else _one_async
+    t0 = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*(one(i) for i in range(concurrency))))
+    wall = time.perf_counter() - t0
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "wall_s": wall,
+        "runs_per_s": concurrency / wall,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def main(levels: list[int]) -> None:
+    # warm both paths (graph compile, imports, thread pool spin-up)
+    await _level("sync", 4)
+    await _level("async", 4)
+
+    rows = []
+    for n in levels:
+        rows.append(await _level("sync", n))
+        rows.append(await _level("async", n))
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--levels", default="1,100,1000")
+    args = parser.parse_args()
+
+    # Measure execution, not stdout: node logs would dominate both paths equally.
+    logging.disable(logging.CRITICAL)
+    asyncio.run(main([int(x) for x in args.levels.split(",")]))
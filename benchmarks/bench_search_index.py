@@ -0,0 +1,117 @@
+"""
+search_data index: build throughput and query latency on a generated corpus.
+
+Corpus: --mb of text in --file-kb files, words drawn from a Zipf-ish vocabulary
+of --vocab synthetic words (so there are very common and very rare terms).
+
+- build:        DataIndex walk + full SearchIndex build, MB/s
+- update_1:     one file rewritten -> refresh + incremental sync
+- q_common / q_mid / q_rare / q_two_terms: top-10 query latency incl. offsets
+  and snippets, p50 / p99 over --queries calls
+
+Usage:
+    uv run python -m benchmarks.bench_search_index [--mb 1024] [--file-kb 1024] [--queries 200]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from benchmarks._common import percentile, print_table
+from src.tools.data_index import DataIndex
+from src.tools.search_index import SearchIndex
+
+
+def _vocab(n: int) -> list[str]:
+    rng = random.Random(1)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return [f"{''.join(rng.choice(letters) for _ in range(rng.randint(3, 9)))}{i}" for i in range(n)]
+
+
+def _make_corpus(root: Path, mb: int, file_kb: int, vocab: list[str]) -> int:
+    rng = random.Random(0)
+    cum, acc = [], 0.0
+    for rank in range(len(vocab)):
+        acc += 1.0 / (rank + 1)
+        cum.append(acc)
+    target = mb * 1024 * 1024
+    written = 0
+    i = 0
+    while written < target:
+        words = rng.choices(vocab, cum_weights=cum, k=file_kb * 1024 // 8)
+        lines = (" ".join(words[j : j + 12]) for j in range(0, len(words), 12))
+        data = "\n".join(lines).encode()
+        d = root / f"d{i // 256:03d}"
+        d.mkdir(parents=True, exist_ok=True)
+        (d / f"f{i:05d}.txt").write_bytes(data)
+        written += len(data)
+        i += 1
+    return written
+
+
+def _latencies_ms(fn: Callable[[int], object], n: int) -> list[float]:
+    out = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn(i)
+        out.append((time.perf_counter() - t0) * 1000)
+    return sorted(out)
+
+
+def main(mb: int, file_kb: int, vocab_size: int, queries: int) -> None:
+    vocab = _vocab(vocab_size)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "data"
+        written = _make_corpus(root, mb, file_kb, vocab)
+
+        data_index = DataIndex(root, full_rescan_s=3600)
+        idx = SearchIndex(data_index, max_file_bytes=max(16, file_kb * 2) * 1024)
+        t0 = time.perf_counter()
+        data_index.refresh()
+        idx.sync()
+        build_s = time.perf_counter() - t0
+        stats = idx.stats()
+
+        victim = root / "d000" / "f00000.txt"
+        victim.write_bytes(victim.read_bytes()[::-1])
+        os.utime(victim, ns=(1, 1))
+        t0 = time.perf_counter()
+        data_index.refresh(full=True)
+        idx.sync()
+        update_ms = (time.perf_counter() - t0) * 1000
+
+        rng = random.Random(2)
+        common, mid, rare = vocab[:20], vocab[200:2000], vocab[-2000:]
+        cases: dict[str, Callable[[int], object]] = {
+            "q_common": lambda i: idx.search(common[i % len(common)]),
+            "q_mid": lambda i: idx.search(rng.choice(mid)),
+            "q_rare": lambda i: idx.search(rng.choice(rare)),
+            "q_two_terms": lambda i: idx.search(f"{rng.choice(mid)} {rng.choice(rare)}"),
+        }
+        rows: list[dict[str, object]] = [
+            {"op": "build", "p50_ms": build_s * 1000, "p99_ms": 0.0, "mb_per_s": written / 2**20 / build_s},
+            {"op": "update_1", "p50_ms": update_ms, "p99_ms": 0.0, "mb_per_s": 0.0},
+        ]
+        for op, fn in cases.items():
+            lat = _latencies_ms(fn, queries)
+            rows.append({"op": op, "p50_ms": percentile(lat, 50), "p99_ms": percentile(lat, 99), "mb_per_s": 0.0})
+
+        print(
+            f"corpus={written / 2**20:.0f}MB files={stats.files} terms={stats.terms} postings={stats.postings}"
+        )
+        print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=int, default=1024)
+    parser.add_argument("--file-kb", type=int, default=1024)
+    parser.add_argument("--vocab", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    main(args.mb, args.file_kb, args.vocab, args.queries)
@@ -0,0 +1,63 @@
+"""
+Per-transition overhead of the graph state modes.
+
+- coerce: cost of building the state object LangGraph hands to each node/router
+          (GraphState strict validation vs GraphStateLite dataclass construction)
+- graph:  full run cost per superstep at a fixed max_steps, both modes
+
+Usage:
+    uv run python -m benchmarks.bench_state_modes [--max-steps 500] [--n 20000]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+
+from benchmarks._common import print_table
+from src.graphs.basic_agent.graph import build_graph
+from src.graphs.basic_agent.state import GraphState, GraphStateLite, History
+
+
+def _coerce_us(schema: type, n: int) -> float:
+    values = dict(trace_id="BENCH", input="bench", step=1, max_steps=3, history=History(["plan"] * 100))
+    t0 = time.perf_counter()
+    for _ in range(n):
+        schema(**values)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def _graph_us_per_transition(mode: str, max_steps: int, repeat: int = 5) -> float:
+    graph = build_graph(mode)  # type: ignore[arg-type]
+    config = {"recursion_limit": 2 * max_steps + 2}
+    graph.invoke(GraphState(trace_id="BENCH", max_steps=3))  # warm
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        graph.invoke(GraphState(trace_id="BENCH", input="bench", max_steps=max_steps), config)
+        best = min(best, time.perf_counter() - t0)
+    transitions = 2 * max_steps + 1
+    return best / transitions * 1e6
+
+
+def main(max_steps: int, n: int) -> None:
+    rows = []
+    for mode, schema in (("strict", GraphState), ("boundary", GraphStateLite)):
+        rows.append(
+            {
+                "mode": mode,
+                "coerce_us": _coerce_us(schema, n),
+                "graph_us_per_transition": _graph_us_per_transition(mode, max_steps),
+            }
+        )
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-steps", type=int, default=500)
+    parser.add_argument("--n", type=int, default=20000)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    main(args.max_steps, args.n)
@@ -1,47 +1,214 @@
 from __future__ import annotations
 
-import uuid
+import json
 import logging
-from fastapi import FastAPI, Request
+import os
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import asdict
+from typing import Literal
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
 # --- NEW IMPORTS ---
-from src.app.schemas import RunRequest, RunResponse
-from src.graphs.basic_agent.run import run_graph
+from src.app.schemas import AuditQueryResponse, RunBatchItem, RunBatchRequest, RunRequest, RunResponse
+# Graphs are reached through the registry only: LangGraph is imported and graphs compiled
+# on first use or by the startup warmup, not when this module is imported.
+from src.graphs.registry import (
+    DEFAULT_GRAPH,
+    GraphNotFoundError,
+    GraphUnavailableError,
+    aget_graph,
+    get_graph,
+    graph_infos,
+    readiness,
+    start_warmup,
+)
 # Import the logger config from Day 2
 from src.middleware.logging import configure_logging 
+from src.middleware import profiling
+from src.middleware.metrics import REGISTRY
+from src.middleware.request_context import RequestContextMiddleware
+from src.middleware.spans import TRACE_STORE
+from src.core.audit import audit_sink_stats, get_audit_store
+from src.core.audit_store import AuditCursorError
+from src.mcp.executors import executor_stats
 from src.mcp.router import router as mcp_router
+from src.tools.read_file import cache_stats as read_file_cache_stats
+from src.tools.search_data import search_stats
 
 # 1. Turn on the logs! (This was missing)
 configure_logging()
 
 logger = logging.getLogger("app")
 
-app = FastAPI()
+# "background": compile graphs on a thread after startup (/readyz is 503 "starting" meanwhile)
+# "eager": compile before serving; "lazy": on each graph's first request
+GRAPH_WARMUP = os.getenv("GRAPH_WARMUP", "background")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if GRAPH_WARMUP == "eager":
+        start_warmup().join()
+    elif GRAPH_WARMUP == "background":
+        start_warmup()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 # --- THE MIDDLEWARE ---
-@app.middleware("http")
-async def trace_middleware(request: Request, call_next):
-    trace_id = request.headers.get("X-Trace-Id") or uuid.uuid4().hex
-    request.state.trace_id = trace_id
-    response = await call_next(request)
-    response.headers["X-Trace-Id"] = trace_id
-    return response
+# One pure-ASGI layer: trace_id, X-Trace-Id echo, request_start/end logs, 500 fallback.
+app.add_middleware(RequestContextMiddleware)
 
 # --- THE ENDPOINTS ---
 @app.get("/healthz")
 async def healthz():
-    return {"status": "ok"}
+    # liveness: 200 while the process serves at all; graph status is in the body only
+    return {"status": readiness(), "graphs": {g.name: g.status for g in graph_infos()}}
+
+
+@app.get("/readyz")
+async def readyz():
+    # readiness: 503 while the warmup is still compiling, or if the default graph (/run) failed;
+    # any other failed graph is "degraded" here and a 503 graph_unavailable on /run/{graph_name}
+    status = readiness()
+    graphs = {g.name: g.status for g in graph_infos()}
+    body = {"status": status, "graphs": graphs}
+    ready = status != "starting" and graphs.get(DEFAULT_GRAPH) != "error"
+    return body if ready else JSONResponse(body, status_code=503)
+
+
+@app.get("/debug/graphs")
+def debug_graphs():
+    return {"graphs": [asdict(g) for g in graph_infos()]}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    # Prometheus text format; sync route so rendering stays off the event loop
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/traces/{trace_id}")
+def debug_trace(trace_id: str):
+    # span tree (request -> graph -> node -> tool) from the in-memory ring buffer
+    tree = TRACE_STORE.tree(trace_id)
+    if tree is None:
+        raise HTTPException(status_code=404, detail="trace_not_found")
+    return tree
+
+
+@app.get("/debug/profiles")
+def debug_profiles():
+    # traces profiled recently (X-Profile header or PROFILE_SAMPLE_RATE), newest first
+    return {"traces": profiling.recent_traces(), "skipped_spans": profiling.skipped_spans()}
+
+
+@app.get("/debug/profiles/{trace_id}")
+def debug_profile(trace_id: str):
+    # per profiled span (one per node execution): top functions by cumulative time + allocation sites
+    spans = sorted(TRACE_STORE.get(trace_id) or [], key=lambda s: s.start_ns)
+    profiles = [
+        {"span_id": s.span_id, "name": s.name, "kind": s.kind, "duration_us": s.duration_ns // 1000, "status": s.status, **s.attrs["profile"]}
+        for s in spans
+        if "profile" in s.attrs
+    ]
+    if not profiles:
+        raise HTTPException(status_code=404, detail="profile_not_found")
+    return {"trace_id": trace_id, "profiles": profiles}
+
+
+@app.get("/debug/tools/executors")
+def debug_tool_executors():
+    return {"executors": [asdict(s) for s in executor_stats()]}
+
+
+@app.get("/debug/read_file/cache")
+def debug_read_file_cache():
+    stats = read_file_cache_stats()
+    return {"enabled": False} if stats is None else {"enabled": True, **asdict(stats)}
+
+
+@app.get("/audit", response_model=AuditQueryResponse)
+def audit_query(
+    trace_id: str | None = None,
+    tool: str | None = None,
+    outcome: Literal["ok", "blocked", "error"] | None = None,
+    since_ms: int | None = Query(default=None, ge=0),
+    until_ms: int | None = Query(default=None, ge=0),
+    cursor: str | None = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+) -> AuditQueryResponse:
+    # sync route: SQLite reads run on the threadpool, one connection per worker thread
+    store = get_audit_store()
+    if store is None:
+        raise HTTPException(status_code=404, detail="audit_store_disabled")
+    try:
+        page = store.query(
+            trace_id=trace_id,
+            tool_name=tool,
+            outcome=outcome,
+            since_ms=since_ms,
+            until_ms=until_ms,
+            cursor=cursor,
+            limit=limit,
+        )
+    except AuditCursorError:
+        raise HTTPException(status_code=400, detail="invalid_cursor") from None
+    return AuditQueryResponse(events=page.events, next_cursor=page.next_cursor)
+
+
+@app.get("/debug/audit/sink")
+def debug_audit_sink():
+    stats = audit_sink_stats()
+    return {"enabled": False} if stats is None else {"enabled": True, **asdict(stats)}
+
+
+@app.get("/debug/search_data/index")
+def debug_search_index():
+    return asdict(search_stats())
+
+
+@app.get("/debug/run/checkpoints")
+def debug_run_checkpoints():
+    with _graph_errors():
+        return asdict(get_graph().checkpoint_stats())
+
+
+@contextmanager
+def _graph_errors():
+    try:
+        yield
+    except GraphNotFoundError:
+        raise HTTPException(status_code=404, detail="graph_not_found") from None
+    except GraphUnavailableError:
+        raise HTTPException(status_code=503, detail="graph_unavailable") from None
+
+
+async def _runner(graph_name: str = DEFAULT_GRAPH):
+    with _graph_errors():
+        return await aget_graph(graph_name)
+
 
 @app.post("/run", response_model=RunResponse)
-def run(req: RunRequest, request: Request) -> RunResponse:
+async def run(req: RunRequest, request: Request) -> RunResponse:
+    return await _run(await _runner(), req, request)
+
+
+async def _run(runner, req: RunRequest, request: Request) -> RunResponse:
     trace_id = getattr(request.state, "trace_id", "")
     try:
-        final = run_graph(input=req.input, trace_id=trace_id)
+        final = await runner.run_graph_async(
+            input=req.input, trace_id=trace_id, max_steps=req.max_steps, thread_id=req.thread_id
+        )
         return RunResponse(
             trace_id=trace_id, 
             status=final.status, 
             result=final.result
         )
+    except runner.ThreadBusyError:
+        raise HTTPException(status_code=409, detail="thread_busy")
     except Exception:
         logger.exception("run_error", extra={"trace_id": trace_id})
         return RunResponse(
@@ -49,4 +216,89 @@ def run(req: RunRequest, request: Request) -> RunResponse:
             status="error", 
             result=None
         )
+
+
+@app.post("/run/batch")
+def run_batch(req: RunBatchRequest, request: Request) -> StreamingResponse:
+    """
+    Runs every item through the graph concurrently and streams NDJSON,
+    one RunBatchItem per line, in completion order.
+    Item trace_ids are derived from the request trace_id: <trace_id>-<index>.
+    """
+    trace_id = getattr(request.state, "trace_id", "")
+    with _graph_errors():
+        runner = get_graph()
+    items = [
+        runner.BatchItem(input=it.input, trace_id=f"{trace_id}-{i}", max_steps=it.max_steps, thread_id=it.thread_id)
+        for i, it in enumerate(req.items)
+    ]
+
+    def lines():
+        for res in runner.run_graph_batch(items, max_concurrency=req.max_concurrency):
+            item = RunBatchItem(index=res.index, trace_id=res.trace_id, status=res.status, result=res.result)
+            yield item.model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/run/stream")
+async def run_stream(req: RunRequest, request: Request) -> StreamingResponse:
+    """
+    Server-Sent Events:
+    - `event: node`   one per completed node: {node, step, history (delta), duration_ms}
+    - `event: result` exactly once, last: the RunResponse
+    """
+    trace_id = getattr(request.state, "trace_id", "")
+    runner = await _runner()
+    stream = runner.stream_graph(input=req.input, trace_id=trace_id, max_steps=req.max_steps, thread_id=req.thread_id)
+    # first item before the response starts: the thread is claimed there, so a busy thread
+    # is a 409 like /run (not a 200 stream ending in status="error")
+    try:
+        first = await anext(stream)
+        error = None
+    except runner.ThreadBusyError:
+        raise HTTPException(status_code=409, detail="thread_busy") from None
+    except Exception as e:
+        error = e
+
+    async def events():
+        try:
+            if error is not None:
+                raise error
+            final = None
+            ev = first
+            while True:
+                if isinstance(ev, runner.NodeEvent):
+                    yield _sse("node", asdict(ev))
+                else:
+                    final = ev
+                try:
+                    ev = await anext(stream)
+                except StopAsyncIteration:
+                    break
+            resp = RunResponse(trace_id=trace_id, status=final.status, result=final.result)
+        except Exception:
+            logger.exception("run_error", extra={"trace_id": trace_id})
+            resp = RunResponse(trace_id=trace_id, status="error", result=None)
+        finally:
+            await stream.aclose()
+        yield _sse("result", resp.model_dump())
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# after the fixed /run/* routes, so /run/batch and /run/stream are not taken as graph names
+@app.post("/run/{graph_name}", response_model=RunResponse)
+async def run_named(graph_name: str, req: RunRequest, request: Request) -> RunResponse:
+    return await _run(await _runner(graph_name), req, request)
+
+
 app.include_router(mcp_router)
\ No newline at end of file
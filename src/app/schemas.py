@@ -1,16 +1,41 @@
 from __future__ import annotations
 
 from typing import Literal
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
+
+from src.core.audit_models import ToolAttemptEvent
 
 
 class RunRequest(BaseModel):
     model_config = ConfigDict(strict=True)
     input: str
+    # plan/verify loops before finish; history grows by 2 entries per step
+    max_steps: int = Field(default=3, ge=1, le=10_000)
+    # checkpoint the run under this id; resending a failed request with the same
+    # thread_id resumes after its last completed node instead of starting over
+    thread_id: str | None = Field(default=None, min_length=1, max_length=256)
 
 
 class RunResponse(BaseModel):
     model_config = ConfigDict(strict=True)
     trace_id: str
     status: Literal["done", "error"]
-    result: str | None
\ No newline at end of file
+    result: str | None
+
+
+class RunBatchRequest(BaseModel):
+    model_config = ConfigDict(strict=True)
+    items: list[RunRequest] = Field(min_length=1, max_length=1000)
+    max_concurrency: int | None = Field(default=None, ge=1)
+
+
+class RunBatchItem(RunResponse):
+    # position of this item in RunBatchRequest.items (lines arrive in completion order)
+    index: int
+
+
+class AuditQueryResponse(BaseModel):
+    model_config = ConfigDict(strict=True)
+    events: list[ToolAttemptEvent]
+    # pass back as ?cursor= for the next page; null on the last page
+    next_cursor: str | None
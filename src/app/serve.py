@@ -0,0 +1,151 @@
+"""
+Prefork serving: import the app and compile every graph once, then fork N uvicorn
+workers that accept on one shared socket.
+
+- workers share the master's pages copy-on-write (compiled graphs, data/search indexes,
+  imported modules); gc.freeze() keeps the collector from dirtying them
+- counters/histograms live in a shared-memory arena (metrics.SharedArena), so /metrics
+  on any worker reports totals across all of them
+- a worker that dies is forked again into the same metrics slot (totals never go back)
+- SIGTERM/SIGINT on the master stops the workers gracefully, then the master
+
+Usage:
+    uv run python -m src.app.serve --workers 4 [--host 0.0.0.0] [--port 8000]
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Any
+
+from src.core import prefork
+from src.middleware.metrics import REGISTRY, SharedArena
+
+logger = logging.getLogger("app")
+
+SERVE_METRICS_SLOT_BYTES = int(os.getenv("SERVE_METRICS_SLOT_BYTES", str(1 << 20)))
+# a worker that exits sooner than this after its fork is restarted with a delay (crash loop)
+_MIN_UPTIME_S = 1.0
+
+
+def _prepare() -> Any:
+    # everything each worker would otherwise do on its own, done once before fork()
+    from src.app.main import app
+    from src.graphs import registry
+    from src.tools import list_files, search_data
+
+    for name in registry.list_graphs():
+        try:
+            registry.get_graph(name)
+        except registry.GraphUnavailableError:
+            pass  # every worker reports it on /healthz and /readyz
+    for idx in list(list_files._INDEXES.values()):
+        idx.snapshot()
+    for sidx in list(search_data._INDEXES.values()):
+        sidx.wait_ready(30)
+    return app
+
+
+def _bind(host: str, port: int, backlog: int) -> socket.socket:
+    # proto must be IPPROTO_TCP (not 0): accepted sockets inherit it, and asyncio only sets
+    # TCP_NODELAY on those, otherwise split header/body writes wait out delayed ACKs (~40 ms)
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _worker(app: Any, sock: socket.socket, slot: int) -> int:
+    import uvicorn
+
+    # own process group: a terminal's Ctrl-C reaches the master only, which then stops
+    # the workers once (a second SIGINT would make uvicorn skip its graceful shutdown)
+    os.setpgid(0, 0)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    REGISTRY.attach_worker(slot)  # before any thread restarts and records a metric
+    prefork.after_fork(in_child=True)
+    config = uvicorn.Config(app, lifespan="on", access_log=False, log_config=None)
+    uvicorn.Server(config).run(sockets=[sock])
+    return 0
+
+
+def serve(workers: int, host: str, port: int, backlog: int = 2048) -> None:
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+    # slot 0 is the master's; the arena must exist before anything records a metric
+    REGISTRY.share(SharedArena(slots=workers + 1, slot_bytes=SERVE_METRICS_SLOT_BYTES))
+    app = _prepare()
+    if workers > 1 and not os.getenv("RUN_CHECKPOINT_DB_PATH"):
+        logger.warning("checkpoints_per_worker", extra={"fields": {"workers": workers}})
+    sock = _bind(host, port, backlog)
+    gc.freeze()
+
+    children: dict[int, tuple[int, float]] = {}  # pid -> (slot, forked at)
+    stopping = False
+
+    def spawn(slot: int) -> None:
+        prefork.before_fork()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = _worker(app, sock, slot)
+            except BaseException:
+                logger.exception("worker_error", extra={"fields": {"slot": slot}})
+            finally:
+                os._exit(code)
+        prefork.after_fork(in_child=False)
+        children[pid] = (slot, time.monotonic())
+
+    def stop(signum: int, _frame: Any) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for slot in range(1, workers + 1):
+        spawn(slot)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logger.info("serve_started", extra={"fields": {"workers": workers, "host": host, "port": port}})
+
+    while children:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid == 0:
+            time.sleep(0.1)
+            continue
+        slot, forked_at = children.pop(pid)
+        if stopping:
+            continue
+        logger.warning("worker_exited", extra={"fields": {"slot": slot, "pid": pid, "status": status}})
+        if time.monotonic() - forked_at < _MIN_UPTIME_S:
+            time.sleep(_MIN_UPTIME_S)
+        spawn(slot)
+    sock.close()
+    logger.info("serve_stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.app.serve")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SERVE_WORKERS", "0")) or os.cpu_count() or 1)
+    parser.add_argument("--host", default=os.getenv("SERVE_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVE_PORT", "8000")))
+    parser.add_argument("--backlog", type=int, default=2048)
+    args = parser.parse_args()
+    serve(args.workers, args.host, args.port, args.backlog)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,52 @@
 from __future__ import annotations
 
+import atexit
+import os
+import threading
 import time
 
 from src.core.audit_models import ToolAttemptEvent
+from src.core.audit_sink import AuditSink, AuditSinkStats, BatchWriter
+from src.core.audit_store import AuditStore
 from src.middleware.logging import logger
-from typing import Literal
+from src.middleware.metrics import TOOL_ATTEMPTS
+from typing import Callable, Literal, TypeVar
+
+# env path -> writer; one per path so tests / reconfigs get a fresh file
+_WRITERS: dict[tuple[str, str], BatchWriter] = {}
+_WRITERS_LOCK = threading.Lock()
+
+W = TypeVar("W", bound=BatchWriter)
+
+
+def _writer_for(env: str, factory: Callable[[str], W]) -> W | None:
+    path = os.getenv(env, "")
+    if not path:
+        return None
+    key = (env, path)
+    writer = _WRITERS.get(key)
+    if writer is None:
+        with _WRITERS_LOCK:
+            writer = _WRITERS.get(key)
+            if writer is None:
+                writer = _WRITERS[key] = factory(path)
+                atexit.register(writer.close)
+    return writer  # type: ignore[return-value]
+
+
+def get_audit_sink() -> AuditSink | None:
+    """The NDJSON sink for AUDIT_LOG_PATH, or None (events go to the app log)."""
+    return _writer_for("AUDIT_LOG_PATH", AuditSink.from_env)
+
+
+def get_audit_store() -> AuditStore | None:
+    """The queryable SQLite store for AUDIT_DB_PATH, or None (GET /audit disabled)."""
+    return _writer_for("AUDIT_DB_PATH", AuditStore.from_env)
+
+
+def audit_sink_stats() -> AuditSinkStats | None:
+    sink = get_audit_sink()
+    return sink.stats() if sink is not None else None
 
 
 def audit_tool_attempt(
@@ -16,7 +58,8 @@ def audit_tool_attempt(
     outcome: Literal["ok", "blocked", "error"],  # <--- NEW ARGUMENT
     params_redacted: dict[str, str],
     result_summary: str,
-) -> None:
+    policy_version: str | None = None,
+) -> ToolAttemptEvent:
     evt = ToolAttemptEvent(
         timestamp_ms=int(time.time() * 1000),
         trace_id=trace_id,
@@ -26,5 +69,16 @@ def audit_tool_attempt(
         outcome=outcome,    # <--- PASSED TO MODEL
         params_redacted=params_redacted,
         result_summary=result_summary,
+        policy_version=policy_version,
     )
-    logger.info(evt.model_dump_json(), extra={"trace_id": trace_id})
+    TOOL_ATTEMPTS.labels(tool_name, decision, outcome).inc()
+    store = get_audit_store()
+    if store is not None:
+        store.enqueue(evt)
+    sink = get_audit_sink()
+    if sink is not None:
+        sink.enqueue(evt)  # serialized once, on the sink's writer thread
+    else:
+        # structured fields on the log record, not a JSON string as the message
+        logger.info("tool_attempt", extra={"trace_id": trace_id, "fields": evt.model_dump(exclude={"event", "trace_id"})})
+    return evt
@@ -27,3 +27,6 @@ class ToolAttemptEvent(BaseModel):
 
     # short, grep-friendly
     result_summary: str = Field(..., min_length=1, max_length=240)
+
+    # which compiled policy made the decision (file version / content hash, or env-<hash>)
+    policy_version: str | None = None
@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Literal
+
+from src.core import prefork
+from src.middleware.metrics import AUDIT_SINK_EVENTS
+
+logger = logging.getLogger(__name__)
+
+FsyncPolicy = Literal["batch", "interval", "never"]
+
+
+@dataclass(frozen=True)
+class AuditSinkStats:
+    enqueued: int
+    dropped: int  # queue full: the event was not written (tool_attempts_total still counts it)
+    written: int
+    batches: int  # one write() each
+    fsyncs: int
+    rotations: int
+    queued: int
+
+
+class _Flush:
+    """Queue marker: set once everything enqueued before it is written (and persisted)."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+
+
+class BatchWriter:
+    """
+    Bounded queue + one writer thread that hands batches to _write_batch().
+    - enqueue() never blocks: the event goes on the queue, or is counted as dropped
+    - the writer takes everything queued (up to `batch_size`, waiting at most
+      `commit_window_s` for stragglers) and writes it as one batch
+    - flush() waits for everything enqueued before it; close() drains and stops
+    Subclasses own the destination (file, database) and its durability knobs.
+    """
+
+    _STOP = object()
+    sink_name = "batch"
+
+    def __init__(
+        self,
+        *,
+        queue_size: int = 10_000,
+        batch_size: int = 512,
+        commit_window_s: float = 0.002,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.batch_size = batch_size
+        self.commit_window_s = commit_window_s
+        self._clock = clock
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self._enqueued = 0
+        self._dropped = 0
+        self._written = 0
+        self._batches = 0
+        self._written_ctr = AUDIT_SINK_EVENTS.labels(self.sink_name, "written")
+        self._dropped_ctr = AUDIT_SINK_EVENTS.labels(self.sink_name, "dropped")
+        self._writer = self._new_writer()
+
+    def _new_writer(self) -> threading.Thread:
+        return threading.Thread(target=self._run, name=f"audit-{self.sink_name}", daemon=True)
+
+    def _start(self) -> None:
+        """Subclasses call this once their destination is open."""
+        prefork.register(self)
+        self._writer.start()
+
+    # --- producer side ------------------------------------------------------
+
+    def enqueue(self, event: Any) -> bool:
+        """`event` is a pydantic model (model_dump_json) or any object with that method."""
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._dropped += 1
+            self._dropped_ctr.inc()
+            return False
+        self._enqueued += 1
+        return True
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        """Waits until everything enqueued so far is written (and made durable)."""
+        marker = _Flush()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    # --- writer side --------------------------------------------------------
+
+    def _write_batch(self, events: list[Any]) -> None:
+        raise NotImplementedError
+
+    def _after_batch(self, *, force: bool) -> None:
+        """Durability hook, called after every batch (force: a flush/close is waiting)."""
+
+    def _idle_timeout(self) -> float | None:
+        """How long the writer may sleep with nothing queued (None: until the next event)."""
+        return None
+
+    def _close_destination(self) -> None:
+        pass
+
+    def _reopen_destination(self) -> None:
+        """Reopens what _close_destination() closed; the writer is not running yet."""
+
+    def _collect(self) -> list[Any]:
+        try:
+            batch = [self._queue.get(timeout=self._idle_timeout())]
+        except queue.Empty:
+            return []
+        deadline = self._clock() + self.commit_window_s
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - self._clock()
+            if remaining <= 0 or batch[-1] is self._STOP or isinstance(batch[-1], _Flush):
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            stop = any(e is self._STOP for e in batch)
+            events = [e for e in batch if e is not self._STOP and not isinstance(e, _Flush)]
+            markers = [e for e in batch if isinstance(e, _Flush)]
+            if events:
+                try:
+                    self._write_batch(events)
+                    self._written += len(events)
+                    self._batches += 1
+                    self._written_ctr.inc(len(events))
+                except Exception:
+                    logger.exception("audit_sink_write_error", extra={"span": self.sink_name})
+            try:
+                self._after_batch(force=bool(markers) or stop)
+            except Exception:
+                logger.exception("audit_sink_sync_error", extra={"span": self.sink_name})
+            for m in markers:
+                m.done.set()
+            if stop:
+                return
+
+    # --- lifecycle ----------------------------------------------------------
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Stop accepting events, drain and persist what is queued, close the destination.
+        A writer still busy after `timeout` keeps its destination open (closing it under
+        the thread could hand the fd number to another file): logged, not closed.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._writer.join(timeout=max(0.0, deadline - time.monotonic()))
+        if self._writer.is_alive():
+            logger.error("audit_sink_close_timeout", extra={"span": self.sink_name})
+            return
+        self._close_destination()
+
+    # --- fork (src.core.prefork) --------------------------------------------
+
+    def _before_fork(self) -> None:
+        # drain, stop the writer and close the destination: no thread, lock or
+        # file/sqlite handle of ours crosses fork()
+        if self._closed:
+            return
+        self._queue.put(self._STOP)
+        self._writer.join()
+        self._close_destination()
+
+    def _after_fork(self, in_child: bool) -> None:
+        # parent and child each reopen their own handle and run their own writer
+        if self._closed:
+            return
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._reopen_destination()
+        self._writer = self._new_writer()
+        self._writer.start()
+
+
+class AuditSink(BatchWriter):
+    """
+    Append-only NDJSON audit file: each batch is appended with a single write().
+    - fsync: "batch" after every write (group commit), "interval" at most every
+      `fsync_interval_s`, "never" leaves it to the OS
+    - before a write would push the file past `max_bytes` it is rotated:
+      path -> path.1 -> ... -> path.<backups> (oldest dropped)
+    Events are serialized exactly once, on the writer thread.
+    """
+
+    sink_name = "file"
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        queue_size: int = 10_000,
+        batch_size: int = 512,
+        commit_window_s: float = 0.002,
+        fsync: FsyncPolicy = "batch",
+        fsync_interval_s: float = 1.0,
+        max_bytes: int = 64 * 1024 * 1024,
+        backups: int = 5,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if fsync not in ("batch", "interval", "never"):
+            raise ValueError(f"unknown fsync policy: {fsync}")
+        super().__init__(queue_size=queue_size, batch_size=batch_size, commit_window_s=commit_window_s, clock=clock)
+        self.path = path
+        self.fsync = fsync
+        self.fsync_interval_s = fsync_interval_s
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._fd = self._open()
+        self._size = os.fstat(self._fd).st_size
+        self._last_fsync = clock()
+        self._unsynced = False
+        self._fsyncs = 0
+        self._rotations = 0
+        self._start()
+
+    @classmethod
+    def from_env(cls, path: str) -> AuditSink:
+        return cls(
+            path,
+            queue_size=int(os.getenv("AUDIT_QUEUE_SIZE", "10000")),
+            batch_size=int(os.getenv("AUDIT_BATCH_SIZE", "512")),
+            commit_window_s=float(os.getenv("AUDIT_COMMIT_WINDOW_MS", "2")) / 1000,
+            fsync=os.getenv("AUDIT_FSYNC", "batch"),  # type: ignore[arg-type]
+            fsync_interval_s=float(os.getenv("AUDIT_FSYNC_INTERVAL_S", "1")),
+            max_bytes=int(os.getenv("AUDIT_MAX_BYTES", str(64 * 1024 * 1024))),
+            backups=int(os.getenv("AUDIT_BACKUPS", "5")),
+        )
+
+    def _open(self) -> int:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        return os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+
+    def _idle_timeout(self) -> float | None:
+        # with fsync=interval, wake up to sync a quiet tail instead of waiting for the next event
+        return self.fsync_interval_s if self._unsynced and self.fsync == "interval" else None
+
+    def _write_batch(self, events: list[Any]) -> None:
+        data = "".join(e.model_dump_json() + "\n" for e in events).encode()
+        if self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        view = memoryview(data)
+        while view:
+            n = os.write(self._fd, view)
+            view = view[n:]
+        self._size += len(data)
+        self._unsynced = True
+
+    def _after_batch(self, *, force: bool) -> None:
+        if not self._unsynced or self.fsync == "never":
+            return
+        now = self._clock()
+        if force or self.fsync == "batch" or now - self._last_fsync >= self.fsync_interval_s:
+            os.fsync(self._fd)
+            self._fsyncs += 1
+            self._last_fsync = now
+            self._unsynced = False
+
+    def _rotate(self) -> None:
+        if self.fsync != "never":
+            os.fsync(self._fd)
+            self._unsynced = False
+        os.close(self._fd)
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                src = f"{self.path}.{i}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.unlink(self.path)
+        self._fd = self._open()
+        self._size = 0
+        self._rotations += 1
+
+    def _close_destination(self) -> None:
+        os.close(self._fd)
+
+    def _reopen_destination(self) -> None:
+        self._fd = self._open()
+        self._size = os.fstat(self._fd).st_size
+
+    def stats(self) -> AuditSinkStats:
+        return AuditSinkStats(
+            enqueued=self._enqueued,
+            dropped=self._dropped,
+            written=self._written,
+            batches=self._batches,
+            fsyncs=self._fsyncs,
+            rotations=self._rotations,
+            queued=self._queue.qsize(),
+        )
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from src.core.audit_models import ToolAttemptEvent
+from src.core.audit_sink import BatchWriter
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tool_attempts (
+    id             INTEGER PRIMARY KEY,
+    timestamp_ms   INTEGER NOT NULL,
+    trace_id       TEXT    NOT NULL,
+    tool_name      TEXT    NOT NULL,
+    decision       TEXT    NOT NULL,
+    outcome        TEXT    NOT NULL,
+    policy_version TEXT,
+    event          TEXT    NOT NULL  -- ToolAttemptEvent.model_dump_json()
+);
+-- every filter combination pages in (timestamp_ms, id) order straight off one index
+CREATE INDEX IF NOT EXISTS ix_tool_attempts_trace        ON tool_attempts (trace_id, timestamp_ms, id);
+CREATE INDEX IF NOT EXISTS ix_tool_attempts_tool         ON tool_attempts (tool_name, timestamp_ms, id);
+CREATE INDEX IF NOT EXISTS ix_tool_attempts_tool_outcome ON tool_attempts (tool_name, outcome, timestamp_ms, id);
+CREATE INDEX IF NOT EXISTS ix_tool_attempts_outcome      ON tool_attempts (outcome, timestamp_ms, id);
+CREATE INDEX IF NOT EXISTS ix_tool_attempts_time         ON tool_attempts (timestamp_ms, id);
+"""
+
+_INSERT = (
+    "INSERT INTO tool_attempts (timestamp_ms, trace_id, tool_name, decision, outcome, policy_version, event)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+class AuditCursorError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class AuditPage:
+    events: list[ToolAttemptEvent]
+    next_cursor: str | None
+
+
+@dataclass(frozen=True)
+class AuditStoreStats:
+    enqueued: int
+    dropped: int
+    written: int
+    batches: int  # one transaction each
+    queued: int
+
+
+def encode_cursor(timestamp_ms: int, row_id: int) -> str:
+    return f"{timestamp_ms}.{row_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    try:
+        ts, row_id = cursor.split(".")
+        return int(ts), int(row_id)
+    except ValueError:
+        raise AuditCursorError("invalid_cursor") from None
+
+
+class AuditStore(BatchWriter):
+    """
+    SQLite (WAL) store of tool_attempt events, queryable by trace_id / tool_name /
+    outcome / time range with keyset pagination on (timestamp_ms, id).
+    - writes go through the BatchWriter queue: one transaction per batch, never on
+      the request thread
+    - every filter combination is served by a (filter columns..., timestamp_ms, id)
+      index, pinned with INDEXED BY (most selective first: trace_id, tool_name[+outcome],
+      outcome, time), so a page is one range seek + `limit` rows regardless of table size
+    - readers use one connection per thread; WAL lets them run alongside the writer
+    """
+
+    sink_name = "sqlite"
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        queue_size: int = 10_000,
+        batch_size: int = 1024,
+        commit_window_s: float = 0.005,
+        synchronous: str = "NORMAL",
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__(queue_size=queue_size, batch_size=batch_size, commit_window_s=commit_window_s, clock=clock)
+        self.path = path
+        self.synchronous = synchronous
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = self._connect()
+        self._db.executescript(_SCHEMA)
+        self._local = threading.local()
+        self._start()
+
+    @classmethod
+    def from_env(cls, path: str) -> AuditStore:
+        return cls(
+            path,
+            queue_size=int(os.getenv("AUDIT_DB_QUEUE_SIZE", "10000")),
+            batch_size=int(os.getenv("AUDIT_DB_BATCH_SIZE", "1024")),
+            synchronous=os.getenv("AUDIT_DB_SYNCHRONOUS", "NORMAL"),
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # the writer connection is created here and only used by the writer thread
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def _write_batch(self, events: list[Any]) -> None:
+        self._insert_rows(
+            [
+                (e.timestamp_ms, e.trace_id, e.tool_name, e.decision, e.outcome, e.policy_version, e.model_dump_json())
+                for e in events
+            ]
+        )
+
+    def _insert_rows(self, rows: list[tuple[Any, ...]]) -> None:
+        db = self._db
+        db.execute("BEGIN")
+        try:
+            db.executemany(_INSERT, rows)
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def _close_destination(self) -> None:
+        self._db.close()
+        self._local = threading.local()  # readers: sqlite connections must not cross fork() either
+
+    def _reopen_destination(self) -> None:
+        self._db = self._connect()
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA query_only=1")
+        return conn
+
+    def query(
+        self,
+        *,
+        trace_id: str | None = None,
+        tool_name: str | None = None,
+        outcome: str | None = None,
+        since_ms: int | None = None,
+        until_ms: int | None = None,
+        cursor: str | None = None,
+        limit: int = 100,
+    ) -> AuditPage:
+        """Events matching all given filters, oldest first; `until_ms` is exclusive."""
+        sql, params = _select(trace_id, tool_name, outcome, since_ms, until_ms, cursor, limit + 1)
+        rows = self._reader().execute(sql, params).fetchall()  # limit + 1: is there a next page?
+        more = len(rows) > limit
+        rows = rows[:limit]
+        events = [ToolAttemptEvent.model_validate_json(r[2]) for r in rows]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0]) if more else None
+        return AuditPage(events=events, next_cursor=next_cursor)
+
+    def explain(self, **filters: Any) -> list[str]:
+        """EXPLAIN QUERY PLAN details for the query() SQL (index checks in tests / benchmarks)."""
+        sql, params = _select(
+            filters.get("trace_id"),
+            filters.get("tool_name"),
+            filters.get("outcome"),
+            filters.get("since_ms"),
+            filters.get("until_ms"),
+            filters.get("cursor"),
+            filters.get("limit", 100),
+        )
+        return [row[3] for row in self._reader().execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+    def stats(self) -> AuditStoreStats:
+        return AuditStoreStats(
+            enqueued=self._enqueued,
+            dropped=self._dropped,
+            written=self._written,
+            batches=self._batches,
+            queued=self._queue.qsize(),
+        )
+
+
+def _select(
+    trace_id: str | None,
+    tool_name: str | None,
+    outcome: str | None,
+    since_ms: int | None,
+    until_ms: int | None,
+    cursor: str | None,
+    limit: int,
+) -> tuple[str, list[Any]]:
+    where: list[str] = []
+    params: list[Any] = []
+    for column, value in (("trace_id", trace_id), ("tool_name", tool_name), ("outcome", outcome)):
+        if value is not None:
+            where.append(f"{column} = ?")
+            params.append(value)
+    if since_ms is not None:
+        where.append("timestamp_ms >= ?")
+        params.append(since_ms)
+    if until_ms is not None:
+        where.append("timestamp_ms < ?")
+        params.append(until_ms)
+    if cursor is not None:
+        where.append("(timestamp_ms, id) > (?, ?)")
+        params.extend(decode_cursor(cursor))
+    if trace_id is not None:
+        index = "ix_tool_attempts_trace"  # a trace has few events: filter the rest in place
+    elif tool_name is not None:
+        index = "ix_tool_attempts_tool_outcome" if outcome is not None else "ix_tool_attempts_tool"
+    elif outcome is not None:
+        index = "ix_tool_attempts_outcome"
+    else:
+        index = "ix_tool_attempts_time"
+    sql = f"SELECT id, timestamp_ms, event FROM tool_attempts INDEXED BY {index}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY timestamp_ms, id LIMIT ?"
+    params.append(limit)
+    return sql, params
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-import os
 from dataclasses import dataclass
 
+from src.core.policy import current_policy
+
 
 @dataclass(frozen=True)
 class ToolDecision:
@@ -10,17 +11,11 @@ class ToolDecision:
     reason: str
 
 
-def _parse_allowlist(raw: str) -> set[str]:
-    # "read_file,other_tool" -> {"read_file", "other_tool"}
-    return {item.strip() for item in raw.split(",") if item.strip()}
-
-
 def decide_tool_allowed(tool_name: str) -> ToolDecision:
     """
-    Deny-by-default allowlist.
-    Configure via env var: MCP_ALLOWED_TOOLS=read_file
+    Deny-by-default, tool-level decision from the active policy
+    (MCP_POLICY_FILE, else env var MCP_ALLOWED_TOOLS=read_file).
+    See src/core/policy.py for path rules and approval.
     """
-    allowlist = _parse_allowlist(os.getenv("MCP_ALLOWED_TOOLS", ""))
-    if tool_name in allowlist:
-        return ToolDecision(allowed=True, reason="allowlisted")
-    return ToolDecision(allowed=False, reason="tool_not_allowlisted")
+    decision = current_policy().decide(tool_name)
+    return ToolDecision(allowed=decision.allowed, reason=decision.reason)
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import re
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Mapping
+
+logger = logging.getLogger(__name__)
+
+# Wildcard key: rules without a "tool" apply to every tool.
+ANY_TOOL = "*"
+
+# Approval globs used when the policy doesn't list any (legacy router behavior).
+DEFAULT_APPROVAL_GLOBS = ("*.secret",)
+
+
+class PolicyError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class PolicyDecision:
+    allowed: bool
+    reason: str
+    requires_approval: bool
+    version: str
+
+
+@dataclass(frozen=True)
+class _GlobSet:
+    """
+    Globs compiled for matching:
+    - literal paths in a frozenset (O(1))
+    - wildcard globs bucketed by their literal directory prefix ("data/private/" for
+      "data/private/*.txt"), one regex per bucket; a path only tries the buckets of
+      its own ancestor directories, so 1k globs cost a few dict lookups, not 1k matches
+    """
+
+    exact: frozenset[str]
+    buckets: Mapping[str, re.Pattern[str]]
+
+    def match(self, path: str) -> bool:
+        if path in self.exact:
+            return True
+        buckets = self.buckets
+        rx = buckets.get("")
+        if rx is not None and rx.match(path):
+            return True
+        i = path.find("/")
+        while i != -1:
+            rx = buckets.get(path[: i + 1])
+            if rx is not None and rx.match(path):
+                return True
+            i = path.find("/", i + 1)
+        return False
+
+
+def _literal_dir(glob: str) -> str:
+    magic = min((i for i in (glob.find(c) for c in "*?[") if i != -1), default=len(glob))
+    return glob[: glob.rfind("/", 0, magic) + 1]
+
+
+def _compile_globs(globs: Iterable[str]) -> _GlobSet | None:
+    exact: set[str] = set()
+    grouped: dict[str, list[str]] = {}
+    for g in globs:
+        if any(ch in g for ch in "*?["):
+            grouped.setdefault(_literal_dir(g), []).append(fnmatch.translate(g))
+        else:
+            exact.add(g)
+    if not exact and not grouped:
+        return None
+    buckets = {prefix: re.compile("|".join(pats)) for prefix, pats in grouped.items()}
+    return _GlobSet(frozenset(exact), MappingProxyType(buckets))
+
+
+def _compile_scoped(rules: dict[str, list[str]]) -> Mapping[str, _GlobSet]:
+    # Wildcard globs are folded into every tool-specific set, so a decision
+    # is one dict lookup + one match instead of two.
+    any_globs = rules.get(ANY_TOOL, [])
+    out: dict[str, _GlobSet] = {}
+    for tool, globs in rules.items():
+        merged = globs if tool == ANY_TOOL else globs + any_globs
+        compiled = _compile_globs(merged)
+        if compiled is not None:
+            out[tool] = compiled
+    return MappingProxyType(out)
+
+
+@dataclass(frozen=True)
+class CompiledPolicy:
+    """
+    Immutable decision structure. Swapped as a whole on reload, never mutated,
+    so readers need no lock.
+    Paths must be repo-relative ("data/x.txt"): an absolute path matches no glob, so
+    callers canonicalize what they will actually open first (ToolPipeline does).
+    - tools: tool -> allowed (explicit allow/deny); anything else gets `default_allow`
+    - deny_paths / allow_paths / approval: tool (or "*") -> compiled globs
+      (fnmatch semantics: `*` also matches `/`)
+    """
+
+    version: str
+    default_allow: bool
+    tools: Mapping[str, bool]
+    deny_paths: Mapping[str, _GlobSet]
+    allow_paths: Mapping[str, _GlobSet]
+    approval: Mapping[str, _GlobSet]
+
+    def decide(self, tool_name: str, path: str | None = None) -> PolicyDecision:
+        allowed = self.tools.get(tool_name)
+        if allowed is None:
+            if not self.default_allow:
+                return PolicyDecision(False, "tool_not_allowlisted", False, self.version)
+        elif not allowed:
+            return PolicyDecision(False, "tool_denied", False, self.version)
+
+        if path is None:
+            return PolicyDecision(True, "allowlisted", False, self.version)
+
+        path = posixpath.normpath(path)  # "data/./x" / "data/a/../x" must hit the same rules as "data/x"
+        deny = self.deny_paths.get(tool_name) or self.deny_paths.get(ANY_TOOL)
+        if deny is not None and deny.match(path):
+            return PolicyDecision(False, "path_denied", False, self.version)
+        allow = self.allow_paths.get(tool_name) or self.allow_paths.get(ANY_TOOL)
+        if allow is not None and not allow.match(path):
+            return PolicyDecision(False, "path_not_allowlisted", False, self.version)
+
+        approval = self.approval.get(tool_name) or self.approval.get(ANY_TOOL)
+        needs_approval = approval is not None and approval.match(path)
+        return PolicyDecision(True, "allowlisted", needs_approval, self.version)
+
+    def decide_many(self, tool_name: str, paths: Iterable[str]) -> PolicyDecision:
+        """All paths must pass; approval is required if any path needs it."""
+        needs_approval = False
+        decision = self.decide(tool_name)
+        for path in paths:
+            decision = self.decide(tool_name, path)
+            if not decision.allowed:
+                return decision
+            needs_approval = needs_approval or decision.requires_approval
+        return PolicyDecision(decision.allowed, decision.reason, needs_approval, self.version)
+
+
+def _scoped_globs(entries: Any, field: str, *, effect: str | None = None) -> dict[str, list[str]]:
+    if not isinstance(entries, list):
+        raise PolicyError(f"{field}_must_be_a_list")
+    out: dict[str, list[str]] = {}
+    for e in entries:
+        if isinstance(e, str):  # bare glob = any tool
+            e = {"glob": e}
+        if not isinstance(e, dict) or not isinstance(e.get("glob"), str):
+            raise PolicyError(f"invalid_{field}_rule:{e!r}")
+        if effect is not None and e.get("effect", "deny") != effect:
+            continue
+        out.setdefault(str(e.get("tool", ANY_TOOL)), []).append(e["glob"])
+    return out
+
+
+def compile_policy(doc: dict[str, Any], *, version: str) -> CompiledPolicy:
+    """
+    doc format (JSON):
+      {
+        "version": "2026-10-01",                 # optional, defaults to a content hash
+        "default": "deny",                       # allow|deny for tools not listed
+        "tools": {"read_file": "allow", "shell": "deny"},
+        "paths": [{"tool": "read_file", "glob": "data/private/*", "effect": "deny"},
+                  {"glob": "data/*", "effect": "allow"}],
+        "approval": ["*.secret", {"tool": "read_file", "glob": "data/hr/*"}]
+      }
+    Path rules: any matching deny wins; if a tool has allow globs, the path must match one.
+    """
+    if not isinstance(doc, dict):
+        raise PolicyError("policy_must_be_an_object")
+    default = doc.get("default", "deny")
+    if default not in ("allow", "deny"):
+        raise PolicyError(f"invalid_default:{default!r}")
+    tools = doc.get("tools", {})
+    if not isinstance(tools, dict) or any(v not in ("allow", "deny") for v in tools.values()):
+        raise PolicyError("tools_must_map_to_allow_or_deny")
+    paths = doc.get("paths", [])
+    for e in paths:
+        if isinstance(e, dict) and e.get("effect", "deny") not in ("allow", "deny"):
+            raise PolicyError(f"invalid_path_effect:{e!r}")
+
+    return CompiledPolicy(
+        version=str(doc.get("version") or version),
+        default_allow=default == "allow",
+        tools=MappingProxyType({str(k): v == "allow" for k, v in tools.items()}),
+        deny_paths=_compile_scoped(_scoped_globs(paths, "paths", effect="deny")),
+        allow_paths=_compile_scoped(_scoped_globs(paths, "paths", effect="allow")),
+        approval=_compile_scoped(_scoped_globs(doc.get("approval", list(DEFAULT_APPROVAL_GLOBS)), "approval")),
+    )
+
+
+def _content_version(raw: bytes | str) -> str:
+    data = raw.encode("utf-8") if isinstance(raw, str) else raw
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def policy_from_allowlist(raw: str) -> CompiledPolicy:
+    """Legacy MCP_ALLOWED_TOOLS="read_file,other_tool": deny-by-default, *.secret needs approval."""
+    tools = {item.strip(): "allow" for item in raw.split(",") if item.strip()}
+    return compile_policy({"default": "deny", "tools": tools}, version=f"env-{_content_version(raw)}")
+
+
+# Nothing allowed; used when a policy file can't be loaded on first use.
+DENY_ALL = compile_policy({"default": "deny"}, version="invalid")
+
+
+class PolicyEngine:
+    """
+    Serves the CompiledPolicy for one policy file and hot-swaps it when the
+    file's mtime/size changes (checked at most every `check_interval_s`).
+    A file that fails to load/compile keeps the previous policy in place
+    (DENY_ALL if there is none) and logs policy_reload_error.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        check_interval_s: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.path = path
+        self.check_interval_s = check_interval_s
+        self._clock = clock
+        self._policy: CompiledPolicy | None = None
+        self._stamp: tuple[int, int] | None = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> CompiledPolicy:
+        policy = self._policy
+        if policy is not None and self._clock() < self._next_check:
+            return policy
+        return self._reload_if_changed()
+
+    def _reload_if_changed(self) -> CompiledPolicy:
+        with self._lock:
+            if self._policy is not None and self._clock() < self._next_check:
+                return self._policy  # another thread just checked
+            self._next_check = self._clock() + self.check_interval_s
+            try:
+                st = os.stat(self.path)
+                stamp = (st.st_mtime_ns, st.st_size)
+                if stamp != self._stamp or self._policy is None:
+                    with open(self.path, "rb") as f:
+                        raw = f.read()
+                    self._policy = compile_policy(json.loads(raw), version=_content_version(raw))
+                    self._stamp = stamp
+                    logger.info("policy_loaded", extra={"policy_version": self._policy.version})
+            except (OSError, ValueError):
+                logger.exception("policy_reload_error")
+                if self._policy is None:
+                    self._policy = DENY_ALL
+            return self._policy
+
+
+_ENGINES: dict[str, PolicyEngine] = {}
+_ENGINES_LOCK = threading.Lock()
+_ENV_POLICY: tuple[str, CompiledPolicy] | None = None
+
+
+def current_policy() -> CompiledPolicy:
+    """
+    MCP_POLICY_FILE=<path.json> -> file-backed, hot-reloaded policy
+    (MCP_POLICY_CHECK_S, default 1s, between mtime checks).
+    Otherwise the MCP_ALLOWED_TOOLS allowlist, compiled once per distinct value.
+    """
+    global _ENV_POLICY
+    path = os.environ.get("MCP_POLICY_FILE")
+    if path:
+        engine = _ENGINES.get(path)
+        if engine is None:
+            with _ENGINES_LOCK:
+                engine = _ENGINES.setdefault(
+                    path, PolicyEngine(path, check_interval_s=float(os.getenv("MCP_POLICY_CHECK_S", "1.0")))
+                )
+        return engine.current()
+
+    raw = os.environ.get("MCP_ALLOWED_TOOLS", "")
+    cached = _ENV_POLICY
+    if cached is not None and cached[0] == raw:
+        return cached[1]
+    policy = policy_from_allowlist(raw)
+    _ENV_POLICY = (raw, policy)
+    return policy
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import logging
+import weakref
+from typing import Protocol
+
+logger = logging.getLogger(__name__)
+
+
+class ForkAware(Protocol):
+    """
+    Owns background threads or OS handles that must not cross a fork() as-is.
+    _before_fork: quiesce (stop/join threads, flush queues) so no lock is held mid-fork.
+    _after_fork: in_child=True rebuilds threads/handles in the new worker; False resumes
+    whatever the prefork master itself still needs.
+    """
+
+    def _before_fork(self) -> None: ...
+
+    def _after_fork(self, in_child: bool) -> None: ...
+
+
+_OBJECTS: weakref.WeakSet[ForkAware] = weakref.WeakSet()
+
+
+def register(obj: ForkAware) -> None:
+    """Called by long-lived components on construction; held weakly."""
+    _OBJECTS.add(obj)
+
+
+def before_fork() -> None:
+    for obj in list(_OBJECTS):
+        obj._before_fork()
+
+
+def after_fork(in_child: bool) -> None:
+    for obj in list(_OBJECTS):
+        try:
+            obj._after_fork(in_child)
+        except Exception:
+            logger.exception("after_fork_error", extra={"span": type(obj).__name__})
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Hashable
+
+from .state import GraphState
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    evictions: int  # LRU / byte-budget evictions
+    expirations: int  # entries dropped because their TTL passed
+    coalesced: int  # callers that joined an identical in-flight run instead of computing
+    entries: int
+    bytes: int
+
+
+@dataclass
+class _Entry:
+    value: GraphState
+    nbytes: int
+    expires_at: float
+
+
+class _Flight:
+    """One in-flight computation shared by identical concurrent callers (threads)."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: GraphState | None = None
+        self.error: BaseException | None = None
+
+
+def _retrieve(task: asyncio.Task[GraphState]) -> None:
+    # mark a failure retrieved: no "never retrieved" warning when every waiter left
+    if not task.cancelled():
+        task.exception()
+
+
+class GraphResultCache:
+    """
+    Bounded LRU for final graph states, with TTL and a byte budget.
+    - Single-flight: identical concurrent keys share one execution (sync and async paths separately)
+    - Failures are never cached; waiters of a failed flight get the same exception
+    - Values are stored as-is; callers re-stamp per-request fields (trace_id) on the way out
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 1024,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl_s: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._inflight: dict[Hashable, _Flight] = {}
+        self._ainflight: dict[Hashable, asyncio.Task[GraphState]] = {}
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._coalesced = 0
+
+    @classmethod
+    def from_env(cls) -> GraphResultCache:
+        return cls(
+            max_entries=int(os.getenv("RUN_CACHE_MAX_ENTRIES", "1024")),
+            max_bytes=int(os.getenv("RUN_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+            ttl_s=float(os.getenv("RUN_CACHE_TTL_S", "300")),
+        )
+
+    # --- lookup / store (call with self._lock held) ---
+
+    def _lookup(self, key: Hashable) -> GraphState | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= self._clock():
+            self._drop(key)
+            self._expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return entry.value
+
+    def _store(self, key: Hashable, value: GraphState) -> None:
+        nbytes = len(value.model_dump_json())
+        if nbytes > self.max_bytes:
+            return  # would evict everything else and still not fit
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = _Entry(value=value, nbytes=nbytes, expires_at=self._clock() + self.ttl_s)
+        self._bytes += nbytes
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._evictions += 1
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes
+
+    # --- public API ---
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], GraphState]) -> GraphState:
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                self._misses += 1
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value  # type: ignore[return-value]
+
+        try:
+            flight.value = compute()
+            with self._lock:
+                self._store(key, flight.value)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    async def aget_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[GraphState]]) -> GraphState:
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            task = self._ainflight.get(key)
+            if task is None:
+                # its own task: no waiter's cancellation (leader included) can cancel the shared run
+                task = self._ainflight[key] = asyncio.ensure_future(self._arun(key, compute))
+                task.add_done_callback(_retrieve)
+                self._misses += 1
+            else:
+                self._coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _arun(self, key: Hashable, compute: Callable[[], Awaitable[GraphState]]) -> GraphState:
+        try:
+            value = await compute()
+            with self._lock:
+                self._store(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._ainflight.pop(key, None)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                coalesced=self._coalesced,
+                entries=len(self._entries),
+                bytes=self._bytes,
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
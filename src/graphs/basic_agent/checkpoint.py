@@ -0,0 +1,688 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Any, AsyncIterator, Iterator, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+from src.core import prefork
+from src.core.audit_sink import BatchWriter
+
+Typed = tuple[str, bytes]  # serde.dumps_typed() output
+WriteKey = tuple[str, int]  # (task_id, idx)
+WriteRow = tuple[str, str, Typed, str]  # (task_id, channel, value, task_path)
+
+
+@dataclass(frozen=True)
+class CheckpointStats:
+    backend: str
+    keep: int  # checkpoints kept per thread (older ones are compacted away)
+    threads: int  # threads held in memory
+    checkpoints: int
+    puts: int
+    compacted: int  # checkpoints dropped to stay within `keep`
+    evicted_threads: int  # LRU evictions from memory (sqlite: reloaded on next use)
+    loads: int  # threads read back from the database
+    # sqlite write queue (all zero for the memory backend)
+    enqueued: int = 0
+    dropped: int = 0
+    written: int = 0
+    batches: int = 0
+    queued: int = 0
+
+
+@dataclass(slots=True)
+class _Saved:
+    checkpoint_id: str
+    parent_id: str | None
+    checkpoint: Typed
+    metadata: Typed
+    writes: dict[WriteKey, WriteRow] = field(default_factory=dict)
+
+
+def _thread_config(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> RunnableConfig:
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+
+class MemoryCheckpointer(BaseCheckpointSaver[int]):
+    """
+    LangGraph checkpointer that keeps only the last `keep` checkpoints per thread.
+    - resuming needs the newest checkpoint and its pending writes; everything older is
+      dropped on put() (compaction), so storage per thread is bounded by `keep`
+    - at most `max_threads` threads are held, least recently used evicted first
+    - checkpoints are serialized once, in put(); the bytes are what reads decode and what
+      the SQLite backend persists
+    """
+
+    backend = "memory"
+
+    def __init__(self, *, keep: int = 2, max_threads: int = 10_000) -> None:
+        if keep < 1:
+            raise ValueError("keep must be >= 1")
+        super().__init__()
+        self.keep = keep
+        self.max_threads = max_threads
+        self._lock = threading.Lock()
+        # thread_id -> checkpoint_ns -> saved checkpoints, oldest first
+        self._threads: OrderedDict[str, dict[str, list[_Saved]]] = OrderedDict()
+        self._puts = 0
+        self._compacted = 0
+        self._evicted = 0
+        self._loads = 0
+
+    # --- persistence hooks (no-ops in memory) -------------------------------
+
+    def _persist_put(self, thread_id: str, checkpoint_ns: str, saved: _Saved) -> None:
+        pass
+
+    def _persist_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, rows: list[tuple[WriteKey, WriteRow]]) -> None:
+        pass
+
+    def _persist_delete(self, thread_id: str) -> None:
+        pass
+
+    def _load(self, thread_id: str) -> dict[str, list[_Saved]] | None:
+        return None
+
+    def _stored_thread_ids(self) -> list[str]:
+        return []
+
+    # --- memory --------------------------------------------------------------
+
+    def _namespaces(self, thread_id: str) -> dict[str, list[_Saved]]:
+        with self._lock:
+            spaces = self._threads.get(thread_id)
+            if spaces is not None:
+                self._threads.move_to_end(thread_id)
+                return spaces
+        loaded = self._load(thread_id)
+        with self._lock:
+            if loaded is not None:
+                self._loads += 1
+            # unknown threads are remembered as empty, so the next lookup skips the database
+            spaces = self._threads.setdefault(thread_id, loaded or {})
+            self._evict_locked()
+            return spaces
+
+    def _evict_locked(self) -> None:
+        while len(self._threads) > self.max_threads:
+            self._threads.popitem(last=False)
+            self._evicted += 1
+
+    def _tuple(self, thread_id: str, checkpoint_ns: str, saved: _Saved) -> CheckpointTuple:
+        loads = self.serde.loads_typed
+        return CheckpointTuple(
+            config=_thread_config(thread_id, checkpoint_ns, saved.checkpoint_id),
+            checkpoint=loads(saved.checkpoint),
+            metadata=loads(saved.metadata),
+            parent_config=_thread_config(thread_id, checkpoint_ns, saved.parent_id) if saved.parent_id else None,
+            pending_writes=[(task_id, channel, loads(value)) for task_id, channel, value, _ in saved.writes.values()],
+        )
+
+    # --- BaseCheckpointSaver -------------------------------------------------
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        spaces = self._namespaces(thread_id)
+        if not spaces:
+            return None
+        with self._lock:
+            saved = spaces.get(checkpoint_ns) or []
+            if checkpoint_id is None:
+                found = saved[-1] if saved else None
+            else:
+                found = next((s for s in saved if s.checkpoint_id == checkpoint_id), None)
+        return self._tuple(thread_id, checkpoint_ns, found) if found is not None else None
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        if config is not None:
+            thread_ids = [config["configurable"]["thread_id"]]
+            only_ns = config["configurable"].get("checkpoint_ns")
+            only_id = get_checkpoint_id(config)
+        else:
+            stored = self._stored_thread_ids()
+            with self._lock:
+                thread_ids = list(dict.fromkeys([*self._threads, *stored]))
+            only_ns = only_id = None
+        before_id = get_checkpoint_id(before) if before else None
+
+        for thread_id in thread_ids:
+            spaces = self._namespaces(thread_id)
+            with self._lock:
+                rows = [(ns, s) for ns, saved in spaces.items() if only_ns in (None, ns) for s in saved]
+            for checkpoint_ns, saved in sorted(rows, key=lambda r: r[1].checkpoint_id, reverse=True):
+                if only_id and saved.checkpoint_id != only_id:
+                    continue
+                if before_id and saved.checkpoint_id >= before_id:
+                    continue
+                tup = self._tuple(thread_id, checkpoint_ns, saved)
+                if filter and not all(tup.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                if limit is not None:
+                    if limit <= 0:
+                        return
+                    limit -= 1
+                yield tup
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        saved = _Saved(
+            checkpoint_id=checkpoint["id"],
+            parent_id=config["configurable"].get("checkpoint_id"),
+            checkpoint=self.serde.dumps_typed(checkpoint),
+            metadata=self.serde.dumps_typed(get_checkpoint_metadata(config, metadata)),
+        )
+        spaces = self._namespaces(thread_id)
+        with self._lock:
+            kept = spaces.setdefault(checkpoint_ns, [])
+            kept.append(saved)
+            if len(kept) > self.keep:
+                self._compacted += len(kept) - self.keep
+                del kept[: len(kept) - self.keep]
+            self._puts += 1
+        self._persist_put(thread_id, checkpoint_ns, saved)
+        return _thread_config(thread_id, checkpoint_ns, saved.checkpoint_id)
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        spaces = self._namespaces(thread_id)
+        with self._lock:
+            saved = next((s for s in spaces.get(checkpoint_ns, ()) if s.checkpoint_id == checkpoint_id), None)
+            if saved is None:  # already compacted away
+                return
+            rows: list[tuple[WriteKey, WriteRow]] = []
+            for idx, (channel, value) in enumerate(writes):
+                key = (task_id, WRITES_IDX_MAP.get(channel, idx))
+                if key[1] >= 0 and key in saved.writes:  # regular writes are saved once; special ones overwrite
+                    continue
+                row = (task_id, channel, self.serde.dumps_typed(value), task_path)
+                saved.writes[key] = row
+                rows.append((key, row))
+        if rows:
+            self._persist_writes(thread_id, checkpoint_ns, checkpoint_id, rows)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._threads.pop(thread_id, None)
+        self._persist_delete(thread_id)
+
+    # sync bodies are dict operations; only a cold SQLite load touches disk
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        if config["configurable"]["thread_id"] in self._threads:
+            return self.get_tuple(config)
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for tup in await asyncio.to_thread(lambda: [*self.list(config, filter=filter, before=before, limit=limit)]):
+            yield tup
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+
+    # --- lifecycle / introspection -------------------------------------------
+
+    def claim(self, thread_id: str) -> bool:
+        """Claim `thread_id` across processes for one run; False if another process holds it.
+        (Within a process run.py already serializes runs; in memory nothing is shared.)"""
+        return True
+
+    def unclaim(self, thread_id: str) -> None:
+        pass
+
+    async def aclaim(self, thread_id: str) -> bool:
+        return self.claim(thread_id)
+
+    async def aunclaim(self, thread_id: str) -> None:
+        self.unclaim(thread_id)
+
+    def release(self, thread_id: str) -> None:
+        """A run on `thread_id` finished (hook for backends shared between processes)."""
+
+    async def arelease(self, thread_id: str) -> None:
+        self.release(thread_id)
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+    def stats(self) -> CheckpointStats:
+        with self._lock:
+            return CheckpointStats(
+                backend=self.backend,
+                keep=self.keep,
+                threads=len(self._threads),
+                checkpoints=sum(len(saved) for spaces in self._threads.values() for saved in spaces.values()),
+                puts=self._puts,
+                compacted=self._compacted,
+                evicted_threads=self._evicted,
+                loads=self._loads,
+            )
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id       TEXT NOT NULL,
+    checkpoint_ns   TEXT NOT NULL,
+    checkpoint_id   TEXT NOT NULL,  -- uuid6: sorts in creation order
+    parent_id       TEXT,
+    checkpoint_type TEXT NOT NULL,
+    checkpoint      BLOB NOT NULL,
+    metadata_type   TEXT NOT NULL,
+    metadata        BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS checkpoint_writes (
+    thread_id     TEXT    NOT NULL,
+    checkpoint_ns TEXT    NOT NULL,
+    checkpoint_id TEXT    NOT NULL,
+    task_id       TEXT    NOT NULL,
+    idx           INTEGER NOT NULL,
+    channel       TEXT    NOT NULL,
+    value_type    TEXT    NOT NULL,
+    value         BLOB    NOT NULL,
+    task_path     TEXT    NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS thread_leases (
+    thread_id  TEXT    PRIMARY KEY,
+    owner      TEXT    NOT NULL,  -- checkpointer instance (one per worker)
+    pid        INTEGER NOT NULL,
+    expires_ms INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+_INSERT_CHECKPOINT = "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+_INSERT_WRITE = "INSERT OR REPLACE INTO checkpoint_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+# the oldest checkpoint id still kept for (thread_id, checkpoint_ns); NULL while fewer than `keep` exist
+_KEEP_FROM = (
+    "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+    " ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?"
+)
+
+
+class _CheckpointWriter(BatchWriter):
+    """
+    Writes queued checkpoint operations in one transaction per batch, compacting as it goes:
+    of the checkpoints a batch holds for one thread only the newest `keep` are inserted,
+    then anything older than the newest `keep` rows for that thread is deleted.
+    """
+
+    sink_name = "checkpoint"
+
+    def __init__(self, path: str, *, keep: int, batch_size: int, queue_size: int, synchronous: str, on_written: Any) -> None:
+        super().__init__(queue_size=queue_size, batch_size=batch_size, commit_window_s=0.005)
+        self.path = path
+        self.keep = keep
+        self.synchronous = synchronous
+        self._on_written = on_written
+        self._db = self._connect()
+        self._db.executescript(_SCHEMA)
+        self._start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def _write_batch(self, ops: list[Any]) -> None:
+        deleted: set[str] = set()
+        puts: dict[tuple[str, str], list[_Saved]] = {}
+        writes: dict[tuple[str, str], list[tuple[str, WriteKey, WriteRow]]] = {}
+        for op in ops:
+            if op[0] == "delete":
+                deleted.add(op[1])
+                for key in [k for k in puts if k[0] == op[1]]:
+                    del puts[key]
+                for key in [k for k in writes if k[0] == op[1]]:
+                    del writes[key]
+            elif op[0] == "put":
+                puts.setdefault((op[1], op[2]), []).append(op[3])
+            else:
+                writes.setdefault((op[1], op[2]), []).extend((op[3], key, row) for key, row in op[4])
+
+        checkpoint_rows = []
+        skipped: set[str] = set()
+        for (thread_id, ns), saved in puts.items():
+            skipped.update(s.checkpoint_id for s in saved[: -self.keep])
+            for s in saved[-self.keep:]:
+                checkpoint_rows.append(
+                    (thread_id, ns, s.checkpoint_id, s.parent_id, *s.checkpoint, *s.metadata)
+                )
+        write_rows = [
+            (thread_id, ns, checkpoint_id, task_id, idx, channel, *value, task_path)
+            for (thread_id, ns), rows in writes.items()
+            for checkpoint_id, (task_id, idx), (_, channel, value, task_path) in rows
+            if checkpoint_id not in skipped
+        ]
+
+        db = self._db
+        db.execute("BEGIN")
+        try:
+            for thread_id in deleted:
+                db.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+                db.execute("DELETE FROM checkpoint_writes WHERE thread_id = ?", (thread_id,))
+            db.executemany(_INSERT_CHECKPOINT, checkpoint_rows)
+            db.executemany(_INSERT_WRITE, write_rows)
+            for thread_id, ns in puts:
+                row = db.execute(_KEEP_FROM, (thread_id, ns, self.keep - 1)).fetchone()
+                if row is not None:
+                    for table in ("checkpoints", "checkpoint_writes"):
+                        db.execute(
+                            f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                            (thread_id, ns, row[0]),
+                        )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            self._on_written(ops)
+
+    def _close_destination(self) -> None:
+        self._db.close()
+
+    def _reopen_destination(self) -> None:
+        self._db = self._connect()
+
+
+class SqliteCheckpointer(MemoryCheckpointer):
+    """
+    MemoryCheckpointer backed by a SQLite (WAL) file, so runs survive a restart.
+    - memory stays the read path; put()/put_writes() only enqueue, and a writer thread
+      persists them in batches (see _CheckpointWriter), compacting to `keep` per thread
+    - a thread that is not in memory (evicted, or written by a previous process) is
+      loaded from the database on first use, after its queued writes are flushed
+    - like the audit store, a full queue drops the write (counted in stats().dropped);
+      the checkpoint is still served from memory until evicted
+    - in a prefork worker the file is shared with the other workers, so a thread is
+      flushed and dropped from memory when its run ends: the next run, on whichever
+      worker, loads it from the database
+    - shared, a run also holds a lease row on its thread (thread_leases, taken under
+      BEGIN IMMEDIATE), so two workers never run one thread at once; a lease is taken
+      over once it is older than `lease_s` or its worker process is gone
+    """
+
+    backend = "sqlite"
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        keep: int = 2,
+        max_threads: int = 10_000,
+        batch_size: int = 256,
+        queue_size: int = 10_000,
+        synchronous: str = "NORMAL",
+        lease_s: float = 300.0,
+    ) -> None:
+        super().__init__(keep=keep, max_threads=max_threads)
+        self.path = path
+        self.lease_s = lease_s
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._pending: Counter[str] = Counter()  # thread_id -> queued, unwritten ops
+        self._pending_lock = threading.Lock()
+        self._writer = _CheckpointWriter(
+            path,
+            keep=keep,
+            batch_size=batch_size,
+            queue_size=queue_size,
+            synchronous=synchronous,
+            on_written=self._written,
+        )
+        self._read_lock = threading.Lock()
+        self._reader = self._connect_reader()
+        self._shared = False
+        self._leases: sqlite3.Connection | None = None  # shared mode only
+        self._lease_lock = threading.Lock()
+        self._owner = uuid.uuid4().hex
+        prefork.register(self)
+
+    def _connect_reader(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA query_only=1")
+        return conn
+
+    def _enqueue(self, thread_id: str, op: tuple[Any, ...]) -> None:
+        with self._pending_lock:
+            self._pending[thread_id] += 1
+        if not self._writer.enqueue(op):
+            self._written([op])
+
+    def _written(self, ops: list[Any]) -> None:
+        with self._pending_lock:
+            self._pending.subtract(op[1] for op in ops)
+            self._pending += Counter()  # drop zero counts
+
+    def _persist_put(self, thread_id: str, checkpoint_ns: str, saved: _Saved) -> None:
+        self._enqueue(thread_id, ("put", thread_id, checkpoint_ns, saved))
+
+    def _persist_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, rows: list[tuple[WriteKey, WriteRow]]) -> None:
+        self._enqueue(thread_id, ("writes", thread_id, checkpoint_ns, checkpoint_id, rows))
+
+    def _persist_delete(self, thread_id: str) -> None:
+        self._enqueue(thread_id, ("delete", thread_id))
+
+    def _load(self, thread_id: str) -> dict[str, list[_Saved]] | None:
+        with self._pending_lock:
+            pending = self._pending[thread_id] > 0
+        if pending:
+            self._writer.flush()
+        with self._read_lock:
+            checkpoints = self._reader.execute(
+                "SELECT checkpoint_ns, checkpoint_id, parent_id, checkpoint_type, checkpoint, metadata_type, metadata"
+                " FROM checkpoints WHERE thread_id = ? ORDER BY checkpoint_ns, checkpoint_id",
+                (thread_id,),
+            ).fetchall()
+            writes = self._reader.execute(
+                "SELECT checkpoint_ns, checkpoint_id, task_id, idx, channel, value_type, value, task_path"
+                " FROM checkpoint_writes WHERE thread_id = ?",
+                (thread_id,),
+            ).fetchall()
+        if not checkpoints:
+            return None
+        spaces: dict[str, list[_Saved]] = {}
+        by_id: dict[tuple[str, str], _Saved] = {}
+        for ns, checkpoint_id, parent_id, c_type, c, m_type, m in checkpoints:
+            saved = _Saved(checkpoint_id, parent_id, (c_type, c), (m_type, m))
+            spaces.setdefault(ns, []).append(saved)
+            by_id[(ns, checkpoint_id)] = saved
+        for ns, checkpoint_id, task_id, idx, channel, v_type, v, task_path in writes:
+            if (saved := by_id.get((ns, checkpoint_id))) is not None:
+                saved.writes[(task_id, idx)] = (task_id, channel, (v_type, v), task_path)
+        for ns in spaces:
+            spaces[ns] = spaces[ns][-self.keep:]
+        return spaces
+
+    def _stored_thread_ids(self) -> list[str]:
+        self._writer.flush()
+        with self._read_lock:
+            return [r[0] for r in self._reader.execute("SELECT DISTINCT thread_id FROM checkpoints")]
+
+    def release(self, thread_id: str) -> None:
+        if not self._shared:
+            return
+        with self._pending_lock:
+            pending = self._pending[thread_id] > 0
+        if pending:
+            self._writer.flush()
+        with self._lock:
+            self._threads.pop(thread_id, None)
+
+    async def arelease(self, thread_id: str) -> None:
+        if self._shared:
+            await asyncio.to_thread(self.release, thread_id)
+
+    def claim(self, thread_id: str) -> bool:
+        if self._leases is None:
+            return True
+        now_ms = int(time.time() * 1000)
+        with self._lease_lock:
+            db = self._leases
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT owner, pid, expires_ms FROM thread_leases WHERE thread_id = ?", (thread_id,)
+                ).fetchone()
+                held = row is not None and row[0] != self._owner and row[2] > now_ms and _pid_alive(row[1])
+                if not held:
+                    db.execute(
+                        "INSERT OR REPLACE INTO thread_leases VALUES (?, ?, ?, ?)",
+                        (thread_id, self._owner, os.getpid(), now_ms + int(self.lease_s * 1000)),
+                    )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return not held
+
+    def unclaim(self, thread_id: str) -> None:
+        if self._leases is None:
+            return
+        with self._lease_lock:
+            self._leases.execute("DELETE FROM thread_leases WHERE thread_id = ? AND owner = ?", (thread_id, self._owner))
+
+    async def aclaim(self, thread_id: str) -> bool:
+        return True if self._leases is None else await asyncio.to_thread(self.claim, thread_id)
+
+    async def aunclaim(self, thread_id: str) -> None:
+        if self._leases is not None:
+            await asyncio.to_thread(self.unclaim, thread_id)
+
+    def _connect_leases(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _before_fork(self) -> None:
+        self._reader.close()  # the writer (registered on its own) drains and closes itself
+        if self._leases is not None:
+            self._leases.close()
+
+    def _after_fork(self, in_child: bool) -> None:
+        self._reader = self._connect_reader()
+        if in_child:
+            self._read_lock = threading.Lock()
+            self._pending_lock = threading.Lock()
+            self._pending = Counter()
+            self._shared = True
+            self._lease_lock = threading.Lock()
+            self._owner = uuid.uuid4().hex
+        if self._shared:
+            self._leases = self._connect_leases()
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        return self._writer.flush(timeout)
+
+    def close(self) -> None:
+        self._writer.close()
+        self._reader.close()
+        if self._leases is not None:
+            self._leases.close()
+
+    def stats(self) -> CheckpointStats:
+        w = self._writer
+        return replace(
+            super().stats(),
+            enqueued=w._enqueued,
+            dropped=w._dropped,
+            written=w._written,
+            batches=w._batches,
+            queued=w._queue.qsize(),
+        )
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def checkpointer_from_env() -> MemoryCheckpointer:
+    """RUN_CHECKPOINT_DB_PATH set: SqliteCheckpointer at that path; otherwise in memory."""
+    keep = int(os.getenv("RUN_CHECKPOINT_KEEP", "2"))
+    max_threads = int(os.getenv("RUN_CHECKPOINT_MAX_THREADS", "10000"))
+    path = os.getenv("RUN_CHECKPOINT_DB_PATH")
+    if not path:
+        return MemoryCheckpointer(keep=keep, max_threads=max_threads)
+    return SqliteCheckpointer(
+        path,
+        keep=keep,
+        max_threads=max_threads,
+        batch_size=int(os.getenv("RUN_CHECKPOINT_BATCH_SIZE", "256")),
+        queue_size=int(os.getenv("RUN_CHECKPOINT_QUEUE_SIZE", "10000")),
+        synchronous=os.getenv("RUN_CHECKPOINT_SYNCHRONOUS", "NORMAL"),
+        lease_s=float(os.getenv("RUN_CHECKPOINT_LEASE_S", "300")),
+    )
@@ -1,35 +1,67 @@
 from __future__ import annotations
 
+import hashlib
+import inspect
+import sys
 from typing import Any, Literal
 
 from langgraph.graph import END, StateGraph
 
-from .nodes import plan, verify, finish
-from .state import GraphState
+from .nodes import afinish, aplan, averify, finish, plan, verify
+from .state import AnyGraphState, GraphState, GraphStateLite
 
+# "strict":   every node/router input is a strictly validated GraphState
+# "boundary": GraphStateLite inside the graph; GraphState only at entry/exit (run.py)
+StateMode = Literal["strict", "boundary"]
 
-def _make_state_graph() -> StateGraph:
+_STATE_SCHEMAS: dict[str, type] = {"strict": GraphState, "boundary": GraphStateLite}
+
+
+def _make_state_graph(state_schema: type = GraphState) -> StateGraph:
     """
     LangGraph has had small API variations across versions.
     This keeps your code resilient without changing behavior.
     """
     try:
-        return StateGraph(GraphState)  # common form
+        return StateGraph(state_schema)  # common form
     except TypeError:
-        return StateGraph(state_schema=GraphState)  # some versions
+        return StateGraph(state_schema=state_schema)  # some versions
 
 
-def _route_after_verify(state: GraphState) -> Literal["plan", "finish"]:
+def _route_after_verify(state: AnyGraphState) -> Literal["plan", "finish"]:
     # stop when step >= max_steps (step increments in plan)
     return "finish" if state.step >= state.max_steps else "plan"
 
 
-def build_graph() -> Any:
-    g = _make_state_graph()
+def _node(sync_fn: Any, async_fn: Any) -> Any:
+    """
+    One node, two implementations: invoke() calls sync_fn, ainvoke()/astream() await async_fn.
+    RunnableCallable is what add_node() itself wraps plain functions in (no callback tracing);
+    its import path moved across LangGraph versions, so fall back to the public RunnableLambda.
+    """
+    try:
+        from langgraph._internal._runnable import RunnableCallable  # langgraph>=1.0
+    except ImportError:
+        try:
+            from langgraph.utils.runnable import RunnableCallable  # older versions
+        except ImportError:
+            from langchain_core.runnables import RunnableLambda
+            return RunnableLambda(sync_fn, afunc=async_fn)
+    return RunnableCallable(sync_fn, async_fn, name=sync_fn.__name__, trace=False)
+
 
-    g.add_node("plan", plan)
-    g.add_node("verify", verify)
-    g.add_node("finish", finish)
+def build_graph(state_mode: StateMode = "strict", checkpointer: Any = None) -> Any:
+    """
+    checkpointer: a LangGraph checkpoint saver (see checkpoint.py); when set, every
+    invocation needs a configurable thread_id and state is saved after each superstep.
+    """
+    if state_mode not in _STATE_SCHEMAS:
+        raise ValueError(f"unknown state_mode: {state_mode}")
+    g = _make_state_graph(_STATE_SCHEMAS[state_mode])
+
+    g.add_node("plan", _node(plan, aplan))
+    g.add_node("verify", _node(verify, averify))
+    g.add_node("finish", _node(finish, afinish))
 
     g.set_entry_point("plan")
     g.add_edge("plan", "verify")
@@ -40,4 +72,49 @@ def build_graph() -> Any:
     )
     g.add_edge("finish", END)
 
-    return g.compile()
+    return g.compile(checkpointer=checkpointer)
+
+
+def _source_modules(graph: Any) -> set[str]:
+    """Modules whose code defines the graph: node/branch functions, the state schema, this file."""
+    names = {__name__}
+    builder = getattr(graph, "builder", None)
+    if builder is None:
+        return names
+    names.add(builder.state_schema.__module__)
+    for spec in builder.nodes.values():
+        for fn in (getattr(spec.runnable, "func", None), getattr(spec.runnable, "afunc", None)):
+            if fn is not None:
+                names.add(fn.__module__)
+    for branches in builder.branches.values():
+        for branch in branches.values():
+            fn = getattr(branch.path, "func", None)
+            if fn is not None:
+                names.add(fn.__module__)
+    return names
+
+
+def graph_fingerprint(graph: Any) -> str:
+    """
+    Stable hash of a compiled graph: topology (nodes + edges) and the source of
+    every module that defines its nodes, routing and state.
+    Changes whenever build_graph wiring or node code changes; used as a cache key part.
+    """
+    h = hashlib.sha256()
+    drawable = graph.get_graph()
+    builder = getattr(graph, "builder", None)
+    if builder is not None:
+        h.update(f"state:{builder.state_schema.__qualname__}\n".encode())
+    for node_id in sorted(drawable.nodes):
+        h.update(f"node:{node_id}\n".encode())
+    for edge in sorted((e.source, e.target, bool(e.conditional)) for e in drawable.edges):
+        h.update(f"edge:{edge}\n".encode())
+    for name in sorted(_source_modules(graph)):
+        module = sys.modules.get(name)
+        try:
+            source = inspect.getsource(module) if module else name
+        except (OSError, TypeError):  # no source on disk (frozen/REPL): fall back to the name
+            source = name
+        h.update(f"module:{name}\n".encode())
+        h.update(source.encode())
+    return h.hexdigest()[:16]
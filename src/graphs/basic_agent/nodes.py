@@ -1,9 +1,16 @@
 from __future__ import annotations
 
-import time
+import inspect
+import sys
 from typing import Any, Callable, Dict
 
-from .state import GraphState
+from langgraph.config import get_stream_writer
+
+from src.middleware import profiling
+from src.middleware.metrics import NODE_DURATION
+from src.middleware.spans import Span
+
+from .state import AnyGraphState
 
 # Import your Day 2 JSON logger (adjust import to your repo)
 # from src.app.logging import get_logger
@@ -11,52 +18,132 @@ import logging
 logger = logging.getLogger("app")
 
 
+def _stream_node_end(node_name: str, status: str, duration_ms: int) -> None:
+    # Delivered only when the caller streams with stream_mode "custom" (see stream_graph).
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:  # node called outside a graph run
+        return
+    writer({"event": "node_end", "node": node_name, "status": status, "duration_ms": duration_ms})
+
+
+def _node_span(node_name: str) -> Callable[[Any], Any]:
+    """
+    Wraps a node with node_start/node_end logs + duration_ms.
+    Works for both sync and async nodes (async nodes stay awaitable).
+    Timing comes from a kind="node" Span, so the node nests under the graph/request
+    span in the trace store; node_end is also pushed to the graph's custom stream
+    for /run/stream, and the duration recorded in graph_node_duration_seconds.
+    In a profiled trace the Span also profiles the node (attrs["profile"]).
+    """
+    ok_hist = NODE_DURATION.labels(node_name, "ok")
+    error_hist = NODE_DURATION.labels(node_name, "error")
+    attrs = {"node": node_name}
+
+    def _start(state: AnyGraphState) -> Span:
+        logger.info(
+            "node_start",
+            extra={"trace_id": state.trace_id, "node": node_name, "status": "start"},
+        )
+        return Span(node_name, state.trace_id, kind="node", attrs=attrs, log=False).__enter__()
 
-def _node_span(node_name: str) -> Callable[[Callable[[GraphState], Dict[str, Any]]], Callable[[GraphState], Dict[str, Any]]]:
-    def deco(fn: Callable[[GraphState], Dict[str, Any]]) -> Callable[[GraphState], Dict[str, Any]]:
-        def wrapped(state: GraphState) -> Dict[str, Any]:
-            t0 = time.perf_counter()
-            logger.info(
-                "node_start",
-                extra={"trace_id": state.trace_id, "node": node_name, "status": "start"},
-            )
+    def _ok(state: AnyGraphState, span: Span) -> None:
+        span.__exit__(None, None, None)
+        ok_hist.observe(span.duration_ns / 1e9)
+        dt_ms = span.duration_ms
+        logger.info(
+            "node_end",
+            extra={"trace_id": state.trace_id, "node": node_name, "status": "ok", "duration_ms": dt_ms},
+        )
+        _stream_node_end(node_name, "ok", dt_ms)
+
+    def _error(state: AnyGraphState, span: Span) -> None:
+        span.__exit__(*sys.exc_info())
+        error_hist.observe(span.duration_ns / 1e9)
+        dt_ms = span.duration_ms
+        logger.exception(
+            "node_end",
+            extra={"trace_id": state.trace_id, "node": node_name, "status": "error", "duration_ms": dt_ms},
+        )
+        _stream_node_end(node_name, "error", dt_ms)
+
+    profiling.hide(_ok, _error)  # they close the span, so they are on the stack when a profile stops
+
+    def deco(fn: Any) -> Any:
+        if inspect.iscoroutinefunction(fn):
+            async def awrapped(state: AnyGraphState) -> Dict[str, Any]:
+                span = _start(state)
+                try:
+                    patch = await fn(state)
+                except Exception:
+                    _error(state, span)
+                    raise
+                _ok(state, span)
+                return patch
+            return awrapped
+
+        def wrapped(state: AnyGraphState) -> Dict[str, Any]:
+            span = _start(state)
             try:
                 patch = fn(state)
-                dt_ms = int((time.perf_counter() - t0) * 1000)
-                logger.info(
-                    "node_end",
-                    extra={"trace_id": state.trace_id, "node": node_name, "status": "ok", "duration_ms": dt_ms},
-                )
-                return patch
             except Exception:
-                dt_ms = int((time.perf_counter() - t0) * 1000)
-                logger.exception(
-                    "node_end",
-                    extra={"trace_id": state.trace_id, "node": node_name, "status": "error", "duration_ms": dt_ms},
-                )
+                _error(state, span)
                 raise
+            _ok(state, span)
+            return patch
         return wrapped
     return deco
 
 
-@_node_span("plan")
-def plan(state: GraphState) -> Dict[str, Any]:
+# --- node logic (shared by the sync and async variants) ---
+# Nodes return only their history delta; GraphState's reducer appends it.
+
+def _plan(state: AnyGraphState) -> Dict[str, Any]:
     # Failure path requirement:
     if state.input == "fail":
         raise RuntimeError("forced failure for Day 4 proof")
 
-    new_history = [*state.history, "plan"]
-    return {"history": new_history, "step": state.step + 1}
+    return {"history": ["plan"], "step": state.step + 1}
+
+
+def _verify(state: AnyGraphState) -> Dict[str, Any]:
+    return {"history": ["verify"]}
+
+
+def _finish(state: AnyGraphState) -> Dict[str, Any]:
+    # deterministic result
+    return {"history": ["finish"], "status": "done", "result": f"ok:{state.input}"}
+
+
+# --- sync nodes (graph.invoke) ---
+
+@_node_span("plan")
+def plan(state: AnyGraphState) -> Dict[str, Any]:
+    return _plan(state)
 
 
 @_node_span("verify")
-def verify(state: GraphState) -> Dict[str, Any]:
-    new_history = [*state.history, "verify"]
-    return {"history": new_history}
+def verify(state: AnyGraphState) -> Dict[str, Any]:
+    return _verify(state)
 
 
 @_node_span("finish")
-def finish(state: GraphState) -> Dict[str, Any]:
-    new_history = [*state.history, "finish"]
-    # deterministic result
-    return {"history": new_history, "status": "done", "result": f"ok:{state.input}"}
+def finish(state: AnyGraphState) -> Dict[str, Any]:
+    return _finish(state)
+
+
+# --- async nodes (graph.ainvoke / astream): run on the event loop, no thread hop ---
+
+@_node_span("plan")
+async def aplan(state: AnyGraphState) -> Dict[str, Any]:
+    return _plan(state)
+
+
+@_node_span("verify")
+async def averify(state: AnyGraphState) -> Dict[str, Any]:
+    return _verify(state)
+
+
+@_node_span("finish")
+async def afinish(state: AnyGraphState) -> Dict[str, Any]:
+    return _finish(state)
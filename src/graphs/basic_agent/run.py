@@ -1,16 +1,329 @@
 from __future__ import annotations
 
-from .graph import build_graph
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterator, Literal, Sequence
+
+from langgraph.types import Command
+
+from src.middleware.spans import Span
+
+from .cache import CacheStats, GraphResultCache
+from .checkpoint import CheckpointStats, checkpointer_from_env
+from .graph import build_graph, graph_fingerprint
 from .state import GraphState
 
+logger = logging.getLogger("app")
+
+# Upper bound for run_graph_batch; callers may ask for less, never more.
+MAX_BATCH_CONCURRENCY = int(os.getenv("RUN_BATCH_MAX_CONCURRENCY", "8"))
+
+# "strict" (default) validates GraphState on every transition; "boundary" validates
+# only here, at graph entry (GraphState(...)) and exit (GraphState.model_validate).
+STATE_MODE = os.getenv("GRAPH_STATE_MODE", "strict")
+
+_GRAPH = build_graph(STATE_MODE)  # type: ignore[arg-type]
+_GRAPH_FINGERPRINT = graph_fingerprint(_GRAPH)
+
+# Optional result cache (off by default). The graph is deterministic for a given
+# (input, max_steps), so a finished state can be replayed for a new trace_id.
+_CACHE: GraphResultCache | None = (
+    GraphResultCache.from_env() if os.getenv("RUN_CACHE_ENABLED", "").lower() in ("1", "true") else None
+)
+
+
+# Runs with a thread_id go through a checkpointed copy of the graph: state is saved after
+# every node, so rerunning a failed thread resumes after its last completed node.
+# (Runs without one keep the checkpoint-free graph: no per-node serialization.)
+_CHECKPOINTER = checkpointer_from_env()
+_THREAD_GRAPH = build_graph(STATE_MODE, checkpointer=_CHECKPOINTER)  # type: ignore[arg-type]
+
+_ACTIVE_THREADS: set[str] = set()
+_ACTIVE_LOCK = threading.Lock()
+
+
+class ThreadBusyError(RuntimeError):
+    """Another run is already executing on this thread_id."""
+
+
+def cache_stats() -> CacheStats | None:
+    return _CACHE.stats() if _CACHE is not None else None
+
+
+def checkpoint_stats() -> CheckpointStats:
+    return _CHECKPOINTER.stats()
+
+
+def _run_config(max_steps: int) -> dict[str, Any]:
+    # every loop is 2 supersteps (plan, verify) + finish; LangGraph's default limit (25) caps max_steps at ~11
+    return {"recursion_limit": 2 * max_steps + 2}
+
+
+def _cache_key(input: str, max_steps: int) -> tuple[str, int, str]:
+    return (input, max_steps, _GRAPH_FINGERPRINT)
+
+
+def _restamp(final: GraphState, trace_id: str) -> GraphState:
+    # cached states belong to whichever trace computed them first
+    if final.trace_id == trace_id:
+        return final
+    return final.model_copy(update={"trace_id": trace_id}, deep=True)
+
+
+def _claim_local(thread_id: str) -> None:
+    # two runs on one thread would fork its checkpoints
+    with _ACTIVE_LOCK:
+        if thread_id in _ACTIVE_THREADS:
+            raise ThreadBusyError(thread_id)
+        _ACTIVE_THREADS.add(thread_id)
+
+
+def _unclaim_local(thread_id: str) -> None:
+    with _ACTIVE_LOCK:
+        _ACTIVE_THREADS.discard(thread_id)
+
+
+@contextmanager
+def _claim_thread(thread_id: str) -> Iterator[None]:
+    # this process first, then the checkpointer (a lease when prefork workers share the db)
+    _claim_local(thread_id)
+    try:
+        if not _CHECKPOINTER.claim(thread_id):
+            raise ThreadBusyError(thread_id)
+        try:
+            yield
+        finally:
+            _CHECKPOINTER.unclaim(thread_id)
+    finally:
+        _unclaim_local(thread_id)
+
+
+@asynccontextmanager
+async def _aclaim_thread(thread_id: str) -> AsyncIterator[None]:
+    _claim_local(thread_id)
+    try:
+        if not await _CHECKPOINTER.aclaim(thread_id):
+            raise ThreadBusyError(thread_id)
+        try:
+            yield
+        finally:
+            await _CHECKPOINTER.aunclaim(thread_id)
+    finally:
+        _unclaim_local(thread_id)
+
+
+def _thread_config(thread_id: str, max_steps: int) -> dict[str, Any]:
+    return {**_run_config(max_steps), "configurable": {"thread_id": thread_id}}
+
+
+ThreadStart = Literal["fresh", "resume", "done"]
 
-_GRAPH = build_graph()
 
+def _thread_start(thread_id: str, values: dict[str, Any], pending: tuple[str, ...], state_in: GraphState) -> tuple[ThreadStart, Any]:
+    """
+    What to feed the checkpointed graph, given the thread's latest saved state:
+    - same input/max_steps, nodes still pending (failed or interrupted): resume after the
+      last completed node; the Command re-stamps the state with this request's trace_id
+    - same input/max_steps, finished: nothing to run, the saved final state is the answer
+    - anything else (new thread, different request): start over from state_in
+    """
+    if values and values.get("input") == state_in.input and values.get("max_steps") == state_in.max_steps:
+        if pending:
+            return "resume", Command(update={"trace_id": state_in.trace_id})
+        return "done", _restamp(GraphState.model_validate(values), state_in.trace_id)
+    if values:
+        _CHECKPOINTER.delete_thread(thread_id)
+    return "fresh", state_in
 
-def run_graph(input: str, trace_id: str) -> GraphState:
+
+def _run_thread(state_in: GraphState, thread_id: str) -> GraphState:
+    config = _thread_config(thread_id, state_in.max_steps)
+    with _claim_thread(thread_id):
+        try:
+            snapshot = _THREAD_GRAPH.get_state(config)
+            start, graph_in = _thread_start(thread_id, snapshot.values, snapshot.next, state_in)
+            attrs = {"max_steps": state_in.max_steps, "thread_id": thread_id, "start": start}
+            with Span("graph", state_in.trace_id, kind="graph", attrs=attrs, log=False):
+                if start == "done":
+                    return graph_in
+                return GraphState.model_validate(_THREAD_GRAPH.invoke(graph_in, config))
+        finally:
+            _CHECKPOINTER.release(thread_id)
+
+
+async def _arun_thread(state_in: GraphState, thread_id: str) -> GraphState:
+    config = _thread_config(thread_id, state_in.max_steps)
+    async with _aclaim_thread(thread_id):
+        try:
+            snapshot = await _THREAD_GRAPH.aget_state(config)
+            start, graph_in = _thread_start(thread_id, snapshot.values, snapshot.next, state_in)
+            attrs = {"max_steps": state_in.max_steps, "thread_id": thread_id, "start": start}
+            async with Span("graph", state_in.trace_id, kind="graph", attrs=attrs, log=False):
+                if start == "done":
+                    return graph_in
+                return GraphState.model_validate(await _THREAD_GRAPH.ainvoke(graph_in, config))
+        finally:
+            await _CHECKPOINTER.arelease(thread_id)
+
+
+def run_graph(input: str, trace_id: str, max_steps: int = 3, thread_id: str | None = None) -> GraphState:
+    """
+    thread_id: checkpoint the run under this id; calling again with the same thread_id
+    (and the same input/max_steps) resumes a failed run instead of starting over.
+    Threaded runs bypass the result cache.
+    """
     if not trace_id:
         raise ValueError("trace_id is required")
 
-    state_in = GraphState(trace_id=trace_id, input=input, step=0, max_steps=3, history=[])
-    out = _GRAPH.invoke(state_in)
-    return GraphState.model_validate(out)
+    state_in = GraphState(trace_id=trace_id, input=input, step=0, max_steps=max_steps, history=[])
+    if thread_id:
+        return _run_thread(state_in, thread_id)
+
+    def compute() -> GraphState:
+        return GraphState.model_validate(_GRAPH.invoke(state_in, _run_config(max_steps)))
+
+    with Span("graph", trace_id, kind="graph", attrs={"max_steps": max_steps}, log=False):
+        if _CACHE is None:
+            return compute()
+        final = _CACHE.get_or_compute(_cache_key(input, state_in.max_steps), compute)
+    return _restamp(final, trace_id)
+
+
+async def run_graph_async(input: str, trace_id: str, max_steps: int = 3, thread_id: str | None = None) -> GraphState:
+    """
+    Same contract as run_graph, but awaits the async nodes via ainvoke,
+    so a run holds no threadpool slot while it executes.
+    """
+    if not trace_id:
+        raise ValueError("trace_id is required")
+
+    state_in = GraphState(trace_id=trace_id, input=input, step=0, max_steps=max_steps, history=[])
+    if thread_id:
+        return await _arun_thread(state_in, thread_id)
+
+    async def compute() -> GraphState:
+        return GraphState.model_validate(await _GRAPH.ainvoke(state_in, _run_config(max_steps)))
+
+    async with Span("graph", trace_id, kind="graph", attrs={"max_steps": max_steps}, log=False):
+        if _CACHE is None:
+            return await compute()
+        final = await _CACHE.aget_or_compute(_cache_key(input, state_in.max_steps), compute)
+    return _restamp(final, trace_id)
+
+
+@dataclass(frozen=True)
+class NodeEvent:
+    node: str
+    step: int
+    history: list[str]  # entries this node appended (delta, not the full history)
+    duration_ms: int | None
+
+
+async def stream_graph(
+    input: str, trace_id: str, max_steps: int = 3, thread_id: str | None = None
+) -> AsyncIterator[NodeEvent | GraphState]:
+    """
+    Drives the graph with astream and yields one NodeEvent per completed node,
+    as soon as it completes, then the final GraphState as the last item.
+    Node failures propagate as exceptions (same as run_graph_async).
+    With a thread_id, a resumed run streams only the nodes it still has to run.
+    """
+    if not trace_id:
+        raise ValueError("trace_id is required")
+
+    state_in = GraphState(trace_id=trace_id, input=input, step=0, max_steps=max_steps, history=[])
+    if not thread_id:
+        async for item in _stream(_GRAPH, state_in, _run_config(max_steps), dict(state_in)):
+            yield item
+        return
+
+    config = _thread_config(thread_id, max_steps)
+    async with _aclaim_thread(thread_id):
+        try:
+            snapshot = await _THREAD_GRAPH.aget_state(config)
+            start, graph_in = _thread_start(thread_id, snapshot.values, snapshot.next, state_in)
+            if start == "done":
+                yield graph_in
+                return
+            values = {**snapshot.values, "trace_id": trace_id} if start == "resume" else dict(state_in)
+            async for item in _stream(_THREAD_GRAPH, graph_in, config, values):
+                yield item
+        finally:
+            await _CHECKPOINTER.arelease(thread_id)
+
+
+async def _stream(graph: Any, graph_in: Any, config: dict[str, Any], values: dict[str, Any]) -> AsyncIterator[NodeEvent | GraphState]:
+    durations: dict[str, int] = {}
+    stream = graph.astream(graph_in, config, stream_mode=["custom", "updates", "values"])
+    async for mode, chunk in stream:
+        if mode == "custom" and chunk.get("event") == "node_end":
+            # emitted by _node_span just before the node's own update
+            durations[chunk["node"]] = chunk["duration_ms"]
+        elif mode == "updates":
+            for node, patch in chunk.items():
+                patch = patch or {}
+                yield NodeEvent(
+                    node=node,
+                    step=patch.get("step", values.get("step", 0)),
+                    history=list(patch.get("history", [])),  # nodes already return only their delta
+                    duration_ms=durations.pop(node, None),
+                )
+        elif mode == "values":
+            values = chunk
+
+    yield GraphState.model_validate(values)
+
+
+@dataclass(frozen=True)
+class BatchItem:
+    input: str
+    trace_id: str
+    max_steps: int = 3
+    thread_id: str | None = None
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    index: int
+    trace_id: str
+    status: Literal["done", "error"]
+    result: str | None
+
+
+def _run_batch_item(index: int, item: BatchItem) -> BatchResult:
+    # One failing input must not fail the batch: errors become status="error".
+    start_ns = time.perf_counter_ns()
+    try:
+        final = run_graph(input=item.input, trace_id=item.trace_id, max_steps=item.max_steps, thread_id=item.thread_id)
+        res = BatchResult(index=index, trace_id=item.trace_id, status=final.status, result=final.result)
+    except Exception:
+        logger.exception("run_error", extra={"trace_id": item.trace_id})
+        res = BatchResult(index=index, trace_id=item.trace_id, status="error", result=None)
+    # the item's own trace end (no request_end carries its trace_id): tail sampling decides here
+    duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+    logger.info("batch_item_end", extra={"trace_id": item.trace_id, "status": res.status, "duration_ms": duration_ms})
+    return res
+
+
+def run_graph_batch(items: Sequence[BatchItem], *, max_concurrency: int | None = None) -> Iterator[BatchResult]:
+    """
+    Run many inputs through the compiled graph concurrently.
+    - At most `max_concurrency` graphs run at once (capped by RUN_BATCH_MAX_CONCURRENCY)
+    - Results are yielded in completion order; `index` points back into `items`
+    - Closing the iterator early cancels items that have not started yet
+    """
+    if not items:
+        return
+    limit = min(max_concurrency or MAX_BATCH_CONCURRENCY, MAX_BATCH_CONCURRENCY, len(items))
+    pool = ThreadPoolExecutor(max_workers=max(limit, 1), thread_name_prefix="run-batch")
+    try:
+        futures = [pool.submit(_run_batch_item, i, item) for i, item in enumerate(items)]
+        for fut in as_completed(futures):
+            yield fut.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -1,7 +1,107 @@
 from __future__ import annotations
 
-from typing import Literal
-from pydantic import BaseModel, ConfigDict, Field
+import threading
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Annotated, Any, Iterable, Iterator, Literal, Sequence, Union, overload
+
+from pydantic import BaseModel, ConfigDict, Field, GetCoreSchemaHandler
+from pydantic_core import core_schema
+
+_EXTEND_LOCK = threading.Lock()
+
+
+class History(Sequence[str]):
+    """
+    Append-only, array-backed node history.
+
+    Each History is an immutable view of the first `n` items of a shared buffer.
+    Extending the newest view appends to the buffer in place (amortized O(1));
+    extending an older view copies first, so earlier snapshots never change.
+    Validating an existing History is an isinstance check, so per-step state
+    coercion no longer re-validates the whole list.
+    """
+
+    __slots__ = ("_buf", "_n")
+
+    def __init__(self, items: Iterable[str] = ()) -> None:
+        self._buf: list[str] = list(items)
+        self._n = len(self._buf)
+
+    @classmethod
+    def _view(cls, buf: list[str], n: int) -> History:
+        h = cls.__new__(cls)
+        h._buf = buf
+        h._n = n
+        return h
+
+    def extend(self, items: Iterable[str]) -> History:
+        items = list(items)
+        if not items:
+            return self
+        with _EXTEND_LOCK:
+            if len(self._buf) == self._n:
+                self._buf.extend(items)
+                buf = self._buf
+            else:
+                buf = [*self._buf[: self._n], *items]
+        return History._view(buf, self._n + len(items))
+
+    def __len__(self) -> int:
+        return self._n
+
+    @overload
+    def __getitem__(self, i: int) -> str: ...
+    @overload
+    def __getitem__(self, i: slice) -> list[str]: ...
+    def __getitem__(self, i: int | slice) -> str | list[str]:
+        if isinstance(i, slice):
+            return self._buf[: self._n][i]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("history index out of range")
+        return self._buf[i]
+
+    def __iter__(self) -> Iterator[str]:
+        return islice(self._buf, self._n)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (History, list, tuple)):
+            return len(other) == self._n and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"History({list(self)!r})"
+
+    # views are immutable: copies can share the buffer
+    def __copy__(self) -> History:
+        return self
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> History:
+        return self
+
+    # namedtuple protocol: LangGraph's checkpoint serializer stores (module, class, _asdict())
+    # and rebuilds with History(**kwargs), so checkpointed state round-trips as a History
+    def _asdict(self) -> dict[str, list[str]]:
+        return {"items": list(self)}
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        from_list = core_schema.no_info_after_validator_function(
+            cls, core_schema.list_schema(core_schema.str_schema())
+        )
+        return core_schema.union_schema(
+            [core_schema.is_instance_schema(cls), from_list],
+            serialization=core_schema.plain_serializer_function_ser_schema(list),
+        )
+
+
+def append_history(left: History | None, right: Iterable[str]) -> History:
+    """LangGraph reducer: nodes return only the entries they add."""
+    if left is None:
+        left = History()
+    return left.extend(right)
 
 
 class GraphState(BaseModel):
@@ -15,8 +115,33 @@ class GraphState(BaseModel):
     input: str = ""  # added
     step: int = 0
     max_steps: int = 3
-    history: list[str] = Field(default_factory=list)
+    # nodes return {"history": ["<node>"]}; the reducer appends (see History)
+    history: Annotated[History, append_history] = Field(default_factory=History)
 
     status: Literal["done", "error"] = "done"  # added
     result: str | None = None  # added
 
+
+@dataclass(slots=True)
+class GraphStateLite:
+    """
+    Unvalidated mirror of GraphState for "boundary" state mode.
+    LangGraph rebuilds the state object before every node and router; with this
+    schema that is a plain slots-dataclass construction instead of a strict
+    Pydantic validation. Inputs/outputs are still validated as GraphState at the
+    graph boundary (see run.py), so the field list must match GraphState exactly.
+    """
+
+    trace_id: str
+    input: str = ""
+    step: int = 0
+    max_steps: int = 3
+    history: Annotated[History, append_history] = field(default_factory=History)
+
+    status: Literal["done", "error"] = "done"
+    result: str | None = None
+
+
+# What nodes/routers receive: GraphState in "strict" mode, GraphStateLite in "boundary" mode.
+# (A Union is not a class, so LangGraph coerces router input to the graph's own schema.)
+AnyGraphState = Union[GraphState, GraphStateLite]
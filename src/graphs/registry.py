@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Literal
+
+logger = logging.getLogger("app")
+
+GraphStatus = Literal["pending", "loading", "ready", "error"]
+
+# /run/batch and /run/stream are fixed routes next to /run/{graph_name}
+_RESERVED_NAMES = frozenset({"batch", "stream"})
+
+DEFAULT_GRAPH = os.getenv("DEFAULT_GRAPH", "basic_agent")
+
+
+@dataclass(frozen=True)
+class GraphSpec:
+    name: str
+    # import path of the graph's run module; importing it compiles the graph. It provides
+    # run_graph_async(input, trace_id, max_steps, thread_id) and ThreadBusyError (the default
+    # graph also: stream_graph, run_graph_batch, BatchItem, NodeEvent, checkpoint_stats)
+    module: str
+
+
+@dataclass(frozen=True)
+class GraphInfo:
+    name: str
+    module: str
+    status: GraphStatus
+    load_ms: int | None
+    error: str | None
+
+
+class GraphNotFoundError(KeyError):
+    pass
+
+
+class GraphUnavailableError(RuntimeError):
+    """The graph's module failed to import/compile; the error is kept, not retried."""
+
+
+class _Slot:
+    def __init__(self, spec: GraphSpec) -> None:
+        self.spec = spec
+        self.lock = threading.Lock()
+        self.status: GraphStatus = "pending"
+        self.runner: ModuleType | None = None
+        self.load_ms: int | None = None
+        self.error: str | None = None
+
+
+_REGISTRY: dict[str, _Slot] = {}
+_WARMUP: threading.Thread | None = None
+
+
+def register_graph(spec: GraphSpec) -> None:
+    """Registers by import path only: nothing is imported or compiled until first use / warmup."""
+    if spec.name in _REGISTRY:
+        raise ValueError(f"graph_already_registered:{spec.name}")
+    if spec.name in _RESERVED_NAMES:
+        raise ValueError(f"graph_name_reserved:{spec.name}")
+    _REGISTRY[spec.name] = _Slot(spec)
+
+
+def list_graphs() -> list[str]:
+    return sorted(_REGISTRY.keys())
+
+
+def _slot(name: str) -> _Slot:
+    try:
+        return _REGISTRY[name]
+    except KeyError:
+        raise GraphNotFoundError(name) from None
+
+
+def _load(slot: _Slot) -> ModuleType:
+    # single-flight: warmup and first requests share one import
+    with slot.lock:
+        if slot.runner is not None:
+            return slot.runner
+        if slot.status == "error":
+            raise GraphUnavailableError(slot.spec.name)
+        slot.status = "loading"
+        t0 = time.perf_counter()
+        try:
+            runner = importlib.import_module(slot.spec.module)
+        except Exception as e:
+            slot.status = "error"
+            slot.error = f"{type(e).__name__}: {e}"
+            logger.exception("graph_load_error", extra={"fields": {"graph": slot.spec.name}})
+            raise GraphUnavailableError(slot.spec.name) from e
+        slot.load_ms = int((time.perf_counter() - t0) * 1000)
+        slot.runner = runner
+        slot.status = "ready"
+        logger.info("graph_ready", extra={"duration_ms": slot.load_ms, "fields": {"graph": slot.spec.name}})
+        return runner
+
+
+def get_graph(name: str = DEFAULT_GRAPH) -> ModuleType:
+    """The graph's run module, imported (and so compiled) on first use."""
+    slot = _slot(name)
+    return slot.runner if slot.runner is not None else _load(slot)
+
+
+async def aget_graph(name: str = DEFAULT_GRAPH) -> ModuleType:
+    """get_graph for the event loop: a cold graph compiles on a worker thread, not the loop."""
+    slot = _slot(name)
+    if slot.runner is not None:
+        return slot.runner
+    return await asyncio.to_thread(_load, slot)
+
+
+def start_warmup(names: list[str] | None = None) -> threading.Thread:
+    """Loads the given (default: all) graphs on a background thread, default graph first."""
+    global _WARMUP
+    order = sorted(names or _REGISTRY, key=lambda n: (n != DEFAULT_GRAPH, n))
+
+    def warm() -> None:
+        for name in order:
+            try:
+                get_graph(name)
+            except GraphUnavailableError:
+                pass  # status/error are on the slot; /healthz reports it
+
+    _WARMUP = threading.Thread(target=warm, name="graph-warmup", daemon=True)
+    _WARMUP.start()
+    return _WARMUP
+
+
+def graph_infos() -> list[GraphInfo]:
+    return [
+        GraphInfo(name=s.spec.name, module=s.spec.module, status=s.status, load_ms=s.load_ms, error=s.error)
+        for s in (_REGISTRY[n] for n in list_graphs())
+    ]
+
+
+def readiness() -> Literal["ok", "starting", "degraded"]:
+    """
+    "starting" while a warmup is still loading graphs, "degraded" if any graph failed to load.
+    Without a warmup (GRAPH_WARMUP=lazy) pending graphs compile on first request: "ok".
+    """
+    slots = _REGISTRY.values()
+    if any(s.status == "error" for s in slots):
+        return "degraded"
+    if _WARMUP is not None and _WARMUP.is_alive():
+        return "starting"
+    return "ok"
+
+
+def _register_from_env() -> None:
+    # GRAPH_REGISTRY="name=pkg.module,other=pkg.other_run": extra graphs without code changes
+    for item in filter(None, (s.strip() for s in os.getenv("GRAPH_REGISTRY", "").split(","))):
+        name, _, module = item.partition("=")
+        register_graph(GraphSpec(name=name.strip(), module=module.strip()))
+
+
+register_graph(GraphSpec(name="basic_agent", module="src.graphs.basic_agent.run"))
+_register_from_env()
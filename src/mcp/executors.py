@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, TypeVar
+
+from src.middleware.metrics import TOOL_EXEC_DURATION, TOOL_QUEUE_WAIT
+from src.tools.registry import ToolSpec
+
+T = TypeVar("T")
+
+
+class ToolQueueFull(Exception):
+    """max_concurrency handlers running and max_queue more already waiting."""
+
+
+@dataclass(frozen=True)
+class ExecutorStats:
+    tool: str
+    max_concurrency: int
+    max_queue: int
+    running: int
+    queued: int
+    rejected: int
+
+
+class ToolExecutor:
+    """
+    Dedicated, bounded thread pool for one tool, so slow handlers of one tool
+    can't take threads from another tool or from Starlette's shared pool (/run).
+    - at most `max_concurrency` handlers run at once; up to `max_queue` more wait
+    - submit() beyond that raises ToolQueueFull immediately (no blocking)
+    - queue wait and execution time go to separate histograms
+    - the caller's contextvars (trace / span) are carried into the worker
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int) -> None:
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"tool-{name}")
+        self._lock = threading.Lock()
+        self._pending = 0  # queued + running
+        self._running = 0
+        self._rejected = 0
+        self._wait_hist = TOOL_QUEUE_WAIT.labels(name)
+        self._ok_hist = TOOL_EXEC_DURATION.labels(name, "ok")
+        self._error_hist = TOOL_EXEC_DURATION.labels(name, "error")
+
+    def submit(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> Future[T]:
+        with self._lock:
+            if self._pending >= self.max_concurrency + self.max_queue:
+                self._rejected += 1
+                raise ToolQueueFull(self.name)
+            self._pending += 1
+        ctx = contextvars.copy_context()
+        submitted_ns = time.perf_counter_ns()
+
+        def work() -> T:
+            started_ns = time.perf_counter_ns()
+            self._wait_hist.observe((started_ns - submitted_ns) / 1e9)
+            with self._lock:
+                self._running += 1
+            hist = self._error_hist
+            try:
+                result = ctx.run(fn, *args, **kwargs)
+                hist = self._ok_hist
+                return result
+            finally:
+                hist.observe((time.perf_counter_ns() - started_ns) / 1e9)
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+
+        try:
+            future = self._pool.submit(work)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        # a call cancelled while queued (acall's awaiting task cancelled, client gone)
+        # never runs work(), so its slot is given back here
+        future.add_done_callback(self._release_if_cancelled)
+        return future
+
+    def _release_if_cancelled(self, future: Future[Any]) -> None:
+        if future.cancelled():
+            with self._lock:
+                self._pending -= 1
+
+    def call(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """Blocking submit + wait, for sync callers."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def acall(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """Awaitable submit + wait; the event loop thread never runs the handler."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> ExecutorStats:
+        with self._lock:
+            return ExecutorStats(
+                tool=self.name,
+                max_concurrency=self.max_concurrency,
+                max_queue=self.max_queue,
+                running=self._running,
+                queued=self._pending - self._running,
+                rejected=self._rejected,
+            )
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# One executor per (tool, limits); a re-registered spec with the same limits keeps
+# its pool, so swapping handlers doesn't leak threads.
+_EXECUTORS: dict[tuple[str, int, int], ToolExecutor] = {}
+_EXECUTORS_LOCK = threading.Lock()
+
+
+def executor_for(spec: ToolSpec) -> ToolExecutor:
+    key = (spec.name, spec.max_concurrency, spec.max_queue)
+    with _EXECUTORS_LOCK:
+        ex = _EXECUTORS.get(key)
+        if ex is None:
+            ex = _EXECUTORS[key] = ToolExecutor(spec.name, spec.max_concurrency, spec.max_queue)
+        return ex
+
+
+def executor_stats() -> list[ExecutorStats]:
+    with _EXECUTORS_LOCK:
+        executors = list(_EXECUTORS.values())
+    return [ex.stats() for ex in executors]
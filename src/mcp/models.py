@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+from typing import Any, Literal
+
 from pydantic import BaseModel, ConfigDict, Field
 
+from src.core.audit_models import ToolAttemptEvent
+
 
 class ReadFileRequest(BaseModel):
     model_config = ConfigDict(strict=True)
     path: str = Field(..., min_length=1, description="Relative path under ./data/ e.g. data/sample.txt")
+    offset: int = Field(0, ge=0, description="Byte offset to start reading at")
+    length: int | None = Field(None, ge=0, description="Bytes to read (default: to EOF, capped per call)")
 
 
 class ReadFileResponse(BaseModel):
@@ -14,3 +20,100 @@ class ReadFileResponse(BaseModel):
     bytes: int | None = None
     preview: str | None = None
     error: str | None = None
+    offset: int | None = None
+    length: int | None = None  # bytes returned for the requested range
+    content: str | None = None
+    eof: bool | None = None
+    cache: str | None = None  # content cache: hit | miss | bypass | off
+
+
+class FileEntry(BaseModel):
+    path: str
+    type: Literal["file", "dir"]
+    size: int
+    mtime_ns: int
+
+
+class ListFilesRequest(BaseModel):
+    model_config = ConfigDict(strict=True)
+    path: str = Field("data", min_length=1, description="Directory under ./data/ to list")
+    glob: str | None = Field(None, description="fnmatch pattern on the full path, e.g. data/*.txt (* also matches /)")
+    recursive: bool = True
+    cursor: str | None = Field(None, description="next_cursor from the previous page")
+    limit: int = Field(100, ge=1, le=1000)
+
+
+class ListFilesResponse(BaseModel):
+    model_config = ConfigDict(strict=True)
+    ok: bool
+    entries: list[FileEntry] = Field(default_factory=list)
+    next_cursor: str | None = None
+    error: str | None = None
+
+
+class StatFilesRequest(BaseModel):
+    model_config = ConfigDict(strict=True)
+    paths: list[str] = Field(..., min_length=1, max_length=256)
+
+
+class StatFilesResponse(BaseModel):
+    model_config = ConfigDict(strict=True)
+    ok: bool
+    entries: list[FileEntry] = Field(default_factory=list)
+    missing: list[str] = Field(default_factory=list)
+    error: str | None = None
+
+
+class SearchDataRequest(BaseModel):
+    model_config = ConfigDict(strict=True)
+    query: str = Field(..., min_length=1, max_length=512)
+    path: str = Field("data", min_length=1, description="Directory under ./data/ to search")
+    limit: int = Field(10, ge=1, le=100)
+    include_approval_required: bool = Field(
+        False, description="Also return hits in approval-gated files (e.g. *.secret); needs X-Approval"
+    )
+
+
+class SearchMatch(BaseModel):
+    term: str
+    offset: int  # bytes
+    length: int  # bytes
+
+
+class SearchHit(BaseModel):
+    path: str
+    score: float
+    matches: list[SearchMatch] = Field(default_factory=list)
+    snippet: str = ""
+
+
+class SearchDataResponse(BaseModel):
+    model_config = ConfigDict(strict=True)
+    ok: bool
+    hits: list[SearchHit] = Field(default_factory=list)
+    withheld: int = 0  # approval-gated files skipped while filling the page
+    complete: bool = True  # False while the initial index build is still running
+    error: str | None = None
+
+
+class ToolCall(BaseModel):
+    tool: str = Field(..., min_length=1)
+    args: dict[str, Any] = Field(default_factory=dict)
+
+
+class ToolBatchRequest(BaseModel):
+    calls: list[ToolCall] = Field(..., min_length=1, max_length=256)
+    max_concurrency: int | None = Field(None, ge=1)
+
+
+class ToolCallResult(BaseModel):
+    index: int
+    tool: str
+    status_code: int  # what POST /mcp/tools/{tool} would have returned
+    result: dict[str, Any] | None = None
+    error: Any = None
+    audit: ToolAttemptEvent | None = None  # None only when rejected before policy (unknown tool / invalid args)
+
+
+class ToolBatchResponse(BaseModel):
+    results: list[ToolCallResult]
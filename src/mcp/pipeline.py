@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from pydantic import BaseModel, ValidationError
+
+from src.core.audit import audit_tool_attempt
+from src.core.audit_models import ToolAttemptEvent
+from src.core.policy import current_policy
+from src.mcp.executors import ToolQueueFull, executor_for
+from src.middleware.spans import Span
+from src.tools.registry import ToolSpec, get_stream_handler, get_tool, on_register
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+# Define known safety blocks that should be classified as "blocked", not "error"
+GUARDRAIL_BLOCKS = {
+    "path_outside_data_dir",
+    "file_too_large",
+    "file_not_found",
+    "range_too_large",
+    "offset_out_of_range",
+}
+
+# Policy reason -> HTTP detail
+_DENY_DETAIL = {
+    "tool_not_allowlisted": "tool_not_allowed",
+    "tool_denied": "tool_not_allowed",
+    "path_denied": "path_not_allowed",
+    "path_not_allowlisted": "path_not_allowed",
+}
+
+
+class ToolCallRejected(Exception):
+    """Raised before the handler runs; maps 1:1 onto an HTTP error."""
+
+    def __init__(self, status_code: int, detail: Any, event: ToolAttemptEvent | None = None) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.event = event
+
+
+class ToolCrashed(Exception):
+    """The handler raised; `event` is its outcome="error" audit event (cause chained)."""
+
+    def __init__(self, event: ToolAttemptEvent) -> None:
+        super().__init__(event.result_summary)
+        self.event = event
+
+
+class ToolPipeline:
+    """
+    validate -> policy -> approval -> handler -> audit, for one ToolSpec.
+    Everything that only depends on the spec (validator, redactor, span name/attrs,
+    approval predicate) is resolved once here instead of on every call.
+    Path rules / approval globs apply to the request's `path` (or every entry of
+    `paths`) field, if it has one.
+    Handlers run on the tool's own bounded executor (429 `tool_queue_full` when saturated);
+    a handler exception surfaces as ToolCrashed, carrying its audit event.
+    """
+
+    def __init__(self, spec: ToolSpec, repo_root: Path = REPO_ROOT) -> None:
+        self.spec = spec
+        self.name = spec.name
+        self._validate = spec.request_model.model_validate
+        self._handler = spec.handler
+        self._redact = spec.redact
+        self._requires_approval = spec.requires_approval
+        self._stream_handler = get_stream_handler(spec.name)
+        self._summarize = spec.summarize
+        self._repo_root = repo_root
+        self._resolved_root = repo_root.resolve()
+        self._span_name = f"tool:{spec.name}"
+        self._span_attrs = {"tool": spec.name}
+        self._executor = executor_for(spec)
+
+    def run(
+        self, raw: Any, *, trace_id: str, approval: str | None = None
+    ) -> tuple[BaseModel, ToolAttemptEvent]:
+        """Blocking variant of arun() for sync callers; same executor, same limits."""
+        payload, params, policy_version, reason = self._admit(raw, trace_id, approval)
+        args = (self._handler, payload, params, policy_version, reason, trace_id)
+        try:
+            resp = self._executor.call(self._execute, *args)
+        except ToolQueueFull:
+            raise self._queue_full(params, policy_version, trace_id) from None
+        return resp, self._audit_result(resp, params, policy_version, reason, trace_id)
+
+    async def arun(
+        self, raw: Any, *, trace_id: str, approval: str | None = None
+    ) -> tuple[BaseModel, ToolAttemptEvent]:
+        """Admission on the caller; the handler on this tool's executor."""
+        payload, params, policy_version, reason = self._admit(raw, trace_id, approval)
+        args = (self._handler, payload, params, policy_version, reason, trace_id)
+        try:
+            resp = await self._executor.acall(self._execute, *args)
+        except ToolQueueFull:
+            raise self._queue_full(params, policy_version, trace_id) from None
+        return resp, self._audit_result(resp, params, policy_version, reason, trace_id)
+
+    async def arun_stream(
+        self, raw: Any, *, trace_id: str, approval: str | None = None
+    ) -> tuple[BaseModel, Iterator[bytes] | None, ToolAttemptEvent | None]:
+        """
+        Same admission as arun(); the handler returns (metadata, chunks). A failure
+        (chunks=None) is audited here; a stream is audited when its iterator
+        finishes or is closed (event None), so "ok" means every byte was handed over.
+        """
+        if self._stream_handler is None:
+            raise ToolCallRejected(404, "stream_not_supported")
+        payload, params, policy_version, reason = self._admit(raw, trace_id, approval)
+        args = (self._stream_handler, payload, params, policy_version, reason, trace_id)
+        try:
+            meta, chunks = await self._executor.acall(self._execute, *args)
+        except ToolQueueFull:
+            raise self._queue_full(params, policy_version, trace_id) from None
+        if chunks is None:
+            return meta, None, self._audit_result(meta, params, policy_version, reason, trace_id)
+        audited = self._audited_chunks(meta, chunks, params, policy_version, reason, trace_id)
+        next(audited)
+        return meta, audited, None
+
+    def _audited_chunks(
+        self,
+        meta: BaseModel,
+        chunks: Iterator[bytes],
+        params: dict[str, str],
+        policy_version: str,
+        reason: str,
+        trace_id: str,
+    ) -> Iterator[bytes]:
+        sent, done, error = 0, False, ""
+        try:
+            yield b""  # primed by arun_stream: a response that is never iterated still audits and closes
+            for chunk in chunks:
+                sent += len(chunk)
+                yield chunk
+            done = True
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()  # e.g. the read_file mmap
+            if done:
+                self._audit_result(meta, params, policy_version, reason, trace_id)
+            else:
+                audit_tool_attempt(
+                    trace_id=trace_id,
+                    tool_name=self.name,
+                    decision="allow",
+                    reason=reason,
+                    outcome="error",
+                    params_redacted=params,
+                    result_summary=(f"stream_error {error}" if error else f"stream_aborted sent={sent}")[:240],
+                    policy_version=policy_version,
+                )
+
+    def _queue_full(self, params: dict[str, str], policy_version: str, trace_id: str) -> ToolCallRejected:
+        evt = audit_tool_attempt(
+            trace_id=trace_id,
+            tool_name=self.name,
+            decision="allow",
+            reason="queue_full",
+            outcome="blocked",
+            params_redacted=params,
+            result_summary="rejected_executor_queue_full",
+            policy_version=policy_version,
+        )
+        return ToolCallRejected(429, "tool_queue_full", evt)
+
+    def _admit(self, raw: Any, trace_id: str, approval: str | None) -> tuple[BaseModel, dict[str, str], str, str]:
+        try:
+            payload = self._validate(raw)
+        except ValidationError as e:
+            raise ToolCallRejected(422, e.errors(include_url=False, include_context=False)) from None
+        params = self._redact(payload)
+
+        # 1. Policy Check (tool allow/deny + path globs)
+        policy = current_policy()
+        paths = getattr(payload, "paths", None)
+        if paths is not None:  # multi-path tools (stat_files): every path must pass
+            decision = policy.decide_many(self.name, [self._policy_path(p) for p in paths])
+        else:
+            path = getattr(payload, "path", None)
+            decision = policy.decide(self.name, None if path is None else self._policy_path(path))
+        if not decision.allowed:
+            evt = audit_tool_attempt(
+                trace_id=trace_id,
+                tool_name=self.name,
+                decision="deny",
+                reason=decision.reason,
+                outcome="blocked",
+                params_redacted=params,
+                result_summary="blocked_by_policy",
+                policy_version=policy.version,
+            )
+            raise ToolCallRejected(403, _DENY_DETAIL.get(decision.reason, "tool_not_allowed"), evt)
+
+        # 2. Approval Check (HITL Stub): policy approval globs, or the spec's own predicate
+        needs_approval = decision.requires_approval or (
+            self._requires_approval is not None and self._requires_approval(payload)
+        )
+        if needs_approval and approval != "approved":
+            evt = audit_tool_attempt(
+                trace_id=trace_id,
+                tool_name=self.name,
+                decision="deny",
+                reason="approval_required",
+                outcome="blocked",
+                params_redacted=params,
+                result_summary="missing_approval_header",
+                policy_version=policy.version,
+            )
+            raise ToolCallRejected(403, "approval_required", evt)
+        return payload, params, policy.version, decision.reason
+
+    def _policy_path(self, path: str) -> str:
+        # rules must see the file the handler will open: "/abs/repo/data/x", "./data/x" and
+        # symlinks to data/x all become "data/x". Paths leaving the repo are left as given:
+        # they are outside data/ too, so the handler's guardrail rejects them
+        target = (self._repo_root / path).resolve()
+        try:
+            return target.relative_to(self._resolved_root).as_posix()
+        except ValueError:
+            return path
+
+    def _execute(
+        self,
+        handler: Callable[..., Any],
+        payload: BaseModel,
+        params: dict[str, str],
+        policy_version: str,
+        reason: str,
+        trace_id: str,
+    ) -> Any:
+        # 3. Execution
+        try:
+            with Span(self._span_name, trace_id, kind="tool", attrs=self._span_attrs, log=False):
+                return handler(repo_root=self._repo_root, req=payload)
+        except Exception as e:
+            # 5. Crash Handling
+            evt = audit_tool_attempt(
+                trace_id=trace_id,
+                tool_name=self.name,
+                decision="allow",
+                reason=reason,
+                outcome="error",
+                params_redacted=params,
+                result_summary=f"crash {str(e)}"[:240],
+                policy_version=policy_version,
+            )
+            raise ToolCrashed(evt) from e
+
+    def _audit_result(
+        self, resp: BaseModel, params: dict[str, str], policy_version: str, reason: str, trace_id: str
+    ) -> ToolAttemptEvent:
+        # 4. Outcome Classification
+        if getattr(resp, "ok", True):
+            outcome = "ok"
+            summary = self._summarize(resp) if self._summarize is not None else f"bytes={getattr(resp, 'bytes', 0)}"
+        else:
+            # It failed, but was it a Guardrail (blocked) or a Crash (error)?
+            error_msg = getattr(resp, "error", "unknown")
+            outcome = "blocked" if error_msg in GUARDRAIL_BLOCKS else "error"
+            summary = f"error {error_msg}"
+
+        return audit_tool_attempt(
+            trace_id=trace_id,
+            tool_name=self.name,
+            decision="allow",
+            reason=reason,
+            outcome=outcome,  # type: ignore[arg-type]
+            params_redacted=params,
+            result_summary=summary,
+            policy_version=policy_version,
+        )
+
+
+# name -> (spec it was built from, pipeline), filled at registration. Keyed on spec
+# identity so a registry entry swapped in without register_tool (tests) still gets
+# a fresh pipeline on next use.
+_PIPELINES: dict[str, tuple[ToolSpec, ToolPipeline]] = {}
+
+
+def _build_pipeline(name: str) -> ToolPipeline:
+    spec = get_tool(name)
+    pipeline = ToolPipeline(spec)
+    _PIPELINES[name] = (spec, pipeline)
+    return pipeline
+
+
+on_register(_build_pipeline)
+
+
+def get_pipeline(name: str) -> ToolPipeline:
+    """Raises KeyError for unknown tools (same as get_tool)."""
+    spec = get_tool(name)
+    cached = _PIPELINES.get(name)
+    if cached is not None and cached[0] is spec:
+        return cached[1]
+    return _build_pipeline(name)
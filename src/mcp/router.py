@@ -1,98 +1,113 @@
 from __future__ import annotations
 
-from pathlib import Path
+import asyncio
+import logging
+import os
+from typing import Any
 
-from fastapi import APIRouter, Header, HTTPException
+from fastapi import APIRouter, Body, Header, HTTPException
+from fastapi.responses import StreamingResponse
 
-from src.core.audit import audit_tool_attempt
-from src.core.permissions import decide_tool_allowed
-from src.mcp.models import ReadFileRequest, ReadFileResponse
-from src.tools.registry import get_tool
+from src.mcp.models import ToolBatchRequest, ToolBatchResponse, ToolCall, ToolCallResult
+from src.mcp.pipeline import ToolCallRejected, ToolCrashed, get_pipeline
+from src.middleware.spans import current_trace_id
+import src.tools.list_files  # noqa: F401
 import src.tools.read_file  # noqa: F401
+import src.tools.search_data  # noqa: F401
 
 router = APIRouter(prefix="/mcp", tags=["mcp"])
 
-REPO_ROOT = Path(__file__).resolve().parents[2]
+logger = logging.getLogger(__name__)
 
-# Define known safety blocks that should be classified as "blocked", not "error"
-GUARDRAIL_BLOCKS = {"path_outside_data_dir", "file_too_large", "file_not_found"}
+# Upper bound for /mcp/tools:batch; callers may ask for less, never more.
+MAX_TOOL_BATCH_CONCURRENCY = int(os.getenv("MCP_BATCH_MAX_CONCURRENCY", "8"))
 
-@router.post("/tools/read_file", response_model=ReadFileResponse)
-def mcp_read_file(
-    payload: ReadFileRequest,
+
+@router.post("/tools:batch", response_model=ToolBatchResponse)
+async def mcp_call_tools_batch(
+    req: ToolBatchRequest,
+    x_trace_id: str | None = Header(default=None, alias="X-Trace-Id"),
+    x_approval: str | None = Header(default=None, alias="X-Approval"),
+) -> ToolBatchResponse:
+    """
+    Many tool calls, one HTTP round trip. Each call goes through the same pipeline
+    as POST /mcp/tools/{name} (and emits its own audit event); results come back
+    in request order, failures included, with the status code the single-call
+    endpoint would have returned.
+    """
+    trace_id = x_trace_id or current_trace_id() or "NO-TRACE-ID"
+    limit = min(req.max_concurrency or MAX_TOOL_BATCH_CONCURRENCY, MAX_TOOL_BATCH_CONCURRENCY)
+    sem = asyncio.Semaphore(limit)
+
+    async def run_one(index: int, call: ToolCall) -> ToolCallResult:
+        async with sem:
+            return await _call_one(index, call, trace_id, x_approval)
+
+    results = await asyncio.gather(*(run_one(i, c) for i, c in enumerate(req.calls)))
+    return ToolBatchResponse(results=list(results))
+
+
+async def _call_one(index: int, call: ToolCall, trace_id: str, approval: str | None) -> ToolCallResult:
+    try:
+        pipeline = get_pipeline(call.tool)
+    except KeyError:
+        return ToolCallResult(index=index, tool=call.tool, status_code=404, error="tool_not_found")
+    try:
+        # handlers run on the tool's executor; a saturated tool yields a 429 result, not a stall
+        resp, evt = await pipeline.arun(call.args, trace_id=trace_id, approval=approval)
+    except ToolCallRejected as e:
+        return ToolCallResult(index=index, tool=call.tool, status_code=e.status_code, error=e.detail, audit=e.event)
+    except ToolCrashed as e:
+        # already audited as outcome="error" by the pipeline; one crash doesn't fail the batch
+        logger.exception("tool_error", extra={"trace_id": trace_id})
+        return ToolCallResult(index=index, tool=call.tool, status_code=500, error="tool_crash", audit=e.event)
+    return ToolCallResult(index=index, tool=call.tool, status_code=200, result=resp.model_dump(), audit=evt)
+
+
+@router.post("/tools/{name}:stream")
+async def mcp_call_tool_stream(
+    name: str,
+    payload: Any = Body(...),
+    x_trace_id: str | None = Header(default=None, alias="X-Trace-Id"),
+    x_approval: str | None = Header(default=None, alias="X-Approval"),
+) -> Any:
+    """
+    Raw bytes of the requested range as application/octet-stream, sent in chunks
+    (never loaded whole). Same policy / approval / audit as the JSON route; guardrail
+    failures come back as the tool's JSON response (ok=false), like the JSON route.
+    """
+    trace_id = x_trace_id or current_trace_id() or "NO-TRACE-ID"
+    try:
+        pipeline = get_pipeline(name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="tool_not_found") from None
+    try:
+        meta, chunks, _ = await pipeline.arun_stream(payload, trace_id=trace_id, approval=x_approval)
+    except ToolCallRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail) from None
+    if chunks is None:
+        return meta
+    headers = {"Content-Length": str(meta.length), "X-File-Size": str(meta.bytes)}  # type: ignore[attr-defined]
+    if meta.length:  # type: ignore[attr-defined]
+        headers["Content-Range"] = f"bytes {meta.offset}-{meta.offset + meta.length - 1}/{meta.bytes}"  # type: ignore[attr-defined]
+    return StreamingResponse(chunks, media_type="application/octet-stream", headers=headers)
+
+
+@router.post("/tools/{name}")
+async def mcp_call_tool(
+    name: str,
+    payload: Any = Body(...),
     x_trace_id: str | None = Header(default=None, alias="X-Trace-Id"),
     x_approval: str | None = Header(default=None, alias="X-Approval"),  # <--- HITL Stub
-) -> ReadFileResponse:
-    trace_id = x_trace_id or "NO-TRACE-ID"
-    tool_name = "read_file"
-    tool = get_tool(tool_name)
-
-    # 1. Policy Check (Allowlist)
-    decision = decide_tool_allowed(tool.name)
-    if not decision.allowed:
-        audit_tool_attempt(
-            trace_id=trace_id,
-            tool_name=tool.name,
-            decision="deny",
-            reason=decision.reason,
-            outcome="blocked",  # Policy blocked it
-            params_redacted=tool.redact(payload), # type: ignore
-            result_summary="blocked_by_policy",
-        )
-        raise HTTPException(status_code=403, detail="tool_not_allowed")
-
-    # 2. Approval Check (HITL Stub)
-    # Simulate: .secret files require explicit approval
-    if payload.path.endswith(".secret") and x_approval != "approved":
-        audit_tool_attempt(
-            trace_id=trace_id,
-            tool_name=tool.name,
-            decision="deny",
-            reason="approval_required",
-            outcome="blocked",  # Policy blocked it
-            params_redacted=tool.redact(payload), # type: ignore
-            result_summary="missing_approval_header",
-        )
-        raise HTTPException(status_code=403, detail="approval_required")
-
-    # 3. Execution
+) -> Any:
+    trace_id = x_trace_id or current_trace_id() or "NO-TRACE-ID"
+    try:
+        pipeline = get_pipeline(name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="tool_not_found") from None
     try:
-        resp = tool.handler(repo_root=REPO_ROOT, req=payload)
-        
-        # 4. Outcome Classification
-        if getattr(resp, "ok", True):
-            outcome = "ok"
-            summary = f"bytes={getattr(resp, 'bytes', 0)}"
-        else:
-            # It failed, but was it a Guardrail (blocked) or a Crash (error)?
-            error_msg = getattr(resp, "error", "unknown")
-            if error_msg in GUARDRAIL_BLOCKS:
-                outcome = "blocked"  # Expected safety mechanism
-            else:
-                outcome = "error"    # Unexpected failure
-
-            summary = f"error {error_msg}"
-
-        audit_tool_attempt(
-            trace_id=trace_id,
-            tool_name=tool.name,
-            decision="allow",
-            reason=decision.reason,
-            outcome=outcome,  # <--- Precise Outcome
-            params_redacted=tool.redact(payload), # type: ignore
-            result_summary=summary,
-        )
-        return resp
-
-    except Exception as e:
-        # 5. Crash Handling
-        audit_tool_attempt(
-            trace_id=trace_id,
-            tool_name=tool.name,
-            decision="allow",
-            reason=decision.reason,
-            outcome="error",
-            params_redacted=tool.redact(payload), # type: ignore
-            result_summary=f"crash {str(e)}",
-        )
-        raise e
\ No newline at end of file
+        # async route: the handler runs on the tool's own executor, not Starlette's shared threadpool
+        resp, _ = await pipeline.arun(payload, trace_id=trace_id, approval=x_approval)
+    except ToolCallRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail) from None
+    return resp
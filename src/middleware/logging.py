@@ -1,16 +1,22 @@
 # src/middleware/logging.py
 
+import atexit
 import json
 import logging
+import os
+import queue
+import sys
+import threading
 import time
-from typing import Any
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Literal, TextIO
 
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import PlainTextResponse
+from src.core import prefork
+from src.middleware.spans import current_trace_id
 
 SERVICE_NAME = "agentic-systems-lab"
-TRACE_HEADER = "X-Trace-Id"
 
 
 class JsonFormatter(logging.Formatter):
@@ -18,13 +24,15 @@ class JsonFormatter(logging.Formatter):
     JSON-only, defensive formatter.
     - Always emits JSON
     - Never raises during formatting (falls back to minimal JSON)
-    - Supports optional fields via LogRecord attributes set in `extra=...`
+    - Supports optional fields via LogRecord attributes set in `extra=...`,
+      plus a `fields` dict merged in as top-level keys
     """
 
     def format(self, record: logging.LogRecord) -> str:
         try:
             payload: dict[str, Any] = {
-                "timestamp": int(time.time() * 1000),
+                # creation time, not format time: async handlers format later on another thread
+                "timestamp": int(record.created * 1000),
                 "level": record.levelname,
                 "service": SERVICE_NAME,
                 "event": record.getMessage(),
@@ -32,14 +40,22 @@ class JsonFormatter(logging.Formatter):
             }
 
             # Optional fields that may appear on certain events.
-            for k in ("span", "duration_ms", "status", "status_code", "latency_ms","node"):
+            for k in ("span", "duration_ms", "status", "status_code", "latency_ms","node", "policy_version"):
                 v = getattr(record, k, None)
                 if v is not None:
                     payload[k] = v
 
+            # Event-specific structured fields (e.g. tool_attempt); never override the envelope.
+            fields = getattr(record, "fields", None)
+            if fields:
+                for k, v in fields.items():
+                    payload.setdefault(k, v)
+
             # Exception details (stack trace) when logger.exception(...) is used.
             if record.exc_info:
                 payload["exc"] = self.formatException(record.exc_info)
+            elif record.exc_text:  # pre-rendered by AsyncBatchHandler
+                payload["exc"] = record.exc_text
 
             return json.dumps(payload, default=str)
         except Exception as e:
@@ -56,21 +72,412 @@ class JsonFormatter(logging.Formatter):
             return json.dumps(fallback, default=str)
 
 
-def configure_logging() -> None:
+@dataclass(frozen=True)
+class LogQueueStats:
+    enqueued: int
+    dropped: int
+    written: int
+    queued: int  # currently waiting for the writer
+
+
+class AsyncBatchHandler(logging.Handler):
+    """
+    Non-blocking handler: emit() only snapshots the record and enqueues it.
+    A background writer thread formats records and writes them in batches
+    (one write + flush per batch). Output is byte-for-byte the same JSON lines
+    as a StreamHandler with the same formatter.
+
+    When the queue is full:
+    - "drop":  the record is discarded and counted (callers never block)
+    - "block": the caller waits for room (no loss, but backpressure)
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        stream: TextIO | None = None,
+        *,
+        queue_size: int = 10_000,
+        full_policy: Literal["drop", "block"] = "drop",
+        batch_size: int = 256,
+    ) -> None:
+        super().__init__()
+        if full_policy not in ("drop", "block"):
+            raise ValueError(f"unknown full_policy: {full_policy}")
+        self.stream = stream if stream is not None else sys.stderr
+        self.full_policy = full_policy
+        self.batch_size = batch_size
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=queue_size)
+        # emit() runs on any thread (and outside Handler.lock when called directly)
+        self._count_lock = threading.Lock()
+        self._enqueued = 0
+        self._dropped = 0
+        self._written = 0
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._writer.start()
+        prefork.register(self)
+
+    def _prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Freeze everything that may change or hold references after emit() returns.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            formatter = self.formatter or logging.Formatter()
+            record.exc_text = formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self._closed:
+            return
+        try:
+            record = self._prepare(record)
+            if self.full_policy == "block":
+                self._queue.put(record)
+            else:
+                self._queue.put_nowait(record)
+            with self._count_lock:
+                self._enqueued += 1
+        except queue.Full:
+            with self._count_lock:
+                self._dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(r is self._STOP for r in batch)
+            lines = []
+            for record in batch:
+                if record is self._STOP:
+                    continue
+                try:
+                    lines.append(self.format(record))
+                except Exception:
+                    self.handleError(record)
+            if lines:
+                try:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                    with self._count_lock:
+                        self._written += len(lines)
+                except Exception:
+                    self.handleError(batch[-1])
+            if stop:
+                return
+
+    def stats(self) -> LogQueueStats:
+        with self._count_lock:
+            return LogQueueStats(
+                enqueued=self._enqueued,
+                dropped=self._dropped,
+                written=self._written,
+                queued=self._queue.qsize(),
+            )
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop accepting records, drain what is queued, then stop the writer (at most `timeout`)."""
+        if not self._closed:
+            self._closed = True
+            deadline = time.monotonic() + timeout
+            try:
+                self._queue.put(self._STOP, timeout=timeout)  # a stuck stream never frees a slot
+            except queue.Full:
+                pass
+            self._writer.join(timeout=max(0.0, deadline - time.monotonic()))
+        super().close()
+
+    def _before_fork(self, timeout: float = 5.0) -> None:
+        # drain and stop the writer: the child must not inherit a queue lock held mid-put
+        if not self._closed:
+            deadline = time.monotonic() + timeout
+            try:
+                self._queue.put(self._STOP, timeout=timeout)
+            except queue.Full:
+                pass  # stuck stream: fork anyway, _after_fork carries the queue over
+            self._writer.join(timeout=max(0.0, deadline - time.monotonic()))
+
+    def _after_fork(self, in_child: bool) -> None:
+        if self._closed:
+            return
+        old = self._queue
+        self._queue = queue.Queue(maxsize=old.maxsize)
+        if in_child:
+            # what is left in `old` is the parent's to write (and its lock may be held by a
+            # thread that does not exist here): never touched
+            self._count_lock = threading.Lock()
+        else:
+            # records enqueued behind the stop marker (or never reached) move to the new queue
+            while True:
+                try:
+                    record = old.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._STOP:
+                    continue
+                try:
+                    self._queue.put_nowait(record)
+                except queue.Full:
+                    with self._count_lock:
+                        self._dropped += 1
+        self._writer = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._writer.start()
+
+
+# Per-node / per-span chatter: the only events tail sampling may hold back or drop.
+SAMPLED_EVENTS = frozenset({"node_start", "node_end", "span_start", "span_end"})
+# Events that end a trace: /run/batch items (<trace_id>-<i>) end with batch_item_end,
+# not with a request_end of their own.
+END_EVENTS = frozenset({"request_end", "batch_item_end"})
+
+
+@dataclass(frozen=True)
+class TailSamplingStats:
+    traces_kept: int
+    traces_sampled_out: int
+    records_dropped: int
+    traces_buffered: int
+
+
+@dataclass
+class _TraceBuffer:
+    started: float
+    records: list[logging.LogRecord] = field(default_factory=list)
+    error: bool = False
+
+
+class TailSamplingHandler(logging.Handler):
+    """
+    Tail-based sampling keyed by trace_id, in front of a real handler.
+
+    - Records whose event is in `sampled_events` are buffered per trace_id
+    - Everything else (request_start/end, run_error, tool_attempt, ...) passes straight through
+    - On `request_end` (any of `end_events`) the trace is decided: buffered records are emitted when the trace
+      errored (any ERROR record, or status_code >= 500), was slow (duration_ms >= slow_ms),
+      or falls in the deterministic crc32(trace_id) sample; otherwise they are dropped
+
+    Memory is bounded: at most `max_traces` buffered traces and `max_records` per trace.
+    A trace that overflows, is evicted, or never sees request_end within `max_age_s`
+    is flushed in full (undecided traces are kept, never silently lost).
+    """
+
+    def __init__(
+        self,
+        target: logging.Handler,
+        *,
+        sample_rate: float,
+        slow_ms: int = 1000,
+        sampled_events: frozenset[str] = SAMPLED_EVENTS,
+        end_events: frozenset[str] = END_EVENTS,
+        max_traces: int = 10_000,
+        max_records: int = 1_000,
+        max_age_s: float = 30.0,
+        clock: Any = time.monotonic,
+    ) -> None:
+        super().__init__()
+        self.target = target
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.sampled_events = sampled_events
+        self.end_events = end_events
+        self.max_traces = max_traces
+        self.max_records = max_records
+        self.max_age_s = max_age_s
+        self._clock = clock
+        self._traces: OrderedDict[str, _TraceBuffer] = OrderedDict()
+        self._kept = 0
+        self._sampled_out = 0
+        self._dropped = 0
+
+    def is_sampled(self, trace_id: str) -> bool:
+        # deterministic: every process makes the same call for the same trace
+        return zlib.crc32(trace_id.encode()) / 0xFFFFFFFF < self.sample_rate
+
+    def _trace(self, trace_id: str) -> _TraceBuffer:
+        buf = self._traces.get(trace_id)
+        if buf is None:
+            buf = self._traces[trace_id] = _TraceBuffer(started=self._clock())
+            if len(self._traces) > self.max_traces:
+                self._flush(next(iter(self._traces)))
+        return buf
+
+    def _flush(self, trace_id: str) -> None:
+        buf = self._traces.pop(trace_id, None)
+        if buf is not None:
+            for r in buf.records:
+                self.target.handle(r)
+
+    def _expire(self) -> None:
+        # insertion order == age order, so only the head needs checking
+        deadline = self._clock() - self.max_age_s
+        while self._traces:
+            trace_id, buf = next(iter(self._traces.items()))
+            if buf.started > deadline:
+                break
+            self._flush(trace_id)
+
+    def _decide(self, trace_id: str, end: logging.LogRecord) -> None:
+        buf = self._traces.pop(trace_id, None)
+        if buf is None:
+            return
+        status_code = getattr(end, "status_code", None) or 0
+        duration_ms = getattr(end, "duration_ms", None) or 0
+        keep = (
+            buf.error
+            or end.levelno >= logging.ERROR
+            or status_code >= 500
+            or duration_ms >= self.slow_ms
+            or self.is_sampled(trace_id)
+        )
+        if keep:
+            self._kept += 1
+            for r in buf.records:
+                self.target.handle(r)
+        else:
+            self._sampled_out += 1
+            self._dropped += len(buf.records)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._expire()
+            trace_id = getattr(record, "trace_id", None)
+            if not trace_id:
+                self.target.handle(record)
+                return
+
+            event = record.getMessage()
+            if event in self.sampled_events:
+                buf = self._trace(trace_id)
+                buf.records.append(record)
+                buf.error = buf.error or record.levelno >= logging.ERROR
+                if len(buf.records) >= self.max_records:
+                    self._flush(trace_id)
+                return
+
+            if event in self.end_events:
+                self._decide(trace_id, record)
+            elif record.levelno >= logging.ERROR:
+                self._trace(trace_id).error = True
+            self.target.handle(record)
+        except Exception:
+            self.handleError(record)
+
+    def stats(self) -> TailSamplingStats:
+        with self.lock:
+            return TailSamplingStats(
+                traces_kept=self._kept,
+                traces_sampled_out=self._sampled_out,
+                records_dropped=self._dropped,
+                traces_buffered=len(self._traces),
+            )
+
+    def flush(self) -> None:
+        self.target.flush()
+
+    def close(self) -> None:
+        with self.lock:
+            for trace_id in list(self._traces):
+                self._flush(trace_id)
+        self.target.close()
+        super().close()
+
+
+def _make_handler(async_mode: bool) -> logging.Handler:
+    if not async_mode:
+        return logging.StreamHandler()
+    policy = os.getenv("LOG_QUEUE_FULL", "drop")
+    return AsyncBatchHandler(
+        queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+        full_policy=policy,  # type: ignore[arg-type]
+        batch_size=int(os.getenv("LOG_BATCH_SIZE", "256")),
+    )
+
+
+def _with_tail_sampling(handler: logging.Handler) -> logging.Handler:
+    raw = os.getenv("LOG_SAMPLE_RATE", "")
+    if not raw:
+        return handler
+    return TailSamplingHandler(
+        handler,
+        sample_rate=float(raw),
+        slow_ms=int(os.getenv("LOG_SAMPLE_SLOW_MS", "1000")),
+        max_traces=int(os.getenv("LOG_SAMPLE_MAX_TRACES", "10000")),
+        max_records=int(os.getenv("LOG_SAMPLE_MAX_RECORDS", "1000")),
+        max_age_s=float(os.getenv("LOG_SAMPLE_MAX_AGE_S", "30")),
+    )
+
+
+class TraceContextFilter(logging.Filter):
+    """
+    Fills record.trace_id from the ambient Span context when the caller didn't
+    pass one in `extra=...`, so library / helper logs inside a request still
+    correlate. Runs on the emitting thread (handler filters run before queueing).
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "trace_id", None) is None:
+            record.trace_id = current_trace_id()
+        return True
+
+
+def _root_handler(kind: type[logging.Handler]) -> Any:
+    for h in logging.getLogger().handlers:
+        while h is not None:
+            if isinstance(h, kind):
+                return h
+            h = getattr(h, "target", None)
+    return None
+
+
+def log_queue_stats() -> LogQueueStats | None:
+    """Counters of the root AsyncBatchHandler, or None when logging is synchronous."""
+    h = _root_handler(AsyncBatchHandler)
+    return h.stats() if h is not None else None
+
+
+def tail_sampling_stats() -> TailSamplingStats | None:
+    """Counters of the root TailSamplingHandler, or None when sampling is off."""
+    h = _root_handler(TailSamplingHandler)
+    return h.stats() if h is not None else None
+
+
+def configure_logging(async_mode: bool | None = None) -> None:
     """
     Configure root logger to emit JSON logs to stdout.
 
     Notes:
     - Clears existing handlers to avoid duplicated logs.
     - Disables uvicorn loggers so we don't get non-JSON access/error logs.
+    - async_mode (default: env LOG_ASYNC=1) moves formatting + writes to a
+      background thread; see AsyncBatchHandler for the queue/backpressure knobs.
+    - LOG_SAMPLE_RATE=<0..1> enables tail sampling of node/span logs (TailSamplingHandler).
     """
-    handler = logging.StreamHandler()
-    handler.setFormatter(JsonFormatter())
+    if async_mode is None:
+        async_mode = os.getenv("LOG_ASYNC", "").lower() in ("1", "true")
+    output = _make_handler(async_mode)
+    output.setFormatter(JsonFormatter())
+    handler = _with_tail_sampling(output)
+    handler.addFilter(TraceContextFilter())
 
     root = logging.getLogger()
+    for old in root.handlers:
+        if isinstance(old, (AsyncBatchHandler, TailSamplingHandler)):
+            old.close()
     root.handlers = []
     root.setLevel(logging.INFO)
     root.addHandler(handler)
+    if handler is not output or isinstance(output, AsyncBatchHandler):
+        atexit.register(handler.close)
 
     # Make the app the single source of truth for logs (Day 2 hard gate).
     for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
@@ -81,50 +488,3 @@ def configure_logging() -> None:
 
 
 logger = logging.getLogger(__name__)
-
-
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """
-    Logs request_start / request_end for every request in JSON with trace_id.
-    On exceptions:
-      - logs request_error with stack trace
-      - returns a 500 response that includes X-Trace-Id header
-    """
-
-    async def dispatch(self, request: Request, call_next):
-        start = time.time()
-
-        def get_trace_id() -> str | None:
-            # Source of truth is request.state.trace_id (set by TraceIdMiddleware).
-            # Header fallback is read-only to avoid nulls during edge cases.
-            return getattr(request.state, "trace_id", None) or request.headers.get(TRACE_HEADER)
-
-        logger.info("request_start", extra={"trace_id": get_trace_id()})
-
-        try:
-            response = await call_next(request)
-        except Exception:
-            trace_id = get_trace_id()
-            logger.exception("request_error", extra={"trace_id": trace_id})
-
-            resp = PlainTextResponse("Internal Server Error", status_code=500)
-            if trace_id:
-                resp.headers[TRACE_HEADER] = trace_id
-            return resp
-
-        duration_ms = int((time.time() - start) * 1000)
-        logger.info(
-            "request_end",
-            extra={
-                "trace_id": get_trace_id(),
-                "status_code": response.status_code,
-                "duration_ms": duration_ms,
-            },
-        )
-
-        # Ensure trace header exists even if upstream middleware is misordered.
-        trace_id = get_trace_id()
-        if trace_id:
-            response.headers.setdefault(TRACE_HEADER, trace_id)
-
-        return response
@@ -0,0 +1,374 @@
+# src/middleware/metrics.py
+
+import logging
+import mmap
+import struct
+import threading
+from bisect import bisect_left
+from typing import Iterable, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Prometheus-style latency buckets, in seconds.
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class SharedArena:
+    """
+    Shared memory (anonymous MAP_SHARED mmap) holding metric shards for prefork workers,
+    so any process can render totals across all of them. Created in the master before
+    fork(); afterwards every process owns one slot and is its only writer:
+    - slot = [header: dir_used, data_used][directory: (key, first cell, cells) records][float64 cells]
+    - a shard's record is appended after its (zeroed) cells exist and dir_used is bumped
+      last, so readers in other processes never see a half-written record
+    - readers sum a series over every slot; a worker restarted into the same slot keeps
+      appending to it, so counters never go backwards
+    """
+
+    _HEADER = struct.Struct("<QQ")
+    _RECORD = struct.Struct("<HII")  # key length, first cell (in the slot's data area), cells
+
+    def __init__(self, slots: int, slot_bytes: int = 1 << 20) -> None:
+        self.slots = slots
+        self.slot_bytes = slot_bytes - slot_bytes % 64
+        self._dir_bytes = self.slot_bytes // 4
+        self._data_cells = (self.slot_bytes - self._HEADER.size - self._dir_bytes) // 8
+        self._mm = mmap.mmap(-1, slots * self.slot_bytes)
+        self._cells = memoryview(self._mm).cast("d")
+        self.attach(0)
+
+    def attach(self, slot: int) -> None:
+        """Become the writer of `slot` (the master is 0; call again in each forked worker)."""
+        if not 0 <= slot < self.slots:
+            raise ValueError(f"slot out of range: {slot}")
+        self.slot = slot
+        self._alloc_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._parsed: list[tuple[int, dict[str, list[tuple[int, int]]]]] = [(0, {}) for _ in range(self.slots)]
+
+    def _first_cell(self, slot: int) -> int:
+        return (slot * self.slot_bytes + self._HEADER.size + self._dir_bytes) // 8
+
+    def alloc(self, key: str, size: int) -> memoryview | None:
+        """`size` zeroed cells in this process's slot, or None when the slot is full."""
+        raw = key.encode()
+        with self._alloc_lock:
+            base = self.slot * self.slot_bytes
+            dir_used, data_used = self._HEADER.unpack_from(self._mm, base)
+            rec_len = self._RECORD.size + len(raw)
+            if dir_used + rec_len > self._dir_bytes or data_used + size > self._data_cells:
+                return None
+            at = base + self._HEADER.size + dir_used
+            self._RECORD.pack_into(self._mm, at, len(raw), data_used, size)
+            self._mm[at + self._RECORD.size : at + rec_len] = raw
+            self._HEADER.pack_into(self._mm, base, dir_used + rec_len, data_used + size)
+        first = self._first_cell(self.slot) + data_used
+        return self._cells[first : first + size]
+
+    def _index(self, slot: int) -> dict[str, list[tuple[int, int]]]:
+        # incremental: directories are append-only, parse only records added since last time
+        pos, index = self._parsed[slot]
+        base = slot * self.slot_bytes
+        dir_used = self._HEADER.unpack_from(self._mm, base)[0]
+        if pos == dir_used:
+            return index
+        first_cell = self._first_cell(slot)
+        while pos < dir_used:
+            at = base + self._HEADER.size + pos
+            key_len, first, size = self._RECORD.unpack_from(self._mm, at)
+            start = at + self._RECORD.size
+            key = self._mm[start : start + key_len].decode()
+            index.setdefault(key, []).append((first_cell + first, size))
+            pos += self._RECORD.size + key_len
+        self._parsed[slot] = (pos, index)
+        return index
+
+    def totals(self, key: str, size: int) -> list[float]:
+        out = [0.0] * size
+        with self._read_lock:
+            for slot in range(self.slots):
+                for first, n in self._index(slot).get(key, ()):
+                    for i, v in enumerate(self._cells[first : first + n].tolist()):
+                        out[i] += v
+        return out
+
+    def keys(self, prefix: str) -> set[str]:
+        with self._read_lock:
+            return {k for slot in range(self.slots) for k in self._index(slot) if k.startswith(prefix)}
+
+
+class _Sharded:
+    """
+    Per-thread shards: each thread only ever writes its own list, so the hot
+    path takes no lock and cannot lose updates. The lock is taken once per
+    (series, thread) to register a shard, and by readers.
+    Thread ids may be reused after a thread exits; the shard then keeps
+    accumulating for its new owner (still one writer at a time).
+    When the owning registry is shared (prefork), shards are cells in the
+    SharedArena instead of lists, and totals() sums every worker's shards.
+    """
+
+    __slots__ = ("_size", "_shards", "_lock", "_key", "_metric")
+
+    def __init__(self, size: int, key: str = "", metric: "_Metric | None" = None) -> None:
+        self._size = size
+        self._key = key
+        self._metric = metric
+        self._shards: dict[int, list[float] | memoryview] = {}
+        self._lock = threading.Lock()
+
+    def _arena(self) -> SharedArena | None:
+        registry = self._metric.registry if self._metric is not None else None
+        return registry.arena if registry is not None else None
+
+    def _new_shard(self) -> list[float] | memoryview:
+        arena = self._arena()
+        if arena is not None:
+            cells = arena.alloc(self._key, self._size)
+            if cells is not None:
+                return cells
+            logger.warning("metrics_arena_full", extra={"span": self._key})
+        return [0] * self._size
+
+    def shard(self) -> list[float] | memoryview:
+        ident = threading.get_ident()
+        shard = self._shards.get(ident)
+        if shard is None:
+            with self._lock:
+                shard = self._shards.get(ident)
+                if shard is None:
+                    shard = self._shards[ident] = self._new_shard()
+        return shard
+
+    def totals(self) -> list[float]:
+        with self._lock:
+            shards = [s for s in self._shards.values() if isinstance(s, list)]
+        arena = self._arena()
+        out = arena.totals(self._key, self._size) if arena is not None else [0] * self._size
+        for shard in shards:
+            for i, v in enumerate(shard):
+                out[i] += v
+        return out
+
+    def _reset_after_fork(self) -> None:
+        # a forked worker starts with no shards of its own (the parent's stay in its slot)
+        self._shards = {}
+        self._lock = threading.Lock()
+
+
+class _CounterChild:
+    __slots__ = ("_cells",)
+
+    def __init__(self, key: str = "", metric: "_Metric | None" = None) -> None:
+        self._cells = _Sharded(1, key, metric)
+
+    def inc(self, amount: float = 1) -> None:
+        self._cells.shard()[0] += amount
+
+    def value(self) -> float:
+        return self._cells.totals()[0]
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_cells")
+
+    def __init__(self, bounds: tuple[float, ...], key: str = "", metric: "_Metric | None" = None) -> None:
+        self._bounds = bounds
+        # [bucket_0 .. bucket_n-1, +Inf bucket, sum]; count == sum of buckets
+        self._cells = _Sharded(len(bounds) + 2, key, metric)
+
+    def observe(self, value: float) -> None:
+        shard = self._cells.shard()
+        shard[bisect_left(self._bounds, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self) -> tuple[list[float], float]:
+        totals = self._cells.totals()
+        return totals[:-1], totals[-1]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str]) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.registry: MetricsRegistry | None = None  # set on registration
+        self._children: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self, key: str) -> object:
+        raise NotImplementedError
+
+    def _key(self, values: Sequence[str]) -> str:
+        # series id in the SharedArena: name, then each label value, \x1f-separated
+        return self.name + "\x1f" + "\x1f".join(values)
+
+    def labels(self, *values: str):  # -> child; cached, so hot paths pay one dict lookup
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child(self._key(values))
+        return child
+
+    def _items(self) -> list[tuple[tuple[str, ...], object]]:
+        arena = self.registry.arena if self.registry is not None else None
+        if arena is not None:
+            # series only other workers have recorded so far
+            prefix = self.name + "\x1f"
+            for key in arena.keys(prefix):
+                self.labels(*(key[len(prefix):].split("\x1f") if self.labelnames else ()))
+        with self._lock:
+            return sorted(self._children.items())
+
+    def _reset_after_fork(self) -> None:
+        self._lock = threading.Lock()
+        for child in list(self._children.values()):
+            child._cells._reset_after_fork()  # type: ignore[attr-defined]
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self, key: str) -> _CounterChild:
+        return _CounterChild(key, self)
+
+    def render(self) -> Iterable[str]:
+        yield from super().render()
+        for values, child in self._items():
+            yield f"{self.name}{_labels(self.labelnames, values)} {_num(child.value())}"  # type: ignore[attr-defined]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self, key: str) -> _HistogramChild:
+        return _HistogramChild(self.buckets, key, self)
+
+    def render(self) -> Iterable[str]:
+        yield from super().render()
+        for values, child in self._items():
+            counts, total = child.snapshot()  # type: ignore[attr-defined]
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_num(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, values, le)} {_num(cumulative)}"
+            yield f"{self.name}_sum{_labels(self.labelnames, values)} {_num(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, values)} {_num(cumulative)}"
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self.arena: SharedArena | None = None
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric_already_registered:{metric.name}")
+            self._metrics[metric.name] = metric
+        metric.registry = self
+        return metric
+
+    def share(self, arena: SharedArena) -> None:
+        """
+        Prefork master, before fork() and before anything records: shards allocated from
+        now on live in `arena`, so counters/histograms aggregate across workers.
+        """
+        self.arena = arena
+
+    def attach_worker(self, slot: int) -> None:
+        """In a freshly forked worker: write to `slot`, drop the parent's thread shards and locks."""
+        if self.arena is not None:
+            self.arena.attach(slot)
+        self._lock = threading.Lock()
+        for metric in list(self._metrics.values()):
+            metric._reset_after_fork()
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: list[str] = []
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency (request_start to last body chunk).",
+    ["method", "route", "status_code"],
+)
+NODE_DURATION = REGISTRY.histogram(
+    "graph_node_duration_seconds",
+    "Graph node execution time, from _node_span.",
+    ["node", "status"],
+)
+SPAN_DURATION = REGISTRY.histogram(
+    "span_duration_seconds",
+    "Manual Span durations.",
+    ["span", "status"],
+)
+TOOL_ATTEMPTS = REGISTRY.counter(
+    "tool_attempts_total",
+    "MCP tool attempts by policy decision and execution outcome (audit_tool_attempt).",
+    ["tool", "decision", "outcome"],
+)
+TOOL_QUEUE_WAIT = REGISTRY.histogram(
+    "tool_queue_wait_seconds",
+    "Time a tool call waited for a slot on its tool's executor.",
+    ["tool"],
+)
+TOOL_EXEC_DURATION = REGISTRY.histogram(
+    "tool_exec_duration_seconds",
+    "Tool handler execution time on its executor (queue wait excluded).",
+    ["tool", "status"],
+)
+AUDIT_SINK_EVENTS = REGISTRY.counter(
+    "audit_sink_events_total",
+    "Audit events by sink (file / sqlite) and result (written, or dropped on a full queue).",
+    ["sink", "result"],
+)
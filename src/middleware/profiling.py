@@ -0,0 +1,196 @@
+# src/middleware/profiling.py
+
+import cProfile
+import os
+import pstats
+import random
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Iterator
+
+# Opt-in, per trace: PROFILE_SAMPLE_RATE of all requests, or X-Profile: 1 on the request
+# once PROFILE_HEADER_ENABLED=1 (off by default: any client could otherwise turn on
+# process-wide tracemalloc for every concurrent request)
+PROFILE_HEADER = "X-Profile"
+PROFILE_HEADER_ENABLED = os.getenv("PROFILE_HEADER_ENABLED", "0").lower() in ("1", "true")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "15"))
+
+# Span kinds that profile themselves: nodes and manual spans (request/graph/tool only nest)
+PROFILED_KINDS = frozenset({"node", "span"})
+
+_PROFILE_TRACE: ContextVar[str | None] = ContextVar("profile_trace", default=None)  # trace_id
+_RECENT: deque[str] = deque(maxlen=int(os.getenv("PROFILE_RECENT_MAX", "100")))
+
+# one cProfile per thread (a second one would silently replace the first), so a span
+# nested in a profiled span on the same thread is covered by the outer one; spans that
+# find their thread busy with another trace's profile are counted in _SKIPPED
+_thread = threading.local()
+_SKIPPED = 0
+
+# tracemalloc is process-wide: started by the first profiled span, stopped by the last
+_TM_LOCK = threading.Lock()
+_TM_USERS = 0
+_TM_OWNED = False
+_TM_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "*/middleware/spans.py"),
+)
+
+# cProfile entries that are the instrumentation itself (pstats keys: file, line, name)
+_HIDDEN: set[tuple[str, int, str]] = set()
+_HIDDEN_FILES = frozenset({__file__.replace("profiling.py", "spans.py"), __file__})
+
+
+def hide(*fns: Any) -> None:
+    """Leaves these functions (span wrappers that run while a profile stops) out of results."""
+    for fn in fns:
+        code = fn.__code__
+        _HIDDEN.add((code.co_filename, code.co_firstlineno, code.co_name))
+
+
+def requested(header_value: bytes | None) -> bool:
+    if header_value is not None and PROFILE_HEADER_ENABLED and header_value.lower() not in (b"", b"0", b"false"):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def enable(trace_id: str) -> Token:
+    """Profile every eligible span in the current context (reset the token to stop)."""
+    _RECENT.append(trace_id)
+    return _PROFILE_TRACE.set(trace_id)
+
+
+def disable(token: Token) -> None:
+    _PROFILE_TRACE.reset(token)
+
+
+@contextmanager
+def profile_trace(trace_id: str) -> Iterator[None]:
+    """For callers outside HTTP (run_graph in a script/test): profile what runs inside."""
+    token = enable(trace_id)
+    try:
+        yield
+    finally:
+        disable(token)
+
+
+def enabled() -> bool:
+    return _PROFILE_TRACE.get() is not None
+
+
+def recent_traces() -> list[str]:
+    return list(reversed(_RECENT))
+
+
+def skipped_spans() -> int:
+    """Spans of a profiled trace left unprofiled: their thread was already profiling."""
+    return _SKIPPED
+
+
+def _short(path: str) -> str:
+    for marker in ("site-packages/", "/src/", "/lib/python"):
+        i = path.rfind(marker)
+        if i >= 0:
+            return path[i + 1 :] if marker != "site-packages/" else path[i + len(marker) :]
+    return path
+
+
+def _tm_acquire() -> bool:
+    """Returns True when other traced allocations may exist (take a baseline snapshot)."""
+    global _TM_USERS, _TM_OWNED
+    with _TM_LOCK:
+        if _TM_USERS == 0:
+            _TM_OWNED = not tracemalloc.is_tracing()
+            if _TM_OWNED:
+                tracemalloc.start()
+        _TM_USERS += 1
+        return _TM_USERS > 1 or not _TM_OWNED
+
+
+def _tm_release() -> None:
+    global _TM_USERS
+    with _TM_LOCK:
+        _TM_USERS -= 1
+        if _TM_USERS == 0 and _TM_OWNED:
+            tracemalloc.stop()
+
+
+class SpanProfiler:
+    """
+    cProfile + tracemalloc around one span. stop() returns the top PROFILE_TOP_N
+    functions by cumulative time and allocation sites by net bytes allocated (and still
+    alive) while the span ran. Allocations are process-wide: concurrent requests
+    during the span show up too. CPU time is per thread, not per trace: a sync node on a
+    worker thread gets a clean profile, but an async node profiles the event loop
+    thread, so coroutines of other requests that run while it awaits are included,
+    and spans of other profiled traces on that loop meanwhile are skipped (skipped_spans()).
+    """
+
+    def __init__(self) -> None:
+        self._cpu = cProfile.Profile()
+        self._before: tracemalloc.Snapshot | None = None
+
+    @classmethod
+    def maybe_start(cls, kind: str) -> "SpanProfiler | None":
+        global _SKIPPED
+        # the only cost when profiling is off: one ContextVar.get()
+        trace_id = _PROFILE_TRACE.get()
+        if trace_id is None or kind not in PROFILED_KINDS:
+            return None
+        busy = getattr(_thread, "busy", None)  # trace_id of the profile running on this thread
+        if busy is not None:
+            if busy != trace_id:
+                with _TM_LOCK:
+                    _SKIPPED += 1
+            return None
+        prof = cls()
+        if _tm_acquire():
+            prof._before = tracemalloc.take_snapshot().filter_traces(_TM_FILTERS)
+        _thread.busy = trace_id
+        prof._cpu.enable()
+        return prof
+
+    def stop(self) -> dict[str, Any]:
+        self._cpu.disable()
+        _thread.busy = None
+        after = tracemalloc.take_snapshot().filter_traces(_TM_FILTERS)
+        _tm_release()
+        return {"cpu": self._cpu_top(), "alloc": self._alloc_top(after)}
+
+    def _cpu_top(self) -> list[dict[str, Any]]:
+        stats = pstats.Stats(self._cpu).stats  # type: ignore[attr-defined]
+        rows = sorted(
+            (
+                (key, nc, tt, ct)
+                for key, (_, nc, tt, ct, _) in stats.items()
+                if key[0] not in _HIDDEN_FILES and key not in _HIDDEN and not (key[0] == "~" and "disable" in key[2])
+            ),
+            key=lambda r: r[3],
+            reverse=True,
+        )
+        return [
+            {
+                "function": f"{_short(file)}:{line}({func})" if file != "~" else func,
+                "calls": nc,
+                "tottime_ms": round(tt * 1000, 3),
+                "cumtime_ms": round(ct * 1000, 3),
+            }
+            for (file, line, func), nc, tt, ct in rows[:PROFILE_TOP_N]
+        ]
+
+    def _alloc_top(self, after: tracemalloc.Snapshot) -> list[dict[str, Any]]:
+        if self._before is not None:
+            stats = [(s.traceback, s.size_diff, s.count_diff) for s in after.compare_to(self._before, "lineno")]
+        else:
+            stats = [(s.traceback, s.size, s.count) for s in after.statistics("lineno")]
+        stats = sorted((s for s in stats if s[1] > 0), key=lambda s: s[1], reverse=True)
+        return [
+            {"site": f"{_short(tb[0].filename)}:{tb[0].lineno}", "size_bytes": size, "count": count}
+            for tb, size, count in stats[:PROFILE_TOP_N]
+        ]
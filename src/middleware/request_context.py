@@ -0,0 +1,135 @@
+# src/middleware/request_context.py
+
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, MutableMapping
+
+from starlette.datastructures import MutableHeaders
+
+from src.middleware import profiling
+from src.middleware.metrics import REQUEST_LATENCY
+from src.middleware.spans import Span
+
+TRACE_HEADER = "X-Trace-Id"
+_TRACE_HEADER_RAW = TRACE_HEADER.lower().encode("latin-1")
+_PROFILE_HEADER_RAW = profiling.PROFILE_HEADER.lower().encode("latin-1")
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+logger = logging.getLogger(__name__)
+
+
+def _incoming_headers(scope: Scope) -> tuple[str | None, bytes | None]:
+    # (X-Trace-Id, X-Profile) in one pass over the raw headers
+    trace_id = profile = None
+    for name, value in scope.get("headers", ()):
+        if name == _TRACE_HEADER_RAW:
+            trace_id = value.decode("latin-1") or None
+        elif name == _PROFILE_HEADER_RAW:
+            profile = value
+    return trace_id, profile
+
+
+class RequestContextMiddleware:
+    """
+    Single pure-ASGI middleware for every HTTP request:
+    - trace_id from X-Trace-Id (or a new uuid4 hex) -> request.state.trace_id
+    - echoes X-Trace-Id on the response
+    - logs request_start / request_end (status_code, duration_ms via perf_counter_ns)
+    - on an unhandled exception before the response started: logs request_error and
+      returns a 500 that still carries X-Trace-Id
+    - records http_request_duration_seconds by method / route template / status_code
+    - opens the root kind="request" Span, so graph / node / tool spans nest under it
+      (see GET /debug/traces/{trace_id})
+    - X-Profile: 1 (or PROFILE_SAMPLE_RATE) profiles the request's node spans
+      (see src.middleware.profiling, GET /debug/profiles/{trace_id})
+
+    No BaseHTTPMiddleware: no extra task or memory stream per request, and
+    streaming bodies pass through untouched; request_end is logged when the
+    last body chunk has been sent.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id, profile = _incoming_headers(scope)
+        trace_id = trace_id or uuid.uuid4().hex
+        scope.setdefault("state", {})["trace_id"] = trace_id  # read back as request.state.trace_id
+        profile_token = profiling.enable(trace_id) if profiling.requested(profile) else None
+
+        span = Span("request", trace_id, kind="request", attrs={"method": scope["method"], "path": scope["path"]}, log=False)
+        start_ns = time.perf_counter_ns()
+        status_code = 500
+        response_started = False
+        ended = False
+
+        def log_end() -> None:
+            nonlocal ended
+            if ended:
+                return
+            ended = True
+            elapsed_ns = time.perf_counter_ns() - start_ns
+            logger.info(
+                "request_end",
+                extra={
+                    "trace_id": trace_id,
+                    "status_code": status_code,
+                    "duration_ms": elapsed_ns // 1_000_000,
+                },
+            )
+            # route template (set by FastAPI on match), never the raw path: bounded label cardinality
+            route = getattr(scope.get("route"), "path", "unmatched")
+            span.attrs["route"] = route
+            span.attrs["status_code"] = status_code
+            if status_code >= 500:
+                span.status = "error"
+            REQUEST_LATENCY.labels(scope["method"], route, str(status_code)).observe(elapsed_ns / 1e9)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                status_code = message["status"]
+                MutableHeaders(scope=message)[TRACE_HEADER] = trace_id
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                log_end()
+
+        logger.info("request_start", extra={"trace_id": trace_id})
+        span.__enter__()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            logger.exception("request_error", extra={"trace_id": trace_id})
+            if response_started:
+                # Headers are already on the wire; let the server abort the connection.
+                log_end()
+                raise
+            status_code = 500
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 500,
+                    "headers": [
+                        (b"content-type", b"text/plain; charset=utf-8"),
+                        (_TRACE_HEADER_RAW, trace_id.encode("latin-1")),
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": b"Internal Server Error"})
+        finally:
+            # client disconnects / apps that never finish the body still get a request_end
+            log_end()
+            span.__exit__(None, None, None)
+            if profile_token is not None:
+                profiling.disable(profile_token)
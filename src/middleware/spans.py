@@ -1,38 +1,229 @@
 # src/middleware/spans.py
 
-import time
 import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.middleware.metrics import SPAN_DURATION
+from src.middleware.profiling import SpanProfiler
 
 logger = logging.getLogger(__name__)
 
+# Ambient tracing context: set by the request middleware / any enclosing Span,
+# inherited by async tasks, anyio worker threads and LangGraph node execution.
+_CURRENT_TRACE_ID: ContextVar[str | None] = ContextVar("trace_id", default=None)
+_CURRENT_SPAN: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+
+def current_trace_id() -> str | None:
+    return _CURRENT_TRACE_ID.get()
+
+
+def current_span() -> "Span | None":
+    return _CURRENT_SPAN.get()
+
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+@dataclass(frozen=True)
+class SpanRecord:
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    name: str
+    kind: str
+    start_unix_ns: int  # wall clock, for display only
+    start_ns: int  # perf_counter_ns: ordering/offsets within a process
+    duration_ns: int
+    status: str
+    attrs: dict[str, Any] = field(default_factory=dict)
+
+
+class TraceStore:
+    """
+    Ring buffer of recent traces: at most `max_traces` trace_ids (oldest evicted
+    first) and `max_spans` spans per trace (extra spans are counted, not stored).
+    """
+
+    def __init__(self, max_traces: int = 1000, max_spans: int = 2000) -> None:
+        self.max_traces = max_traces
+        self.max_spans = max_spans
+        self._traces: OrderedDict[str, list[SpanRecord]] = OrderedDict()
+        self._dropped: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, rec: SpanRecord) -> None:
+        with self._lock:
+            spans = self._traces.get(rec.trace_id)
+            if spans is None:
+                spans = self._traces[rec.trace_id] = []
+                while len(self._traces) > self.max_traces:
+                    evicted, _ = self._traces.popitem(last=False)
+                    self._dropped.pop(evicted, None)
+            if len(spans) >= self.max_spans:
+                self._dropped[rec.trace_id] = self._dropped.get(rec.trace_id, 0) + 1
+                return
+            spans.append(rec)
+
+    def get(self, trace_id: str) -> list[SpanRecord] | None:
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            return list(spans) if spans is not None else None
+
+    def tree(self, trace_id: str) -> dict[str, Any] | None:
+        """Span tree for one trace: roots are spans whose parent is not in this trace."""
+        spans = self.get(trace_id)
+        if spans is None:
+            return None
+        spans.sort(key=lambda s: s.start_ns)
+        t0 = spans[0].start_ns
+        nodes = {
+            s.span_id: {
+                "span_id": s.span_id,
+                "parent_id": s.parent_id,
+                "name": s.name,
+                "kind": s.kind,
+                "start_unix_ms": s.start_unix_ns // 1_000_000,
+                "offset_us": (s.start_ns - t0) // 1000,
+                "duration_us": s.duration_ns // 1000,
+                "status": s.status,
+                "attrs": s.attrs,
+                "children": [],
+            }
+            for s in spans
+        }
+        roots = []
+        for s in spans:
+            parent = nodes.get(s.parent_id) if s.parent_id else None
+            (parent["children"] if parent else roots).append(nodes[s.span_id])
+        with self._lock:
+            dropped = self._dropped.get(trace_id, 0)
+        return {"trace_id": trace_id, "span_count": len(spans), "spans_dropped": dropped, "spans": roots}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._traces.clear()
+            self._dropped.clear()
+
+
+TRACE_STORE = TraceStore(
+    max_traces=int(os.getenv("TRACE_STORE_MAX_TRACES", "1000")),
+    max_spans=int(os.getenv("TRACE_STORE_MAX_SPANS", "2000")),
+)
+
 
 class Span:
-    def __init__(self, name: str, trace_id: str):
+    """
+    Timed, nestable span.
+    - trace_id defaults to the ambient trace (contextvar); parent is the enclosing
+      Span of the same trace, so request -> graph -> node -> tool nests on its own
+    - nanosecond monotonic timing (perf_counter_ns); finished spans go to TRACE_STORE
+    - log=True keeps the span_start / span_end JSON logs (manual spans);
+      instrumented layers (request/graph/node/tool) log their own events and pass log=False
+    - in a profiled trace (src.middleware.profiling) node and manual spans run under
+      cProfile + tracemalloc; the top functions / allocation sites land in attrs["profile"]
+    Works as `with` and `async with`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str | None = None,
+        *,
+        kind: str = "span",
+        attrs: dict[str, Any] | None = None,
+        log: bool = True,
+    ):
         self.name = name
-        self.trace_id = trace_id
-        self.start = None
+        self.trace_id = trace_id or current_trace_id() or ""
+        self.kind = kind
+        self.attrs: dict[str, Any] = attrs or {}
+        self.log = log
+        self.span_id = _new_span_id()
+        self.parent_id: str | None = None
+        self.start = None  # time.time() at start; kept for existing callers
+        self.duration_ns = 0
+        self.status = "ok"
+        self._start_ns = 0
+        self._start_unix_ns = 0
+        self._tokens: tuple[Token, Token] | None = None
+        self._profiler: SpanProfiler | None = None
+
+    @property
+    def duration_ms(self) -> int:
+        return self.duration_ns // 1_000_000
 
     def __enter__(self):
-        self.start = time.time()
-        logger.info(
-            "span_start",
-            extra={
-                "trace_id": self.trace_id,
-                "span": self.name,
-            },
-        )
+        parent = _CURRENT_SPAN.get()
+        if parent is not None and parent.trace_id == self.trace_id:
+            self.parent_id = parent.span_id
+        self._tokens = (_CURRENT_SPAN.set(self), _CURRENT_TRACE_ID.set(self.trace_id or None))
+        self._start_unix_ns = time.time_ns()
+        self.start = self._start_unix_ns / 1e9
+        if self.log:
+            logger.info(
+                "span_start",
+                extra={
+                    "trace_id": self.trace_id,
+                    "span": self.name,
+                },
+            )
+        self._profiler = SpanProfiler.maybe_start(self.kind)
+        self._start_ns = time.perf_counter_ns()
         return self
 
     def __exit__(self, exc_type, exc, tb):
-        duration_ms = int((time.time() - self.start) * 1000)
-        status = "error" if exc else "ok"
-
-        logger.info(
-            "span_end",
-            extra={
-                "trace_id": self.trace_id,
-                "span": self.name,
-                "duration_ms": duration_ms,
-                "status": status,
-            },
-        )
+        self.duration_ns = time.perf_counter_ns() - self._start_ns
+        if exc is not None:
+            self.status = "error"
+        if self._profiler is not None:
+            # copy: callers may share one attrs dict between spans (_node_span does)
+            self.attrs = {**self.attrs, "profile": self._profiler.stop()}
+            self._profiler = None
+        if self._tokens is not None:
+            span_token, trace_token = self._tokens
+            _CURRENT_SPAN.reset(span_token)
+            _CURRENT_TRACE_ID.reset(trace_token)
+            self._tokens = None
+
+        if self.kind == "span":
+            SPAN_DURATION.labels(self.name, self.status).observe(self.duration_ns / 1e9)
+        if self.trace_id:
+            TRACE_STORE.add(
+                SpanRecord(
+                    trace_id=self.trace_id,
+                    span_id=self.span_id,
+                    parent_id=self.parent_id,
+                    name=self.name,
+                    kind=self.kind,
+                    start_unix_ns=self._start_unix_ns,
+                    start_ns=self._start_ns,
+                    duration_ns=self.duration_ns,
+                    status=self.status,
+                    attrs=self.attrs,
+                )
+            )
+        if self.log:
+            logger.info(
+                "span_end",
+                extra={
+                    "trace_id": self.trace_id,
+                    "span": self.name,
+                    "duration_ms": self.duration_ms,
+                    "status": self.status,
+                },
+            )
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.__exit__(exc_type, exc, tb)
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import bisect
+import fnmatch
+import logging
+import os
+import posixpath
+import re
+import stat
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator, Literal
+
+from src.core import prefork
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class FileMeta:
+    path: str  # repo-relative, "/"-separated, e.g. "data/sub/a.txt"
+    type: Literal["file", "dir"]
+    size: int
+    mtime_ns: int
+
+
+@dataclass(frozen=True)
+class IndexSnapshot:
+    """Immutable view of the tree; replaced wholesale on refresh, so readers need no lock."""
+
+    meta: dict[str, FileMeta] = field(default_factory=dict)
+    paths: list[str] = field(default_factory=list)  # sorted, for prefix ranges + cursors
+    children: dict[str, list[str]] = field(default_factory=dict)  # dir -> sorted direct children
+    built_at: float = 0.0
+
+
+def confine(path: str, rel_root: str = "data") -> str | None:
+    """Normalized repo-relative path if it stays inside `rel_root`, else None."""
+    norm = posixpath.normpath(path)
+    if norm != rel_root and not norm.startswith(rel_root + "/"):
+        return None
+    return norm
+
+
+def _literal_prefix(glob: str) -> str:
+    cut = min((i for i in (glob.find(c) for c in "*?[") if i != -1), default=len(glob))
+    return glob[:cut]
+
+
+class DataIndex:
+    """
+    In-memory metadata index of one directory tree (path, size, mtime, type).
+    - refresh(): rescans only directories whose mtime changed (entries added /
+      removed / renamed), plus a full rescan every `full_rescan_s` to pick up
+      in-place file rewrites (those don't touch the parent dir's mtime)
+    - symlinks are never indexed, so nothing outside the tree is reachable
+    - list()/stat() read the current snapshot: O(log n) range lookup + page scan
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        *,
+        rel_root: str = "data",
+        full_rescan_s: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.root = root
+        self.rel_root = rel_root
+        self.full_rescan_s = full_rescan_s
+        self._clock = clock
+        self._snapshot = IndexSnapshot()
+        self._ready = threading.Event()
+        self._refresh_lock = threading.Lock()
+        # refresher-owned mutable state
+        self._meta: dict[str, FileMeta] = {}
+        self._children: dict[str, set[str]] = {}
+        self._root_mtime: int | None = None
+        self._dirty = False
+        self._last_full = float("-inf")
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    # --- building -----------------------------------------------------------
+
+    def _abs(self, rel: str) -> str:
+        return os.path.join(self.root.parent, rel) if rel != self.rel_root else str(self.root)
+
+    def _scan_dir(self, rel_dir: str, *, recursive: bool) -> None:
+        """(Re)reads one directory's entries into _meta/_children."""
+        old = self._children.get(rel_dir, set())
+        new: set[str] = set()
+        subdirs: list[str] = []
+        try:
+            with os.scandir(self._abs(rel_dir)) as it:
+                for entry in it:
+                    if entry.is_symlink():
+                        continue
+                    rel = f"{rel_dir}/{entry.name}"
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except FileNotFoundError:
+                        continue
+                    if stat.S_ISDIR(st.st_mode):
+                        kind: Literal["file", "dir"] = "dir"
+                        prev = self._meta.get(rel)
+                        if recursive or prev is None or prev.mtime_ns != st.st_mtime_ns:
+                            subdirs.append(rel)
+                    elif stat.S_ISREG(st.st_mode):
+                        kind = "file"
+                    else:
+                        continue
+                    m = FileMeta(rel, kind, st.st_size, st.st_mtime_ns)
+                    if self._meta.get(rel) != m:
+                        self._meta[rel] = m
+                        self._dirty = True
+                    new.add(rel)
+        except (FileNotFoundError, NotADirectoryError):
+            pass
+        for gone in old - new:
+            self._forget(gone)
+        self._children[rel_dir] = new
+        for sub in subdirs:
+            self._scan_dir(sub, recursive=recursive)
+
+    def _forget(self, rel: str) -> None:
+        if self._meta.pop(rel, None) is not None:
+            self._dirty = True
+        for child in self._children.pop(rel, ()):
+            self._forget(child)
+
+    def refresh(self, *, full: bool = False) -> bool:
+        """Brings the index up to date; returns True if a new snapshot was published."""
+        with self._refresh_lock:
+            self._dirty = False
+            now = self._clock()
+            if full or now - self._last_full >= self.full_rescan_s:
+                self._root_mtime = self._dir_mtime(self.rel_root)
+                self._scan_dir(self.rel_root, recursive=True)
+                self._last_full = now
+            else:
+                self._refresh_changed_dirs()
+            changed = self._dirty
+            if changed or not self._ready.is_set():
+                self._publish()
+            self._ready.set()
+            return changed
+
+    def _dir_mtime(self, rel: str) -> int | None:
+        try:
+            return os.stat(self._abs(rel)).st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    def _refresh_changed_dirs(self) -> None:
+        """One stat per known directory; rescan (one level) only those whose mtime moved."""
+        mtime = self._dir_mtime(self.rel_root)
+        if mtime != self._root_mtime:
+            self._root_mtime = mtime
+            self._scan_dir(self.rel_root, recursive=False)
+        for rel in [d for d in self._children if d != self.rel_root]:
+            known = self._meta.get(rel)
+            if known is None:
+                continue  # dropped by an earlier rescan in this pass
+            mtime = self._dir_mtime(rel)
+            if mtime is not None and mtime != known.mtime_ns:
+                self._meta[rel] = FileMeta(rel, "dir", known.size, mtime)
+                self._dirty = True
+                self._scan_dir(rel, recursive=False)
+
+    def _publish(self) -> None:
+        meta = dict(self._meta)
+        self._snapshot = IndexSnapshot(
+            meta=meta,
+            paths=sorted(meta),
+            children={d: sorted(c) for d, c in self._children.items()},
+            built_at=time.time(),
+        )
+
+    def start(self, poll_s: float = 2.0) -> None:
+        """Initial build + polling refresh on a daemon thread."""
+        if self._thread is not None:
+            return
+        self._poll_s = poll_s
+        prefork.register(self)
+
+        def loop() -> None:
+            while not self._stop.is_set():
+                try:
+                    self.refresh()
+                except Exception:
+                    logger.exception("data_index_refresh_error")
+                    self._ready.set()
+                self._stop.wait(poll_s)
+
+        self._thread = threading.Thread(target=loop, name="data-index", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _before_fork(self) -> None:
+        # no thread may be mid-refresh (holding the lock) when the process is copied
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+
+    def _after_fork(self, in_child: bool) -> None:
+        # workers keep polling from the snapshot they inherited; the master only supervises
+        if in_child and self._thread is not None:
+            self._thread = None
+            self._stop = threading.Event()
+            self.start(self._poll_s)
+
+    def snapshot(self, timeout: float | None = 5.0) -> IndexSnapshot:
+        """Current snapshot; waits for the initial build (builds inline if never started)."""
+        if not self._ready.is_set():
+            if self._thread is None:
+                self.refresh()
+            else:
+                self._ready.wait(timeout)
+        return self._snapshot
+
+    # --- queries ------------------------------------------------------------
+
+    def list(
+        self,
+        prefix: str,
+        *,
+        glob: str | None = None,
+        recursive: bool = True,
+        cursor: str | None = None,
+        limit: int = 100,
+        keep: Callable[[FileMeta], bool] | None = None,
+    ) -> tuple[list[FileMeta], str | None]:
+        """
+        Entries under `prefix` (a directory), sorted by path, at most `limit`.
+        `cursor` is the last path of the previous page (stable across refreshes).
+        `glob` uses fnmatch semantics against the full path (`*` also matches `/`).
+        """
+        snap = self.snapshot()
+        prefix = prefix.rstrip("/")
+        regex = re.compile(fnmatch.translate(glob)) if glob else None
+
+        if recursive:
+            lo_key = prefix + "/"
+            if regex is not None:  # narrow the range to the glob's literal prefix
+                lit = _literal_prefix(glob)  # type: ignore[arg-type]
+                if lit.startswith(lo_key):
+                    lo_key = lit
+                elif not lo_key.startswith(lit):
+                    return [], None
+            candidates = snap.paths
+            start = bisect.bisect_left(candidates, lo_key)
+            if cursor is not None:
+                start = max(start, bisect.bisect_right(candidates, cursor))
+            source: Iterator[str] = _take_prefix(candidates, start, lo_key)
+        else:
+            candidates = snap.children.get(prefix, [])
+            start = bisect.bisect_right(candidates, cursor) if cursor is not None else 0
+            source = iter(candidates[start:])
+
+        out: list[FileMeta] = []
+        meta = snap.meta
+        for path in source:
+            if regex is not None and regex.match(path) is None:
+                continue
+            m = meta[path]
+            if keep is not None and not keep(m):
+                continue
+            out.append(m)
+            if len(out) == limit:
+                return out, path
+        return out, None
+
+    def stat(self, path: str) -> FileMeta | None:
+        return self.snapshot().meta.get(path)
+
+
+def _take_prefix(paths: list[str], start: int, prefix: str) -> Iterator[str]:
+    for i in range(start, len(paths)):
+        p = paths[i]
+        if not p.startswith(prefix):
+            return
+        yield p
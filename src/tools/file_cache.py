@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+
+# (st_dev, st_ino, st_size, st_mtime_ns): any change means a different file version
+FileIdentity = tuple[int, int, int, int]
+
+
+def file_identity(st: os.stat_result) -> FileIdentity:
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+@dataclass(frozen=True)
+class FileCacheStats:
+    hits: int
+    misses: int
+    evictions: int  # LRU / byte-budget evictions
+    invalidations: int  # entries dropped because the file's identity changed
+    bypassed: int  # reads not stored: too big, or modified too recently to trust mtime
+    entries: int
+    bytes: int
+
+
+@dataclass(frozen=True)
+class CachedFile:
+    identity: FileIdentity
+    data: bytes
+    text: str  # whole file, decoded once
+    ascii: bool  # byte offsets == str offsets, so ranges can slice `text` directly
+    # budget cost: raw bytes + decoded text counted in UTF-8 bytes, not characters
+    # (a CJK character is 1 in len() but up to 4 bytes in memory)
+    nbytes: int
+
+
+class FileContentCache:
+    """
+    Byte-budgeted LRU of file contents, one entry per resolved path.
+    An entry is only served when the caller's fresh stat() identity matches the one
+    it was stored with, so a changed file can never be served stale. Files modified
+    within `racy_window_s` are not stored at all: a same-size rewrite inside one
+    mtime tick would otherwise keep the old identity.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entry_bytes: int = 1024 * 1024,
+        racy_window_s: float = 2.0,
+        clock: Callable[[], float] = time.time,  # wall clock: compared against st_mtime
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.racy_window_s = racy_window_s
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, CachedFile] = OrderedDict()
+        self._bytes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._bypassed = 0
+
+    @classmethod
+    def from_env(cls) -> FileContentCache | None:
+        """None when READ_FILE_CACHE_MAX_BYTES=0."""
+        max_bytes = int(os.getenv("READ_FILE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        if max_bytes <= 0:
+            return None
+        return cls(
+            max_bytes=max_bytes,
+            max_entry_bytes=int(os.getenv("READ_FILE_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024))),
+        )
+
+    def get(self, key: str, identity: FileIdentity) -> CachedFile | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.identity == identity:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry
+                self._drop(key)
+                self._invalidations += 1
+            self._misses += 1
+            return None
+
+    def put(self, key: str, st: os.stat_result, data: bytes) -> tuple[CachedFile, bool]:
+        """Builds the entry and stores it if it qualifies; returns (entry, stored)."""
+        text = data.decode("utf-8", errors="replace")
+        ascii = data.isascii()
+        entry = CachedFile(
+            identity=file_identity(st),
+            data=data,
+            text=text,
+            ascii=ascii,
+            nbytes=len(data) + (len(data) if ascii else len(text.encode("utf-8"))),
+        )
+        racy = self._clock() - st.st_mtime_ns / 1e9 < self.racy_window_s
+        with self._lock:
+            if racy or len(data) > self.max_entry_bytes or entry.nbytes > self.max_bytes:
+                self._bypassed += 1
+                return entry, False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._evictions += 1
+        return entry, True
+
+    def note_bypass(self) -> None:
+        """Caller served a read without the cache (file above max_entry_bytes)."""
+        with self._lock:
+            self._bypassed += 1
+
+    def _drop(self, key: str) -> None:
+        self._bytes -= self._entries.pop(key).nbytes
+
+    def stats(self) -> FileCacheStats:
+        with self._lock:
+            return FileCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                invalidations=self._invalidations,
+                bypassed=self._bypassed,
+                entries=len(self._entries),
+                bytes=self._bytes,
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+
+from src.core.policy import current_policy
+from src.mcp.models import FileEntry, ListFilesRequest, ListFilesResponse, StatFilesRequest, StatFilesResponse
+from src.tools.data_index import DataIndex, FileMeta, confine
+from src.tools.registry import ToolSpec, register_tool
+
+DATA_INDEX_POLL_S = float(os.getenv("DATA_INDEX_POLL_S", "2"))
+DATA_INDEX_FULL_RESCAN_S = float(os.getenv("DATA_INDEX_FULL_RESCAN_S", "60"))
+
+# One index per repo root (tests point tools at tmp trees); the default one starts at import.
+_INDEXES: dict[Path, DataIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+class ListFilesError(Exception):
+    pass
+
+
+def index_for(repo_root: Path) -> DataIndex:
+    with _INDEXES_LOCK:
+        idx = _INDEXES.get(repo_root)
+        if idx is None:
+            idx = _INDEXES[repo_root] = DataIndex(repo_root / "data", full_rescan_s=DATA_INDEX_FULL_RESCAN_S)
+            idx.start(poll_s=DATA_INDEX_POLL_S)
+        return idx
+
+
+def _normalize(path: str) -> str:
+    """Repo-relative "data[/...]" or ListFilesError; symlinks are never in the index."""
+    norm = confine(path)
+    if norm is None:
+        raise ListFilesError("path_outside_data_dir")
+    return norm
+
+
+def _entry(m: FileMeta) -> FileEntry:
+    return FileEntry(path=m.path, type=m.type, size=m.size, mtime_ns=m.mtime_ns)
+
+
+def _handle_list_files(*, repo_root: Path, req: ListFilesRequest) -> ListFilesResponse:
+    try:
+        prefix = _normalize(req.path)
+    except ListFilesError as e:
+        return ListFilesResponse(ok=False, error=str(e))
+    idx = index_for(repo_root)
+    if prefix != "data":
+        m = idx.stat(prefix)
+        if m is None or m.type != "dir":
+            return ListFilesResponse(ok=False, error="file_not_found")
+
+    # entries the policy's path rules would deny are hidden, not just unreadable
+    policy = current_policy()
+    metas, next_cursor = idx.list(
+        prefix,
+        glob=req.glob,
+        recursive=req.recursive,
+        cursor=req.cursor,
+        limit=req.limit,
+        keep=lambda m: policy.decide("list_files", m.path).allowed,
+    )
+    return ListFilesResponse(ok=True, entries=[_entry(m) for m in metas], next_cursor=next_cursor)
+
+
+def _handle_stat_files(*, repo_root: Path, req: StatFilesRequest) -> StatFilesResponse:
+    try:
+        paths = [_normalize(p) for p in req.paths]
+    except ListFilesError as e:
+        return StatFilesResponse(ok=False, error=str(e))
+    idx = index_for(repo_root)
+    entries: list[FileEntry] = []
+    missing: list[str] = []
+    for path in paths:
+        m = idx.stat(path)
+        if m is None:
+            missing.append(path)
+        else:
+            entries.append(_entry(m))
+    return StatFilesResponse(ok=True, entries=entries, missing=missing)
+
+
+def _redact_list_files(req: ListFilesRequest) -> dict[str, str]:
+    out = {"path": req.path}
+    if req.glob is not None:
+        out["glob"] = req.glob
+    if req.cursor is not None:
+        out["cursor"] = req.cursor
+    return out
+
+
+def _redact_stat_files(req: StatFilesRequest) -> dict[str, str]:
+    return {"paths": ",".join(req.paths)[:512], "count": str(len(req.paths))}
+
+
+def _summarize_list_files(resp: ListFilesResponse) -> str:
+    return f"entries={len(resp.entries)} more={resp.next_cursor is not None}"
+
+
+def _summarize_stat_files(resp: StatFilesResponse) -> str:
+    return f"found={len(resp.entries)} missing={len(resp.missing)}"
+
+
+register_tool(
+    ToolSpec(
+        name="list_files",
+        request_model=ListFilesRequest,
+        response_model=ListFilesResponse,
+        handler=_handle_list_files,
+        redact=_redact_list_files,
+        summarize=_summarize_list_files,
+    )
+)
+register_tool(
+    ToolSpec(
+        name="stat_files",
+        request_model=StatFilesRequest,
+        response_model=StatFilesResponse,
+        handler=_handle_stat_files,
+        redact=_redact_stat_files,
+        summarize=_summarize_stat_files,
+    )
+)
+
+# build the default tree's index at startup, off the request path
+index_for(Path(__file__).resolve().parents[2])
@@ -1,58 +1,280 @@
 from __future__ import annotations
 from src.mcp.models import ReadFileRequest, ReadFileResponse
-from src.tools.registry import ToolSpec, register_tool
+from src.tools.file_cache import FileCacheStats, FileContentCache, file_identity
+from src.tools.registry import ToolSpec, register_stream_handler, register_tool
 
+import functools
+import mmap
+import os
+import stat
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Iterator
+
+# Per-call range cap; also the whole-file cap for reads without a range (legacy guardrail).
+MAX_READ_BYTES = 64_000
+# Hard cap on the size of any file we will touch, ranged or streamed.
+MAX_FILE_BYTES = int(os.getenv("READ_FILE_MAX_FILE_BYTES", str(1 << 30)))
+# Files at least this big are sliced through mmap instead of pread.
+MMAP_THRESHOLD = 256 * 1024
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# In-process content cache (READ_FILE_CACHE_MAX_BYTES=0 turns it off); streams bypass it.
+_CACHE: FileContentCache | None = FileContentCache.from_env()
+
+
+def cache_stats() -> FileCacheStats | None:
+    return _CACHE.stats() if _CACHE is not None else None
 
 
 @dataclass(frozen=True)
 class ReadFileResult:
-    bytes: int
+    bytes: int  # total file size (fstat)
     preview: str
+    offset: int = 0
+    length: int = 0  # bytes actually returned
+    content: str = ""
+    eof: bool = True
+    cache: str = "off"  # hit | miss | bypass | off
 
 
 class ReadFileError(Exception):
     pass
 
 
-def read_file_safe(*, repo_root: Path, relative_path: str, max_bytes: int = 64_000) -> ReadFileResult:
+@functools.lru_cache(maxsize=16)
+def _data_root(repo_root: Path) -> Path:
+    return (repo_root / "data").resolve()
+
+
+def _resolve_in_data(repo_root: Path, relative_path: str) -> Path:
+    # resolve() follows symlinks, so a link pointing out of data/ is caught here too
+    data_root = _data_root(repo_root)
+    target = (repo_root / relative_path).resolve()
+    if data_root not in target.parents:
+        raise ReadFileError("path_outside_data_dir")
+    return target
+
+
+def _check_regular(st: os.stat_result) -> None:
+    if not stat.S_ISREG(st.st_mode):
+        raise ReadFileError("file_not_found")
+    if st.st_size > MAX_FILE_BYTES:
+        raise ReadFileError("file_too_large")
+
+
+def _open_regular(target: Path) -> tuple[int, os.stat_result]:
+    """One open + one fstat replaces exists() / is_file() / stat()."""
+    try:
+        fd = os.open(target, os.O_RDONLY)
+    except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+        raise ReadFileError("file_not_found") from None
+    st = os.fstat(fd)
+    try:
+        _check_regular(st)
+    except ReadFileError:
+        os.close(fd)
+        raise
+    return fd, st
+
+
+def _clamp_range(size: int, offset: int, length: int | None, max_bytes: int | None) -> int:
+    """Number of bytes to return for [offset, offset+length), after the guardrails."""
+    if offset > size:
+        raise ReadFileError("offset_out_of_range")
+    if max_bytes is not None:
+        if length is None and offset == 0 and size > max_bytes:
+            raise ReadFileError("file_too_large")  # unranged read of a big file: ask for a range
+        if length is not None and length > max_bytes:
+            raise ReadFileError("range_too_large")
+    n = size - offset if length is None else min(length, size - offset)
+    return n if max_bytes is None else min(n, max_bytes)
+
+
+def _read_range(fd: int, size: int, offset: int, n: int) -> bytes:
+    if n == 0:
+        return b""
+    if size >= MMAP_THRESHOLD:
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+            return mm[offset : offset + n]
+    return os.pread(fd, n, offset)
+
+
+def read_file_safe(
+    *,
+    repo_root: Path,
+    relative_path: str,
+    max_bytes: int = MAX_READ_BYTES,
+    offset: int = 0,
+    length: int | None = None,
+) -> ReadFileResult:
     """
     Read-only tool with guardrails:
     - Only allows reads under <repo_root>/data
     - Blocks path traversal
-    - Enforces size limit
+    - Enforces size limit (range <= max_bytes; whole-file reads need size <= max_bytes)
+    Reads [offset, offset+length) bytes from a single fd; content is decoded once
+    (a range may split a UTF-8 sequence: edges then decode as U+FFFD).
     """
-    data_root = (repo_root / "data").resolve()
-    target = (repo_root / relative_path).resolve()
+    target = _resolve_in_data(repo_root, relative_path)
+    if _CACHE is not None:
+        return _read_cached(_CACHE, target, offset, length, max_bytes)
 
-    if not str(target).startswith(str(data_root) + str(Path("/").as_posix()).replace("//", "/")[:-1]) and target != data_root:
-        # simpler: require the target be within data_root
-        if data_root not in target.parents and target != data_root:
-            raise ReadFileError("path_outside_data_dir")
+    fd, st = _open_regular(target)
+    try:
+        n = _clamp_range(st.st_size, offset, length, max_bytes)
+        data = _read_range(fd, st.st_size, offset, n)
+    finally:
+        os.close(fd)
+    return _result(st.st_size, offset, len(data), data.decode("utf-8", errors="replace"), "off")
 
-    if not target.exists() or not target.is_file():
-        raise ReadFileError("file_not_found")
 
-    size = target.stat().st_size
-    if size > max_bytes:
-        raise ReadFileError("file_too_large")
+def _result(size: int, offset: int, n: int, content: str, cache: str) -> ReadFileResult:
+    return ReadFileResult(
+        bytes=size,
+        preview=content[:200],
+        offset=offset,
+        length=n,
+        content=content,
+        eof=offset + n >= size,
+        cache=cache,
+    )
+
+
+def _read_cached(
+    cache: FileContentCache, target: Path, offset: int, length: int | None, max_bytes: int
+) -> ReadFileResult:
+    """
+    Every call stats the file; the entry is only used if (dev, inode, size, mtime_ns)
+    still match. On a miss the whole file is read once (single fd) and cached, and
+    the range is served from it.
+    """
+    try:
+        st = os.stat(target)
+    except (FileNotFoundError, NotADirectoryError):
+        raise ReadFileError("file_not_found") from None
+    _check_regular(st)
+    n = _clamp_range(st.st_size, offset, length, max_bytes)
+
+    if st.st_size > cache.max_entry_bytes:
+        cache.note_bypass()
+        fd, st = _open_regular(target)
+        try:
+            n = _clamp_range(st.st_size, offset, length, max_bytes)
+            data = _read_range(fd, st.st_size, offset, n)
+        finally:
+            os.close(fd)
+        return _result(st.st_size, offset, len(data), data.decode("utf-8", errors="replace"), "bypass")
+
+    key = str(target)
+    entry = cache.get(key, file_identity(st))
+    status = "hit"
+    if entry is None:
+        fd, st = _open_regular(target)  # identity of what we actually read
+        try:
+            whole = _read_range(fd, st.st_size, 0, st.st_size)
+        finally:
+            os.close(fd)
+        entry, stored = cache.put(key, st, whole)
+        n = _clamp_range(st.st_size, offset, length, max_bytes)
+        status = "miss" if stored else "bypass"
+
+    if n == len(entry.data):
+        content = entry.text
+    elif entry.ascii:
+        content = entry.text[offset : offset + n]
+    else:
+        content = entry.data[offset : offset + n].decode("utf-8", errors="replace")
+    return _result(len(entry.data), offset, n, content, status)
+
+
+@dataclass(frozen=True)
+class ReadFileStream:
+    size: int  # total file size
+    offset: int
+    length: int  # bytes the iterator will yield
+    chunks: Iterator[bytes]
+
+
+def open_file_stream(
+    *,
+    repo_root: Path,
+    relative_path: str,
+    offset: int = 0,
+    length: int | None = None,
+    chunk_size: int = STREAM_CHUNK_BYTES,
+) -> ReadFileStream:
+    """
+    Same guardrails as read_file_safe, minus the per-call range cap (MAX_FILE_BYTES
+    still applies). Validation happens here, eagerly; the returned iterator yields
+    chunks sliced from an mmap, so the file is never loaded whole. The fd is closed
+    before returning (the mapping outlives it); the mapping is closed when the
+    iterator is exhausted or closed.
+    """
+    target = _resolve_in_data(repo_root, relative_path)
+    fd, st = _open_regular(target)
+    try:
+        n = _clamp_range(st.st_size, offset, length, None)
+        mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ) if n else None
+    finally:
+        os.close(fd)
 
-    content = target.read_text(encoding="utf-8", errors="replace")
-    preview = content[:200]
-    return ReadFileResult(bytes=len(content.encode("utf-8", errors="replace")), preview=preview)
+    def chunks() -> Iterator[bytes]:
+        if mm is None:
+            return
+        try:
+            yield b""  # primed below: close() / GC now runs the finally even if never iterated
+            end = offset + n
+            for pos in range(offset, end, chunk_size):
+                yield mm[pos : min(pos + chunk_size, end)]
+        finally:
+            mm.close()
+
+    it = chunks()
+    next(it, None)
+    return ReadFileStream(size=st.st_size, offset=offset, length=n, chunks=it)
 
 
 def _redact_read_file(req: ReadFileRequest) -> dict[str, str]:
-    return {"path": req.path}
+    out = {"path": req.path}
+    if req.offset:
+        out["offset"] = str(req.offset)
+    if req.length is not None:
+        out["length"] = str(req.length)
+    return out
 
 def _handle_read_file(*, repo_root: Path, req: ReadFileRequest) -> ReadFileResponse:
     try:
-        result = read_file_safe(repo_root=repo_root, relative_path=req.path)
-        return ReadFileResponse(ok=True, bytes=result.bytes, preview=result.preview)
+        result = read_file_safe(repo_root=repo_root, relative_path=req.path, offset=req.offset, length=req.length)
+        return ReadFileResponse(
+            ok=True,
+            bytes=result.bytes,
+            preview=result.preview,
+            offset=result.offset,
+            length=result.length,
+            content=result.content,
+            eof=result.eof,
+            cache=result.cache,
+        )
     except ReadFileError as e:
         return ReadFileResponse(ok=False, error=str(e))
 
+def _summarize_read_file(resp: ReadFileResponse) -> str:
+    summary = f"bytes={resp.bytes}"
+    stats = cache_stats()
+    if resp.cache is not None and stats is not None:
+        summary += f" cache={resp.cache} hits={stats.hits} misses={stats.misses} evictions={stats.evictions}"
+    return summary
+
+def _stream_read_file(*, repo_root: Path, req: ReadFileRequest) -> tuple[ReadFileResponse, Iterator[bytes] | None]:
+    try:
+        s = open_file_stream(repo_root=repo_root, relative_path=req.path, offset=req.offset, length=req.length)
+    except ReadFileError as e:
+        return ReadFileResponse(ok=False, error=str(e)), None
+    meta = ReadFileResponse(ok=True, bytes=s.size, offset=s.offset, length=s.length, eof=s.offset + s.length >= s.size)
+    return meta, s.chunks
+
+
 register_tool(
     ToolSpec(
         name="read_file",
@@ -60,5 +282,7 @@ register_tool(
         response_model=ReadFileResponse,
         handler=_handle_read_file,
         redact=_redact_read_file,
+        summarize=_summarize_read_file,
     )
-)
\ No newline at end of file
+)
+register_stream_handler("read_file", _stream_read_file)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Callable, Type
+from typing import Any, Callable, Iterator, Type
 
 from pydantic import BaseModel
 
@@ -13,15 +13,43 @@ class ToolSpec:
     response_model: Type[BaseModel]
     handler: Callable[..., BaseModel]
     redact: Callable[[BaseModel], dict[str, str]]
+    # HITL gate: True -> call needs `X-Approval: approved` (None = never)
+    requires_approval: Callable[[BaseModel], bool] | None = None
+    # audit result_summary for ok responses (default: "bytes=<n>")
+    summarize: Callable[[BaseModel], str] | None = None
+    # dedicated executor: handlers running at once, and calls allowed to wait beyond that (429 past it)
+    max_concurrency: int = 4
+    max_queue: int = 16
 
 
+# Optional streaming variant of a tool's handler: (response metadata, byte chunks or None on failure).
+# Kept next to, not inside, ToolSpec so swapping a spec doesn't drop it.
+StreamHandler = Callable[..., tuple[BaseModel, Iterator[bytes] | None]]
+
 _REGISTRY: dict[str, ToolSpec] = {}
+_STREAM_HANDLERS: dict[str, StreamHandler] = {}
+# Called with the tool name when a tool (or its stream handler) is registered, so
+# per-tool state like the MCP pipeline is built at registration, not on first call.
+_ON_REGISTER: list[Callable[[str], object]] = []
+
+
+def on_register(hook: Callable[[str], object]) -> None:
+    """Adds a registration hook and runs it for every tool registered so far."""
+    _ON_REGISTER.append(hook)
+    for name in list(_REGISTRY):
+        hook(name)
+
+
+def _registered(name: str) -> None:
+    for hook in _ON_REGISTER:
+        hook(name)
 
 
 def register_tool(spec: ToolSpec) -> None:
     if spec.name in _REGISTRY:
         raise ValueError(f"tool_already_registered:{spec.name}")
     _REGISTRY[spec.name] = spec
+    _registered(spec.name)
 
 
 def get_tool(name: str) -> ToolSpec:
@@ -30,3 +58,15 @@ def get_tool(name: str) -> ToolSpec:
 
 def list_tools() -> list[str]:
     return sorted(_REGISTRY.keys())
+
+
+def register_stream_handler(name: str, handler: StreamHandler) -> None:
+    if name in _STREAM_HANDLERS:
+        raise ValueError(f"stream_handler_already_registered:{name}")
+    _STREAM_HANDLERS[name] = handler
+    if name in _REGISTRY:
+        _registered(name)
+
+
+def get_stream_handler(name: str) -> StreamHandler | None:
+    return _STREAM_HANDLERS.get(name)
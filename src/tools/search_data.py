@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+
+from src.core.policy import current_policy
+from src.mcp.models import SearchDataRequest, SearchDataResponse, SearchHit, SearchMatch
+from src.tools.data_index import confine
+from src.tools.list_files import index_for
+from src.tools.registry import ToolSpec, register_tool
+from src.tools.search_index import SearchIndex, SearchIndexStats
+
+SEARCH_INDEX_POLL_S = float(os.getenv("SEARCH_INDEX_POLL_S", "2"))
+SEARCH_INDEX_MAX_FILE_BYTES = int(os.getenv("SEARCH_INDEX_MAX_FILE_BYTES", str(16 * 1024 * 1024)))
+# How long a query waits for the initial build before answering from a partial index.
+SEARCH_READY_WAIT_S = float(os.getenv("SEARCH_READY_WAIT_S", "1"))
+
+_DEFAULT_ROOT = Path(__file__).resolve().parents[2]
+_INDEXES: dict[Path, SearchIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def search_index_for(repo_root: Path) -> SearchIndex:
+    with _INDEXES_LOCK:
+        idx = _INDEXES.get(repo_root)
+        if idx is None:
+            idx = _INDEXES[repo_root] = SearchIndex(index_for(repo_root), max_file_bytes=SEARCH_INDEX_MAX_FILE_BYTES)
+            idx.start(poll_s=SEARCH_INDEX_POLL_S)
+        return idx
+
+
+def search_stats() -> SearchIndexStats:
+    return search_index_for(_DEFAULT_ROOT).stats()
+
+
+def _handle_search_data(*, repo_root: Path, req: SearchDataRequest) -> SearchDataResponse:
+    prefix = confine(req.path)
+    if prefix is None:
+        return SearchDataResponse(ok=False, error="path_outside_data_dir")
+    idx = search_index_for(repo_root)
+    complete = idx.wait_ready(SEARCH_READY_WAIT_S)
+
+    # per-file policy: path denials hide the hit; approval globs (*.secret) need the
+    # request-level opt-in, which the pipeline already gated on X-Approval
+    policy = current_policy()
+    withheld = 0
+
+    def keep(path: str) -> bool:
+        nonlocal withheld
+        decision = policy.decide("search_data", path)
+        if not decision.allowed:
+            return False
+        if decision.requires_approval and not req.include_approval_required:
+            withheld += 1
+            return False
+        return True
+
+    hits = idx.search(req.query, prefix=prefix, limit=req.limit, keep=keep)
+    return SearchDataResponse(
+        ok=True,
+        hits=[
+            SearchHit(
+                path=h.path,
+                score=h.score,
+                matches=[SearchMatch(term=m.term, offset=m.offset, length=m.length) for m in h.matches],
+                snippet=h.snippet,
+            )
+            for h in hits
+        ],
+        withheld=withheld,
+        complete=complete,
+    )
+
+
+def _redact_search_data(req: SearchDataRequest) -> dict[str, str]:
+    out = {"query": req.query[:128], "path": req.path}
+    if req.include_approval_required:
+        out["include_approval_required"] = "true"
+    return out
+
+
+def _summarize_search_data(resp: SearchDataResponse) -> str:
+    return f"hits={len(resp.hits)} withheld={resp.withheld} complete={resp.complete}"
+
+
+register_tool(
+    ToolSpec(
+        name="search_data",
+        request_model=SearchDataRequest,
+        response_model=SearchDataResponse,
+        handler=_handle_search_data,
+        redact=_redact_search_data,
+        requires_approval=lambda req: req.include_approval_required,
+        summarize=_summarize_search_data,
+    )
+)
+
+# start the default tree's index build at startup, off the request path
+search_index_for(_DEFAULT_ROOT)
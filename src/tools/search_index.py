@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import logging
+import math
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable
+
+from src.core import prefork
+from src.tools.data_index import DataIndex, IndexSnapshot
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"\w+")
+# byte-level \w around a match in an ASCII file (haystack is lowercased)
+_WORD_BYTES = frozenset(b"0123456789abcdefghijklmnopqrstuvwxyz_")
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+@dataclass(frozen=True, slots=True)
+class _Doc:
+    path: str
+    size: int
+    mtime_ns: int
+    length: int  # tokens
+
+
+@dataclass(frozen=True)
+class SearchMatch:
+    term: str
+    offset: int  # byte offset in the file
+    length: int  # bytes
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    path: str
+    score: float
+    matches: tuple[SearchMatch, ...]
+    snippet: str
+
+
+@dataclass(frozen=True)
+class SearchIndexStats:
+    files: int
+    terms: int
+    postings: int
+    skipped: int  # binary / oversized files
+    bytes_indexed: int
+    ready: bool
+
+
+class SearchIndex:
+    """
+    BM25 inverted index over the text files of a DataIndex.
+    - postings: term -> uint32 array of interleaved (doc id, term freq), 8 bytes per (term, file)
+    - sync() diffs the DataIndex snapshot against what's indexed (size, mtime_ns):
+      changed files get a new doc id, the old one is tombstoned; postings are
+      compacted once tombstones outnumber live docs
+    - files are read and tokenized outside the lock; only the merge holds it
+    - byte offsets / snippets are found at query time, in the top hits only, by a
+      case-folded scan of the file (no positions are stored)
+    """
+
+    def __init__(
+        self,
+        data_index: DataIndex,
+        *,
+        max_file_bytes: int = 16 * 1024 * 1024,
+        compact_min_dead: int = 1024,
+    ) -> None:
+        self.data_index = data_index
+        self.max_file_bytes = max_file_bytes
+        self.compact_min_dead = compact_min_dead
+        self._lock = threading.Lock()  # guards everything below
+        self._postings: dict[str, array] = {}
+        self._docs: list[_Doc | None] = []
+        self._by_path: dict[str, int] = {}
+        self._total_len = 0
+        self._dead = 0
+        self._bytes = 0
+        # sync-owned: path -> (size, mtime_ns) of every file already seen, indexed or skipped
+        self._sync_lock = threading.Lock()
+        self._versions: dict[str, tuple[int, int]] = {}
+        self._skipped: set[str] = set()
+        self._seen: IndexSnapshot | None = None
+        self._ready = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    # --- indexing -----------------------------------------------------------
+
+    def sync(self) -> int:
+        """Indexes new/changed files, drops deleted ones; returns the number of files touched."""
+        with self._sync_lock:
+            snap = self.data_index.snapshot()
+            if snap is self._seen:
+                return 0
+            touched = 0
+            for path in [p for p in self._versions if p not in snap.meta]:
+                self._remove(path)
+                touched += 1
+            for path, m in snap.meta.items():
+                if m.type == "file" and self._versions.get(path) != (m.size, m.mtime_ns):
+                    self._index_file(path, m.size, m.mtime_ns)
+                    touched += 1
+            self._seen = snap
+            self._ready.set()
+            return touched
+
+    def _read(self, path: str, size: int) -> bytes | None:
+        if size > self.max_file_bytes:
+            return None
+        try:
+            # O_NOFOLLOW: the index never contains symlinks; don't follow one swapped in since
+            fd = os.open(os.path.join(self.data_index.root.parent, path), os.O_RDONLY | os.O_NOFOLLOW)
+        except OSError:
+            return None
+        try:
+            data = os.read(fd, self.max_file_bytes + 1)
+        finally:
+            os.close(fd)
+        if len(data) > self.max_file_bytes or b"\x00" in data[:8192]:
+            return None  # oversized or binary
+        return data
+
+    def _index_file(self, path: str, size: int, mtime_ns: int) -> None:
+        self._versions[path] = (size, mtime_ns)
+        data = self._read(path, size)
+        if data is None:
+            self._skipped.add(path)
+            self._remove(path, forget=False)
+            return
+        self._skipped.discard(path)
+        tokens = tokenize(data.decode("utf-8", errors="replace"))
+        counts = Counter(tokens)
+        doc = _Doc(path, len(data), mtime_ns, len(tokens))
+        with self._lock:
+            self._drop_locked(path)
+            doc_id = len(self._docs)
+            self._docs.append(doc)
+            self._by_path[path] = doc_id
+            self._total_len += doc.length
+            self._bytes += doc.size
+            postings = self._postings
+            for term, tf in counts.items():
+                entry = postings.get(term)
+                if entry is None:
+                    postings[term] = array("I", (doc_id, tf))
+                else:
+                    entry.append(doc_id)
+                    entry.append(tf)
+
+    def _remove(self, path: str, *, forget: bool = True) -> None:
+        if forget:
+            self._versions.pop(path, None)
+            self._skipped.discard(path)
+        with self._lock:
+            self._drop_locked(path)
+
+    def _drop_locked(self, path: str) -> None:
+        doc_id = self._by_path.pop(path, None)
+        if doc_id is None:
+            return
+        doc = self._docs[doc_id]
+        self._docs[doc_id] = None
+        self._total_len -= doc.length  # type: ignore[union-attr]
+        self._bytes -= doc.size  # type: ignore[union-attr]
+        self._dead += 1
+        if self._dead >= self.compact_min_dead and self._dead > len(self._by_path):
+            self._compact_locked()
+
+    def _compact_locked(self) -> None:
+        docs = self._docs
+        compacted: dict[str, array] = {}
+        for term, entry in self._postings.items():
+            live = array("I")
+            for i in range(0, len(entry), 2):
+                if docs[entry[i]] is not None:
+                    live.append(entry[i])
+                    live.append(entry[i + 1])
+            if live:
+                compacted[term] = live
+        self._postings = compacted
+        self._dead = 0
+
+    def start(self, poll_s: float = 2.0) -> None:
+        """Initial build + incremental syncs on a daemon thread."""
+        if self._thread is not None:
+            return
+        self._poll_s = poll_s
+        prefork.register(self)
+
+        def loop() -> None:
+            while not self._stop.is_set():
+                try:
+                    self.sync()
+                except Exception:
+                    logger.exception("search_index_sync_error")
+                self._stop.wait(poll_s)
+
+        self._thread = threading.Thread(target=loop, name="search-index", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _before_fork(self) -> None:
+        # no thread may be mid-sync (holding the lock) when the process is copied
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+
+    def _after_fork(self, in_child: bool) -> None:
+        # workers keep polling from the snapshot they inherited; the master only supervises
+        if in_child and self._thread is not None:
+            self._thread = None
+            self._stop = threading.Event()
+            self.start(self._poll_s)
+
+    def wait_ready(self, timeout: float | None) -> bool:
+        return self._ready.wait(timeout)
+
+    def stats(self) -> SearchIndexStats:
+        with self._lock:
+            return SearchIndexStats(
+                files=len(self._by_path),
+                terms=len(self._postings),
+                postings=sum(len(entry) for entry in self._postings.values()) // 2,
+                skipped=len(self._skipped),
+                bytes_indexed=self._bytes,
+                ready=self._ready.is_set(),
+            )
+
+    # --- queries ------------------------------------------------------------
+
+    def search(
+        self,
+        query: str,
+        *,
+        prefix: str | None = None,
+        limit: int = 10,
+        keep: Callable[[str], bool] | None = None,
+        max_matches: int = 5,
+        snippet_bytes: int = 160,
+    ) -> list[SearchHit]:
+        """
+        Top `limit` files by BM25 over the query's terms (OR semantics).
+        `prefix` restricts to a directory; `keep(path)` can veto a file (policy).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        dir_prefix = prefix.rstrip("/") + "/" if prefix else ""
+        scores: dict[int, float] = {}
+        with self._lock:
+            docs = self._docs
+            n_docs = len(self._by_path)
+            if n_docs == 0:
+                return []
+            avg_len = self._total_len / n_docs or 1.0
+            for term in terms:
+                entry = self._postings.get(term)
+                if entry is None:
+                    continue
+                df = len(entry) // 2  # may include tombstones until compaction; fine for idf
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf in zip(entry[::2], entry[1::2]):
+                    doc = docs[doc_id]
+                    if doc is None or not doc.path.startswith(dir_prefix):
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc.length / avg_len)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+            ranked = sorted(scores.items(), key=lambda kv: (-kv[1], docs[kv[0]].path))  # type: ignore[union-attr]
+            candidates: list[tuple[_Doc, float]] = [(docs[i], s) for i, s in ranked]  # type: ignore[misc]
+
+        hits: list[SearchHit] = []
+        for doc, score in candidates:
+            path = doc.path
+            if keep is not None and not keep(path):
+                continue
+            located = self._locate(doc, terms, max_matches, snippet_bytes)
+            if located is None:
+                continue  # deleted / changed / replaced by a symlink since it was indexed
+            hits.append(SearchHit(path, round(score, 4), *located))
+            if len(hits) == limit:
+                break
+        return hits
+
+    def _locate(
+        self, doc: _Doc, terms: list[str], max_matches: int, snippet_bytes: int
+    ) -> tuple[tuple[SearchMatch, ...], str] | None:
+        try:
+            fd = os.open(os.path.join(self.data_index.root.parent, doc.path), os.O_RDONLY | os.O_NOFOLLOW)
+        except OSError:
+            return None
+        try:
+            st = os.fstat(fd)
+            if (st.st_size, st.st_mtime_ns) != (doc.size, doc.mtime_ns):
+                return None  # not the content that was scored; the next sync() re-indexes it
+            if doc.size == 0:
+                return (), ""
+            data = os.pread(fd, min(doc.size, self.max_file_bytes), 0)
+            if data.isascii():
+                matches = _find_ascii(data.lower(), terms, max_matches)
+            else:
+                matches = _find_text(data.decode("utf-8", errors="surrogateescape"), terms, max_matches)
+            if not matches:
+                return (), ""
+            first = matches[0]
+            lo = max(0, first.offset - snippet_bytes // 2)
+            hi = min(len(data), first.offset + first.length + snippet_bytes // 2)
+            snippet = data[lo:hi].decode("utf-8", errors="replace").strip("\ufffd")
+        finally:
+            os.close(fd)
+        return tuple(matches), " ".join(snippet.split())
+
+
+def _find_ascii(hay: bytes, terms: list[str], max_matches: int) -> list[SearchMatch]:
+    # bytes.lower() == str.lower() on ASCII, so offsets are unchanged; find() is a fast scan
+    matches: list[SearchMatch] = []
+    for term in terms:
+        raw = term.encode()
+        if not raw.isascii():
+            continue  # can't occur in an ASCII file
+        pos, found = 0, 0
+        while found < max_matches:
+            pos = hay.find(raw, pos)
+            if pos < 0:
+                break
+            end = pos + len(raw)
+            if (pos == 0 or hay[pos - 1] not in _WORD_BYTES) and (end == len(hay) or hay[end] not in _WORD_BYTES):
+                matches.append(SearchMatch(term, pos, len(raw)))
+                found += 1
+            pos = end
+    matches.sort(key=lambda m: m.offset)
+    return matches[:max_matches]
+
+
+def _find_text(text: str, terms: list[str], max_matches: int) -> list[SearchMatch]:
+    # non-ASCII: case-insensitive \w-bounded match on the decoded text (same folding and word
+    # chars as tokenize()), then character offsets are mapped back to UTF-8 byte offsets;
+    # surrogateescape keeps undecodable bytes one char == one byte
+    spans: list[tuple[int, int, str]] = []
+    for term in terms:
+        pattern = re.compile(rf"(?<!\w){re.escape(term)}(?!\w)", re.IGNORECASE)
+        for found, m in enumerate(pattern.finditer(text)):
+            if found == max_matches:
+                break
+            spans.append((m.start(), m.end(), term))
+    spans.sort()
+    matches: list[SearchMatch] = []
+    char_pos = byte_pos = 0
+    for start, end, term in spans[:max_matches]:
+        byte_pos += len(text[char_pos:start].encode("utf-8", errors="surrogateescape"))
+        char_pos = start
+        matches.append(SearchMatch(term, byte_pos, len(text[start:end].encode("utf-8", errors="surrogateescape"))))
+    return matches
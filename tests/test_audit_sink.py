@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from src.core.audit import audit_tool_attempt
+from src.core.audit_sink import AuditSink
+from src.middleware.logging import JsonFormatter
+
+
+def _attempt(trace_id: str = "T-AUDIT", summary: str = "bytes=1"):
+    return audit_tool_attempt(
+        trace_id=trace_id,
+        tool_name="read_file",
+        decision="allow",
+        reason="allowlisted",
+        outcome="ok",
+        params_redacted={"path": "data/sample.txt"},
+        result_summary=summary,
+    )
+
+
+def test_batches_are_ndjson_and_fsync_policy_applies(tmp_path: Path) -> None:
+    path = tmp_path / "audit" / "audit.ndjson"
+    sink = AuditSink(str(path), fsync="batch", commit_window_s=0.05)
+    events = [_attempt(f"T-{i}") for i in range(50)]
+    assert all(sink.enqueue(e) for e in events)
+    assert sink.flush()
+
+    lines = path.read_text().splitlines()
+    assert [json.loads(line)["trace_id"] for line in lines] == [f"T-{i}" for i in range(50)]
+    s = sink.stats()
+    assert s.written == 50 and s.batches < 50 and s.fsyncs >= 1
+    sink.close()
+
+    lazy = AuditSink(str(tmp_path / "lazy.ndjson"), fsync="never")
+    lazy.enqueue(events[0])
+    lazy.flush()
+    assert lazy.stats().fsyncs == 0
+    lazy.close()
+
+
+def test_size_based_rotation_keeps_n_backups(tmp_path: Path) -> None:
+    path = tmp_path / "audit.ndjson"
+    line_len = len(_attempt().model_dump_json()) + 1
+    sink = AuditSink(str(path), max_bytes=line_len * 3, backups=2, commit_window_s=0)
+    for _ in range(10):
+        sink.enqueue(_attempt())
+        sink.flush()
+    sink.close()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["audit.ndjson", "audit.ndjson.1", "audit.ndjson.2"]
+    assert all(p.stat().st_size <= line_len * 3 for p in tmp_path.iterdir())
+    assert sink.stats().rotations >= 2
+
+
+def test_enqueue_never_blocks_when_writer_is_stuck(tmp_path: Path) -> None:
+    sink = AuditSink(str(tmp_path / "a.ndjson"), queue_size=2, commit_window_s=0)
+    release = threading.Event()
+    real_write = sink._write_batch
+
+    def stuck_write(events):
+        release.wait(5)
+        real_write(events)
+
+    sink._write_batch = stuck_write  # type: ignore[method-assign]
+    sink.enqueue(_attempt())
+    time.sleep(0.05)  # writer picked it up and is now blocked
+
+    t0 = time.perf_counter()
+    results = [sink.enqueue(_attempt()) for _ in range(5)]
+    assert time.perf_counter() - t0 < 0.05
+    assert results == [True, True, False, False, False]
+    assert sink.stats().dropped == 3
+
+    release.set()
+    sink.close()
+    assert sink.stats().written == 3
+
+
+def test_close_with_stuck_writer_is_bounded_and_keeps_the_fd(tmp_path: Path, caplog) -> None:
+    sink = AuditSink(str(tmp_path / "a.ndjson"), queue_size=1, commit_window_s=0)
+    release = threading.Event()
+    real_write = sink._write_batch
+
+    def stuck_write(events):
+        release.wait(5)
+        real_write(events)
+
+    sink._write_batch = stuck_write  # type: ignore[method-assign]
+    sink.enqueue(_attempt())
+    time.sleep(0.05)
+    sink.enqueue(_attempt())  # queue full: STOP can't be queued either
+
+    t0 = time.perf_counter()
+    with caplog.at_level(logging.ERROR, logger="src.core.audit_sink"):
+        sink.close(timeout=0.1)
+    assert time.perf_counter() - t0 < 1
+    assert "audit_sink_close_timeout" in caplog.text
+    os.fstat(sink._fd)  # still ours: the writer may yet write to it
+
+    release.set()
+    sink._queue.put(sink._STOP)
+    sink._writer.join(timeout=5)
+    sink._close_destination()
+    assert len((tmp_path / "a.ndjson").read_text().splitlines()) == 2
+
+
+def test_audit_goes_to_sink_or_structured_log(tmp_path: Path, monkeypatch, caplog) -> None:
+    path = tmp_path / "tool_attempts.ndjson"
+    monkeypatch.setenv("AUDIT_LOG_PATH", str(path))
+    _attempt("T-SINK")
+    from src.core.audit import get_audit_sink
+
+    get_audit_sink().flush()
+    assert json.loads(path.read_text())["trace_id"] == "T-SINK"
+
+    monkeypatch.delenv("AUDIT_LOG_PATH")
+    caplog.set_level(logging.INFO)
+    _attempt("T-LOG", summary='quote " and \\ backslash')
+    record = [r for r in caplog.records if r.getMessage() == "tool_attempt"][-1]
+    line = json.loads(JsonFormatter().format(record))  # one decode, no nested JSON string
+    assert line["event"] == "tool_attempt" and line["trace_id"] == "T-LOG"
+    assert line["tool_name"] == "read_file" and line["result_summary"] == 'quote " and \\ backslash'
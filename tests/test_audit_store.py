@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from src.app.main import app
+from src.core.audit import get_audit_store
+from src.core.audit_models import ToolAttemptEvent
+from src.core.audit_store import AuditStore
+
+client = TestClient(app)
+
+
+def _evt(i: int, *, trace_id: str, tool: str = "read_file", outcome: str = "ok") -> ToolAttemptEvent:
+    return ToolAttemptEvent(
+        timestamp_ms=1_000 + i,
+        trace_id=trace_id,
+        tool_name=tool,
+        decision="allow",
+        reason="allowlisted",
+        outcome=outcome,  # type: ignore[arg-type]
+        result_summary="bytes=1",
+    )
+
+
+def test_filters_and_cursor_pagination(tmp_path: Path) -> None:
+    store = AuditStore(str(tmp_path / "audit.db"))
+    for i in range(30):
+        store.enqueue(_evt(i, trace_id=f"T-{i % 3}", tool="search_data" if i % 5 == 0 else "read_file",
+                           outcome="error" if i % 10 == 0 else "ok"))
+    assert store.flush()
+
+    seen: list[int] = []
+    cursor = None
+    while True:
+        page = store.query(trace_id="T-1", cursor=cursor, limit=4)
+        seen += [e.timestamp_ms for e in page.events]
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == [1_000 + i for i in range(30) if i % 3 == 1]
+
+    errors = store.query(tool_name="search_data", outcome="error").events
+    assert [e.timestamp_ms for e in errors] == [1_000, 1_010, 1_020]
+    window = store.query(since_ms=1_010, until_ms=1_013).events
+    assert [e.timestamp_ms for e in window] == [1_010, 1_011, 1_012]
+    store.close()
+
+
+def test_every_filter_combination_uses_an_index(tmp_path: Path) -> None:
+    store = AuditStore(str(tmp_path / "audit.db"))
+    combos = [
+        {"trace_id": "T"},
+        {"tool_name": "read_file", "cursor": "1.1"},
+        {"tool_name": "read_file", "outcome": "error", "since_ms": 5},
+        {"outcome": "blocked", "until_ms": 9},
+        {"since_ms": 1, "until_ms": 2},
+        {"trace_id": "T", "tool_name": "read_file", "outcome": "ok"},
+    ]
+    for filters in combos:
+        plan = " ".join(store.explain(**filters))
+        assert "USING INDEX" in plan and "TEMP B-TREE" not in plan, (filters, plan)
+    store.close()
+
+
+def test_audit_endpoint(tmp_path: Path, monkeypatch) -> None:
+    r = client.get("/audit", params={"trace_id": "T-API"})
+    assert r.status_code == 404 and r.json()["detail"] == "audit_store_disabled"
+
+    monkeypatch.setenv("AUDIT_DB_PATH", str(tmp_path / "audit.db"))
+    monkeypatch.setenv("MCP_ALLOWED_TOOLS", "read_file")
+    for _ in range(3):
+        client.post("/mcp/tools/read_file", json={"path": "data/sample.txt"}, headers={"X-Trace-Id": "T-API"})
+    client.post("/mcp/tools/read_file", json={"path": "../etc/passwd"}, headers={"X-Trace-Id": "T-API"})
+    get_audit_store().flush()
+
+    body = client.get("/audit", params={"trace_id": "T-API", "limit": 2}).json()
+    assert len(body["events"]) == 2 and body["next_cursor"]
+    rest = client.get("/audit", params={"trace_id": "T-API", "cursor": body["next_cursor"]}).json()
+    assert [e["outcome"] for e in rest["events"]] == ["ok", "blocked"]
+    assert rest["next_cursor"] is None
+
+    blocked = client.get("/audit", params={"trace_id": "T-API", "outcome": "blocked"}).json()["events"]
+    assert [e["reason"] for e in blocked] == ["allowlisted"]
+
+    assert client.get("/audit", params={"cursor": "nope"}).status_code == 400
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import pytest
+
 from src.graphs.basic_agent.graph import build_graph
-from src.graphs.basic_agent.state import GraphState
+from src.graphs.basic_agent.state import GraphState, GraphStateLite
 
 
-def test_basic_graph_is_deterministic_across_runs() -> None:
-    graph = build_graph()
+@pytest.mark.parametrize("state_mode", ["strict", "boundary"])
+def test_basic_graph_is_deterministic_across_runs(state_mode: str) -> None:
+    graph = build_graph(state_mode)
 
     init = GraphState(trace_id="T-0001",input="test_run", step=0, max_steps=3, history=[])
 
@@ -23,3 +26,16 @@ def test_basic_graph_is_deterministic_across_runs() -> None:
 
     # Expected sequence (3 loops then finish):
     assert histories[0] == ["plan", "verify", "plan", "verify", "plan", "verify", "finish"]
+
+
+def test_state_modes_produce_identical_outputs() -> None:
+    outputs = {}
+    for mode in ("strict", "boundary"):
+        out = build_graph(mode).invoke(GraphState(trace_id="T-0002", input="same", max_steps=5))
+        outputs[mode] = GraphState.model_validate(out).model_dump()
+
+    assert outputs["strict"] == outputs["boundary"]
+
+
+def test_lite_state_mirrors_graph_state_fields() -> None:
+    assert list(GraphStateLite.__dataclass_fields__) == list(GraphState.model_fields)
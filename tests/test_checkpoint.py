@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from langgraph.types import Command
+
+from src.app.main import app
+from src.graphs.basic_agent import nodes
+from src.graphs.basic_agent.checkpoint import MemoryCheckpointer, SqliteCheckpointer
+from src.graphs.basic_agent.graph import build_graph
+from src.graphs.basic_agent.state import GraphState
+
+client = TestClient(app)
+
+
+def _flaky_plan(monkeypatch, fail_on: set[int]) -> list[int]:
+    """Makes the plan node raise on the given (1-based) calls; returns the call log."""
+    calls: list[int] = []
+    real = nodes._plan
+
+    def plan(state):
+        calls.append(state.step)
+        if len(calls) in fail_on:
+            raise RuntimeError("transient")
+        return real(state)
+
+    monkeypatch.setattr(nodes, "_plan", plan)
+    return calls
+
+
+def test_run_with_thread_id_resumes_after_failure(monkeypatch) -> None:
+    calls = _flaky_plan(monkeypatch, fail_on={2})
+    body = {"input": "hello", "max_steps": 3, "thread_id": "T-RESUME"}
+
+    assert client.post("/run", json=body).json()["status"] == "error"
+    assert calls == [0, 1]
+
+    r = client.post("/run", json=body, headers={"X-Trace-Id": "T-RESUME-2"})
+    assert r.json() == {"trace_id": "T-RESUME-2", "status": "done", "result": "ok:hello"}
+    assert calls == [0, 1, 1, 2]  # only the failed plan reran, then the rest of the loop
+
+    # finished thread: replayed from the checkpoint, nothing recomputed
+    assert client.post("/run", json=body).json()["status"] == "done"
+    assert len(calls) == 4
+
+    # a different request on the same thread starts over
+    assert client.post("/run", json={**body, "input": "other"}).json()["result"] == "ok:other"
+    assert calls[4:] == [0, 1, 2]
+
+
+def test_memory_checkpointer_keeps_last_k_per_thread() -> None:
+    saver = MemoryCheckpointer(keep=2, max_threads=2)
+    graph = build_graph(checkpointer=saver)
+    for i in range(3):
+        config = {"configurable": {"thread_id": f"t{i}"}, "recursion_limit": 30}
+        out = graph.invoke(GraphState(trace_id="T", input="x", max_steps=5), config)
+        assert out["result"] == "ok:x"
+
+    s = saver.stats()
+    assert s.threads == 2 and s.evicted_threads == 1
+    assert s.checkpoints == 4 and s.compacted == s.puts - 6
+    history = list(graph.get_state_history({"configurable": {"thread_id": "t2"}}))
+    assert len(history) == 2 and history[0].values["status"] == "done"
+
+
+def test_sqlite_checkpoints_are_compacted_and_survive_restart(tmp_path: Path, monkeypatch) -> None:
+    path = str(tmp_path / "checkpoints.db")
+    config = {"configurable": {"thread_id": "T-DISK"}, "recursion_limit": 30}
+    calls = _flaky_plan(monkeypatch, fail_on={4})
+
+    first = SqliteCheckpointer(path, keep=2)
+    try:
+        build_graph(checkpointer=first).invoke(GraphState(trace_id="T", input="x", max_steps=5), config)
+    except RuntimeError:
+        pass
+    first.close()
+    assert calls == [0, 1, 2, 3]
+
+    db = sqlite3.connect(path)
+    assert db.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0] == 2
+    db.close()
+
+    second = SqliteCheckpointer(path, keep=2)  # fresh process: nothing in memory
+    graph = build_graph(checkpointer=second)
+    assert graph.get_state(config).next == ("plan",)
+    out = graph.invoke(Command(update={"trace_id": "T-2"}), config)
+    assert out["trace_id"] == "T-2" and out["step"] == 5 and len(out["history"]) == 11
+    assert calls == [0, 1, 2, 3, 3, 4]
+    assert second.stats().loads == 1
+    second.close()
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from fastapi.testclient import TestClient
+
+from src.app.main import app
+from src.graphs.basic_agent.run import run_graph
+from src.graphs.basic_agent.state import GraphState, History
+
+client = TestClient(app)
+
+
+def test_history_snapshots_never_change() -> None:
+    base = History(["a"])
+    left = base.extend(["b"])  # appends in place (base is the newest view)
+    right = base.extend(["c"])  # base is now stale: must copy
+
+    assert base == ["a"]
+    assert left == ["a", "b"]
+    assert right == ["a", "c"]
+    assert left[-1] == "b" and right[1:] == ["c"]
+
+
+def test_history_validates_and_serializes_as_list() -> None:
+    s = GraphState(trace_id="T", history=["plan"])
+    assert isinstance(s.history, History)
+    assert s.model_dump()["history"] == ["plan"]
+    assert GraphState.model_validate(s.model_dump()).history == ["plan"]
+
+
+def test_max_steps_bounds_the_loop() -> None:
+    final = run_graph(input="x", trace_id="T-STEPS", max_steps=50)
+    assert final.step == 50
+    assert len(final.history) == 2 * 50 + 1
+    assert run_graph(input="x", trace_id="T-ONE", max_steps=1).history == ["plan", "verify", "finish"]
+
+
+def test_run_accepts_max_steps() -> None:
+    r = client.post("/run", headers={"X-Trace-Id": "RUN-STEPS"}, json={"input": "x", "max_steps": 20})
+    assert r.json()["status"] == "done"
+
+    bad = client.post("/run", json={"input": "x", "max_steps": 0})
+    assert bad.status_code == 422
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import src.app.main as main_mod
+from src.app.main import app
+from src.graphs import registry
+from src.graphs.registry import GraphSpec, register_graph
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def graphs(monkeypatch):
+    """Isolated copy of the registry (same slots for the built-in graphs)."""
+    monkeypatch.setattr(registry, "_REGISTRY", dict(registry._REGISTRY))
+    monkeypatch.setattr(registry, "_WARMUP", None)
+    return registry._REGISTRY
+
+
+def test_importing_the_app_does_not_import_langgraph() -> None:
+    code = "import sys, src.app.main; print(sorted(m for m in sys.modules if m.startswith(('langgraph', 'langchain'))))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_named_graphs_are_served_on_run_graph_name(graphs, monkeypatch) -> None:
+    register_graph(GraphSpec(name="agent_b", module="src.graphs.basic_agent.run"))
+    register_graph(GraphSpec(name="broken", module="src.graphs.does_not_exist"))
+    with pytest.raises(ValueError):
+        register_graph(GraphSpec(name="stream", module="src.graphs.basic_agent.run"))
+
+    r = client.post("/run/agent_b", json={"input": "hi", "max_steps": 1})
+    assert r.json()["status"] == "done" and r.json()["result"] == "ok:hi"
+    assert client.post("/run/nope", json={"input": "hi"}).json()["detail"] == "graph_not_found"
+
+    assert client.post("/run/broken", json={"input": "hi"}).status_code == 503
+    health = client.get("/healthz")
+    assert health.status_code == 200 and health.json()["status"] == "degraded"
+    assert health.json()["graphs"]["broken"] == "error"
+    assert client.get("/readyz").status_code == 200  # /run still works; only /run/broken is 503
+    monkeypatch.setattr(main_mod, "DEFAULT_GRAPH", "broken")
+    assert client.get("/readyz").status_code == 503
+    info = {g["name"]: g for g in client.get("/debug/graphs").json()["graphs"]}
+    assert info["agent_b"]["status"] == "ready" and "ModuleNotFoundError" in info["broken"]["error"]
+
+
+def test_background_warmup_gates_readiness(graphs, tmp_path: Path, monkeypatch) -> None:
+    gate = tmp_path / "gate"
+    (tmp_path / "slow_graph.py").write_text(
+        "import os, time\n"
+        f"while not os.path.exists({str(gate)!r}):\n"
+        "    time.sleep(0.01)\n"
+        "from src.graphs.basic_agent.run import *  # noqa\n"
+        "from src.graphs.basic_agent.run import ThreadBusyError  # noqa\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    register_graph(GraphSpec(name="slow", module="slow_graph"))
+    monkeypatch.setattr(main_mod, "GRAPH_WARMUP", "background")
+
+    with TestClient(app) as c:  # runs the lifespan: warmup starts, serving does not wait
+        r = c.get("/readyz")
+        assert r.status_code == 503 and r.json()["status"] == "starting"
+        assert c.get("/healthz").status_code == 200  # alive while warming up
+        gate.touch()
+        registry._WARMUP.join(10)
+        r = c.get("/readyz")
+        assert r.status_code == 200 and r.json() == {"status": "ok", "graphs": {"basic_agent": "ready", "slow": "ready"}}
+        assert c.post("/run/slow", json={"input": "x", "max_steps": 1}).json()["result"] == "ok:x"
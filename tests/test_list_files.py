@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from src.app.main import app
+from src.tools.data_index import DataIndex, FileMeta, IndexSnapshot
+
+client = TestClient(app)
+
+
+def _tree(tmp_path: Path) -> Path:
+    root = tmp_path / "data"
+    (root / "sub" / "deep").mkdir(parents=True)
+    for rel in ("a.txt", "b.log", "sub/c.txt", "sub/deep/d.txt"):
+        (root / rel).write_text(rel)
+    return root
+
+
+def test_list_glob_recursive_and_pagination(tmp_path: Path) -> None:
+    idx = DataIndex(_tree(tmp_path))
+
+    entries, cursor = idx.list("data", glob="*.txt")
+    assert [m.path for m in entries] == ["data/a.txt", "data/sub/c.txt", "data/sub/deep/d.txt"]
+    assert cursor is None
+
+    top, _ = idx.list("data", recursive=False)
+    assert [(m.path, m.type) for m in top] == [("data/a.txt", "file"), ("data/b.log", "file"), ("data/sub", "dir")]
+
+    seen: list[str] = []
+    cursor = None
+    while True:
+        page, cursor = idx.list("data", cursor=cursor, limit=2)
+        seen += [m.path for m in page]
+        if cursor is None:
+            break
+    assert seen == sorted(seen) and len(seen) == 6
+    assert idx.stat("data/sub/c.txt").size == len("sub/c.txt")
+
+
+def test_incremental_refresh_sees_adds_and_removes(tmp_path: Path) -> None:
+    root = _tree(tmp_path)
+    idx = DataIndex(root, full_rescan_s=3600)  # only the dir-mtime path after the first build
+    idx.refresh()
+
+    (root / "sub" / "new.txt").write_text("x")
+    (root / "sub" / "deep" / "d.txt").unlink()
+    # make sure the dir mtimes move even on coarse-timestamp filesystems
+    for d in (root / "sub", root / "sub" / "deep"):
+        os.utime(d, ns=(time.time_ns(), time.time_ns() + 10**9))
+
+    assert idx.refresh() is True
+    assert idx.stat("data/sub/new.txt") is not None
+    assert idx.stat("data/sub/deep/d.txt") is None
+    assert idx.refresh() is False  # nothing moved: no new snapshot
+
+
+def test_listing_100k_entries_stays_fast() -> None:
+    paths = sorted(f"data/d{i // 1000:03d}/f{i:06d}.txt" for i in range(100_000))
+    idx = DataIndex(Path("/nonexistent/data"))
+    idx._snapshot = IndexSnapshot(meta={p: FileMeta(p, "file", 1, 0) for p in paths}, paths=paths)
+    idx._ready.set()
+
+    t0 = time.perf_counter()
+    for _ in range(100):
+        page, cursor = idx.list("data", glob="data/d050/*.txt", cursor="data/d050/f050100.txt", limit=100)
+    per_call_ms = (time.perf_counter() - t0) * 1000 / 100
+    assert len(page) == 100 and cursor == "data/d050/f050200.txt"
+    assert per_call_ms < 5  # ~0.1 ms locally; generous for slow CI
+
+
+def test_endpoints_with_policy_and_confinement(monkeypatch) -> None:
+    monkeypatch.setenv("MCP_ALLOWED_TOOLS", "list_files,stat_files")
+
+    r = client.post("/mcp/tools/list_files", json={"path": "data", "glob": "*.txt"})
+    assert r.status_code == 200
+    assert "data/sample.txt" in [e["path"] for e in r.json()["entries"]]
+
+    r = client.post("/mcp/tools/stat_files", json={"paths": ["data/sample.txt", "data/nope.txt"]})
+    body = r.json()
+    assert body["ok"] is True
+    assert body["entries"][0]["type"] == "file"
+    assert body["missing"] == ["data/nope.txt"]
+
+    r = client.post("/mcp/tools/list_files", json={"path": "data/../src"})
+    assert r.json() == {"ok": False, "entries": [], "next_cursor": None, "error": "path_outside_data_dir"}
+
+    monkeypatch.setenv("MCP_ALLOWED_TOOLS", "read_file")
+    r = client.post("/mcp/tools/list_files", json={})
+    assert r.status_code == 403
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import io
+import json
+import logging
+import threading
+import time
+
+from src.middleware.logging import AsyncBatchHandler, JsonFormatter
+
+
+def _logger(handler: logging.Handler) -> logging.Logger:
+    lg = logging.getLogger(f"test.async.{id(handler)}")
+    lg.handlers = [handler]
+    lg.propagate = False
+    lg.setLevel(logging.INFO)
+    return lg
+
+
+def test_async_handler_writes_same_json_as_sync() -> None:
+    sync_out, async_out = io.StringIO(), io.StringIO()
+    sync_h = logging.StreamHandler(sync_out)
+    async_h = AsyncBatchHandler(async_out, batch_size=4)
+    for h in (sync_h, async_h):
+        h.setFormatter(JsonFormatter())
+
+    record = logging.LogRecord("app", logging.INFO, __file__, 1, "node_end %s", ("x",), None)
+    record.trace_id = "T-LOG"
+    record.node = "plan"
+    record.duration_ms = 3
+    for _ in range(10):
+        sync_h.handle(record)
+        async_h.handle(logging.makeLogRecord(record.__dict__))
+    async_h.close()
+
+    assert async_out.getvalue() == sync_out.getvalue()
+    line = json.loads(async_out.getvalue().splitlines()[0])
+    assert line["event"] == "node_end x" and line["trace_id"] == "T-LOG" and line["node"] == "plan"
+    assert async_h.stats().written == 10
+
+
+def test_async_handler_renders_exceptions_before_enqueue() -> None:
+    out = io.StringIO()
+    h = AsyncBatchHandler(out)
+    h.setFormatter(JsonFormatter())
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        _logger(h).exception("run_error", extra={"trace_id": "T-EXC"})
+    h.close()
+
+    line = json.loads(out.getvalue())
+    assert line["event"] == "run_error"
+    assert "RuntimeError: boom" in line["exc"]
+
+
+class _GatedStream(io.StringIO):
+    def __init__(self) -> None:
+        super().__init__()
+        self.gate = threading.Event()
+
+    def write(self, s: str) -> int:
+        self.gate.wait(5)
+        return super().write(s)
+
+
+def test_drop_policy_counts_and_never_blocks() -> None:
+    stream = _GatedStream()
+    h = AsyncBatchHandler(stream, queue_size=5, full_policy="drop", batch_size=1)
+    h.setFormatter(JsonFormatter())
+    lg = _logger(h)
+
+    for i in range(50):
+        lg.info("tick", extra={"trace_id": f"T-{i}"})
+
+    st = h.stats()
+    assert st.dropped > 0
+    assert st.enqueued + st.dropped == 50
+
+    stream.gate.set()
+    h.close()
+    assert h.stats().written == st.enqueued
+    assert len(stream.getvalue().splitlines()) == st.enqueued
+
+
+def test_counts_are_exact_across_threads_and_close_is_bounded() -> None:
+    stream = _GatedStream()
+    h = AsyncBatchHandler(stream, queue_size=100, full_policy="drop", batch_size=1)
+    h.setFormatter(JsonFormatter())
+    record = logging.LogRecord("t", logging.INFO, __file__, 1, "tick", None, None)
+
+    def hammer() -> None:
+        for _ in range(500):
+            h.emit(record)  # directly: no Handler.lock around it
+
+    threads = [threading.Thread(target=hammer) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    st = h.stats()
+    assert st.enqueued + st.dropped == 4000
+
+    t0 = time.perf_counter()
+    h.close(timeout=0.1)  # stream stuck, queue full: returns anyway
+    assert time.perf_counter() - t0 < 1
+    stream.gate.set()
+
+
+def test_records_logged_during_a_fork_are_written_after_it() -> None:
+    out = io.StringIO()
+    h = AsyncBatchHandler(out, queue_size=100, batch_size=10)
+    h.setFormatter(JsonFormatter())
+    lg = _logger(h)
+
+    lg.info("before")
+    h._before_fork(timeout=1)
+    lg.info("during")  # behind the stop marker: the writer is gone
+    h._after_fork(in_child=False)
+    lg.info("after")
+    h.close()
+    assert [json.loads(line)["event"] for line in out.getvalue().splitlines()] == ["before", "during", "after"]
+    assert h.stats().dropped == 0
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import logging
+
+from src.middleware.logging import TailSamplingHandler
+
+
+class _Capture(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.events: list[tuple[str, str]] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.events.append((getattr(record, "trace_id", None), record.getMessage()))
+
+
+def _sampler(**kw) -> tuple[TailSamplingHandler, _Capture, logging.Logger]:
+    cap = _Capture()
+    h = TailSamplingHandler(cap, **{"sample_rate": 0.0, **kw})
+    lg = logging.getLogger(f"test.sampling.{id(h)}")
+    lg.handlers = [h]
+    lg.propagate = False
+    lg.setLevel(logging.INFO)
+    return h, cap, lg
+
+
+def _request(lg: logging.Logger, trace_id: str, *, fail: bool = False, status_code: int = 200, duration_ms: int = 1) -> None:
+    lg.info("request_start", extra={"trace_id": trace_id})
+    lg.info("node_start", extra={"trace_id": trace_id, "node": "plan"})
+    if fail:
+        lg.error("node_end", extra={"trace_id": trace_id, "node": "plan", "status": "error"})
+    else:
+        lg.info("node_end", extra={"trace_id": trace_id, "node": "plan", "status": "ok"})
+    lg.info("request_end", extra={"trace_id": trace_id, "status_code": status_code, "duration_ms": duration_ms})
+
+
+def test_fast_ok_traces_drop_node_logs_but_keep_request_logs() -> None:
+    h, cap, lg = _sampler()
+    _request(lg, "T-FAST")
+
+    assert cap.events == [("T-FAST", "request_start"), ("T-FAST", "request_end")]
+    assert h.stats().records_dropped == 2
+
+
+def test_error_slow_and_5xx_traces_are_kept_in_full() -> None:
+    h, cap, lg = _sampler(slow_ms=500)
+    _request(lg, "T-ERR", fail=True)
+    _request(lg, "T-SLOW", duration_ms=900)
+    _request(lg, "T-5XX", status_code=503)
+
+    for trace_id in ("T-ERR", "T-SLOW", "T-5XX"):
+        assert [e for t, e in cap.events if t == trace_id] == ["request_start", "node_start", "node_end", "request_end"]
+    assert h.stats().traces_kept == 3
+
+
+def test_batch_items_are_decided_at_batch_item_end() -> None:
+    h, cap, lg = _sampler(slow_ms=500)
+    for trace_id, duration_ms in (("T-B-0", 1), ("T-B-1", 900)):
+        lg.info("node_start", extra={"trace_id": trace_id, "node": "plan"})
+        lg.info("batch_item_end", extra={"trace_id": trace_id, "status": "done", "duration_ms": duration_ms})
+
+    assert cap.events == [("T-B-0", "batch_item_end"), ("T-B-1", "node_start"), ("T-B-1", "batch_item_end")]
+    assert h.stats().traces_buffered == 0
+
+
+def test_sampling_is_deterministic_by_trace_id() -> None:
+    h, _, _ = _sampler(sample_rate=0.5)
+    ids = [f"T-{i}" for i in range(1000)]
+    first = [h.is_sampled(t) for t in ids]
+
+    assert first == [h.is_sampled(t) for t in ids]
+    assert 400 < sum(first) < 600
+
+
+def test_buffers_are_bounded() -> None:
+    now = [0.0]
+    h, cap, lg = _sampler(max_traces=2, max_records=3, max_age_s=10, clock=lambda: now[0])
+
+    for i in range(3):  # third trace evicts (flushes) the first
+        lg.info("node_start", extra={"trace_id": f"T-{i}"})
+    assert cap.events == [("T-0", "node_start")]
+
+    for _ in range(2):  # T-1 now holds max_records (3): the trace is flushed
+        lg.info("node_end", extra={"trace_id": "T-1"})
+    assert [e for t, e in cap.events if t == "T-1"] == ["node_start", "node_end", "node_end"]
+
+    now[0] = 11.0  # undecided traces past max_age are flushed, not lost
+    lg.info("tool_attempt", extra={"trace_id": "T-X"})
+    assert ("T-2", "node_start") in cap.events
+    assert h.stats().traces_buffered == 0
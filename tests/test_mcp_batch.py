@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import replace
+
+from fastapi.testclient import TestClient
+
+import src.tools.registry as registry
+from src.app.main import app
+import src.mcp.pipeline as pipeline_mod
+from src.mcp.pipeline import get_pipeline
+
+client = TestClient(app)
+
+
+def test_generic_route_errors(monkeypatch) -> None:
+    monkeypatch.setenv("MCP_ALLOWED_TOOLS", "read_file")
+
+    r = client.post("/mcp/tools/nope", json={"path": "data/sample.txt"})
+    assert r.status_code == 404
+    assert r.json() == {"detail": "tool_not_found"}
+
+    r = client.post("/mcp/tools/read_file", json={"path": 123})
+    assert r.status_code == 422
+
+
+def test_batch_returns_ordered_results_with_audit(monkeypatch) -> None:
+    monkeypatch.setenv("MCP_ALLOWED_TOOLS", "read_file")
+    calls = [
+        {"tool": "read_file", "args": {"path": "data/sample.txt"}},
+        {"tool": "read_file", "args": {"path": "../../etc/passwd"}},
+        {"tool": "read_file", "args": {"path": "data/plans.secret"}},
+        {"tool": "nope", "args": {}},
+        {"tool": "read_file", "args": {}},
+    ]
+    r = client.post("/mcp/tools:batch", json={"calls": calls}, headers={"X-Trace-Id": "BATCH-1"})
+    assert r.status_code == 200
+    res = r.json()["results"]
+
+    assert [x["index"] for x in res] == [0, 1, 2, 3, 4]
+    assert [x["status_code"] for x in res] == [200, 200, 403, 404, 422]
+
+    assert res[0]["result"]["ok"] is True
+    assert res[0]["audit"]["outcome"] == "ok"
+    assert res[0]["audit"]["trace_id"] == "BATCH-1"
+
+    assert res[1]["result"]["error"] == "path_outside_data_dir"
+    assert res[1]["audit"]["outcome"] == "blocked"
+
+    assert res[2]["error"] == "approval_required"
+    assert res[2]["audit"]["decision"] == "deny"
+
+    assert res[3]["error"] == "tool_not_found"
+    assert res[3]["audit"] is None
+
+
+def test_batch_concurrency_is_capped(monkeypatch) -> None:
+    monkeypatch.setenv("MCP_ALLOWED_TOOLS", "read_file")
+    spec = registry.get_tool("read_file")
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def slow_handler(**kwargs):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.02)
+        with lock:
+            state["active"] -= 1
+        return spec.handler(**kwargs)
+
+    monkeypatch.setitem(registry._REGISTRY, "read_file", replace(spec, handler=slow_handler))
+    calls = [{"tool": "read_file", "args": {"path": "data/sample.txt"}}] * 12
+    r = client.post("/mcp/tools:batch", json={"calls": calls, "max_concurrency": 3})
+
+    assert r.status_code == 200
+    assert all(x["status_code"] == 200 for x in r.json()["results"])
+    assert 1 < state["peak"] <= 3
+
+
+def test_batch_crash_result_carries_its_audit_event(monkeypatch) -> None:
+    monkeypatch.setenv("MCP_ALLOWED_TOOLS", "read_file")
+
+    def crash(*, repo_root, req):
+        raise RuntimeError("disk on fire")
+
+    spec = registry.get_tool("read_file")
+    monkeypatch.setitem(registry._REGISTRY, "read_file", replace(spec, handler=crash))
+    calls = [{"tool": "read_file", "args": {"path": "data/sample.txt"}}]
+    res = client.post("/mcp/tools:batch", json={"calls": calls}, headers={"X-Trace-Id": "BATCH-CRASH"}).json()["results"]
+
+    assert (res[0]["status_code"], res[0]["error"]) == (500, "tool_crash")
+    assert res[0]["audit"]["outcome"] == "error"
+    assert res[0]["audit"]["trace_id"] == "BATCH-CRASH"
+    assert res[0]["audit"]["result_summary"] == "crash disk on fire"
+
+
+def test_pipeline_is_built_once_per_spec(monkeypatch) -> None:
+    first = get_pipeline("read_file")
+    assert get_pipeline("read_file") is first
+
+    spec = registry.get_tool("read_file")
+    monkeypatch.setitem(registry._REGISTRY, "read_file", replace(spec))
+    assert get_pipeline("read_file") is not first
+
+
+def test_pipeline_is_built_at_registration(monkeypatch) -> None:
+    monkeypatch.setattr(registry, "_REGISTRY", dict(registry._REGISTRY))
+    monkeypatch.setattr(pipeline_mod, "_PIPELINES", dict(pipeline_mod._PIPELINES))
+    assert get_pipeline("read_file")._stream_handler is not None  # registered after the tool
+
+    registry.register_tool(replace(registry.get_tool("read_file"), name="read_file_copy"))
+    built = pipeline_mod._PIPELINES["read_file_copy"][1]
+    assert built.name == "read_file_copy"
+    assert get_pipeline("read_file_copy") is built
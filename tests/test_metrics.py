@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import threading
+
+from fastapi.testclient import TestClient
+
+from src.app.main import app
+from src.middleware.metrics import MetricsRegistry
+
+client = TestClient(app)
+
+
+def test_histogram_and_counter_text_format() -> None:
+    reg = MetricsRegistry()
+    h = reg.histogram("demo_seconds", "demo", ["op"], buckets=(0.1, 1.0))
+    c = reg.counter("demo_total", "demo", ["op"])
+    for v in (0.05, 0.5, 5.0):
+        h.labels("read").observe(v)
+    c.labels("read").inc()
+    c.labels("read").inc(2)
+
+    text = reg.render()
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{op="read",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{op="read",le="1"} 2' in text
+    assert 'demo_seconds_bucket{op="read",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{op="read"} 3' in text
+    assert 'demo_seconds_sum{op="read"} 5.55' in text
+    assert 'demo_total{op="read"} 3' in text
+
+
+def test_concurrent_recording_loses_nothing() -> None:
+    reg = MetricsRegistry()
+    h = reg.histogram("race_seconds", "race")
+    child = h.labels()
+
+    def work() -> None:
+        for _ in range(10_000):
+            child.observe(0.001)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert "race_seconds_count 80000" in reg.render()
+
+
+def test_metrics_endpoint_reports_requests_nodes_and_tools(monkeypatch) -> None:
+    monkeypatch.setenv("MCP_ALLOWED_TOOLS", "read_file")
+    client.post("/run", json={"input": "m"})
+    client.post("/mcp/tools/read_file", json={"path": "data/sample.txt"})
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    text = r.text
+    assert 'http_request_duration_seconds_count{method="POST",route="/run",status_code="200"}' in text
+    assert 'graph_node_duration_seconds_count{node="finish",status="ok"}' in text
+    assert 'tool_attempts_total{tool="read_file",decision="allow",outcome="ok"}' in text
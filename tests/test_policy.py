@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+import os
+
+from fastapi.testclient import TestClient
+
+from src.app.main import app
+from src.core.policy import DENY_ALL, PolicyEngine, compile_policy, policy_from_allowlist
+from src.mcp.pipeline import REPO_ROOT
+
+client = TestClient(app)
+
+DOC = {
+    "version": "v1",
+    "default": "deny",
+    "tools": {"read_file": "allow", "shell": "deny"},
+    "paths": [
+        {"tool": "read_file", "glob": "data/private/*", "effect": "deny"},
+        {"glob": "data/*", "effect": "allow"},
+    ],
+    "approval": ["*.secret", {"tool": "read_file", "glob": "data/hr/*"}],
+}
+
+
+def test_compiled_decisions() -> None:
+    p = compile_policy(DOC, version="unused")
+    assert p.version == "v1"
+
+    assert p.decide("read_file", "data/sample.txt").allowed
+    assert p.decide("shell").reason == "tool_denied"
+    assert p.decide("other").reason == "tool_not_allowlisted"
+
+    assert p.decide("read_file", "data/private/x.txt").reason == "path_denied"
+    assert p.decide("read_file", "data/./private/x.txt").reason == "path_denied"
+    assert p.decide("read_file", "etc/passwd").reason == "path_not_allowlisted"
+
+    assert p.decide("read_file", "data/plans.secret").requires_approval
+    assert p.decide("read_file", "data/hr/pay.txt").requires_approval
+    assert not p.decide("read_file", "data/sample.txt").requires_approval
+
+    # multi-path tools: any denial wins, any approval glob counts
+    assert p.decide_many("read_file", ["data/a.txt", "data/private/x.txt"]).reason == "path_denied"
+    assert p.decide_many("read_file", ["data/a.txt", "data/b.secret"]).requires_approval
+    assert p.decide_many("shell", []).reason == "tool_denied"
+
+
+def test_env_allowlist_keeps_legacy_semantics() -> None:
+    p = policy_from_allowlist(" read_file , ")
+    assert p.decide("read_file", "data/sample.txt").allowed
+    assert p.decide("read_file", "data/plans.secret").requires_approval
+    assert not policy_from_allowlist("").decide("read_file").allowed
+    assert p.version.startswith("env-")
+
+
+def _write(path, doc, mtime_ns: int) -> None:
+    path.write_text(json.dumps(doc))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_engine_hot_swaps_on_mtime_change(tmp_path) -> None:
+    f = tmp_path / "policy.json"
+    _write(f, DOC, 1_000_000_000)
+    now = [0.0]
+    engine = PolicyEngine(str(f), check_interval_s=1.0, clock=lambda: now[0])
+
+    first = engine.current()
+    assert first.version == "v1"
+
+    _write(f, {**DOC, "version": "v2", "tools": {}}, 2_000_000_000)
+    assert engine.current() is first  # not re-checked inside the interval
+
+    now[0] = 1.5
+    second = engine.current()
+    assert second.version == "v2"
+    assert not second.decide("read_file").allowed
+
+    # a broken file keeps the last good policy
+    f.write_text("{not json")
+    os.utime(f, ns=(3_000_000_000, 3_000_000_000))
+    now[0] = 3.0
+    assert engine.current() is second
+
+
+def test_engine_denies_all_when_first_load_fails(tmp_path) -> None:
+    engine = PolicyEngine(str(tmp_path / "missing.json"))
+    assert engine.current() is DENY_ALL
+
+
+def test_policy_file_drives_mcp_and_audit(tmp_path, monkeypatch) -> None:
+    f = tmp_path / "policy.json"
+    _write(f, {**DOC, "version": "pol-42"}, 1_000_000_000)
+    monkeypatch.setenv("MCP_POLICY_FILE", str(f))
+    monkeypatch.delenv("MCP_ALLOWED_TOOLS", raising=False)
+
+    calls = [
+        {"tool": "read_file", "args": {"path": "data/sample.txt"}},
+        {"tool": "read_file", "args": {"path": "data/private/x.txt"}},
+    ]
+    res = client.post("/mcp/tools:batch", json={"calls": calls}).json()["results"]
+    assert res[0]["status_code"] == 200
+    assert res[0]["audit"]["policy_version"] == "pol-42"
+    assert res[1]["status_code"] == 403
+    assert res[1]["error"] == "path_not_allowed"
+    assert res[1]["audit"]["reason"] == "path_denied"
+
+
+def test_absolute_and_dotted_paths_hit_the_same_deny_rules(tmp_path, monkeypatch) -> None:
+    f = tmp_path / "policy.json"
+    doc = {"version": "abs", "default": "deny", "tools": {"read_file": "allow"}, "paths": ["data/sample*"]}
+    _write(f, doc, 1_000_000_000)
+    monkeypatch.setenv("MCP_POLICY_FILE", str(f))
+    monkeypatch.delenv("MCP_ALLOWED_TOOLS", raising=False)
+
+    absolute = str(REPO_ROOT / "data" / "sample.txt")
+    for path in ("data/sample.txt", "./data/sample.txt", "data/../data/sample.txt", absolute):
+        r = client.post("/mcp/tools/read_file", json={"path": path})
+        assert (r.status_code, r.json()["detail"]) == (403, "path_not_allowed"), path
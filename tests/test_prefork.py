@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+import weakref
+from pathlib import Path
+
+from src.core import prefork
+from src.core.audit_sink import AuditSink
+from src.graphs.basic_agent.checkpoint import SqliteCheckpointer
+from src.middleware.metrics import MetricsRegistry, SharedArena
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _in_child(fn) -> None:
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            fn()
+            code = 0
+        finally:
+            os._exit(code)
+    assert os.waitpid(pid, 0)[1] == 0
+
+
+def test_shared_metrics_aggregate_across_processes() -> None:
+    reg = MetricsRegistry()
+    reg.share(SharedArena(slots=3, slot_bytes=64 * 1024))
+    c = reg.counter("jobs_total", "jobs", ["kind"])
+    h = reg.histogram("job_seconds", "jobs", buckets=(0.1, 1.0))
+    c.labels("a").inc()
+
+    def worker(slot: int, kind: str, n: int):
+        def run() -> None:
+            reg.attach_worker(slot)
+            for _ in range(n):
+                c.labels(kind).inc()
+                h.labels().observe(0.5)
+        return run
+
+    _in_child(worker(1, "a", 10))
+    _in_child(worker(2, "b", 5))
+    _in_child(worker(1, "a", 10))  # a restarted worker appends to its slot
+
+    text = reg.render()
+    assert 'jobs_total{kind="a"} 21' in text
+    assert 'jobs_total{kind="b"} 5' in text  # never recorded by this process
+    assert 'job_seconds_bucket{le="1"} 25' in text and "job_seconds_count 25" in text
+
+
+def test_fork_hooks_give_each_process_its_own_writer(tmp_path: Path, monkeypatch) -> None:
+    class Event:
+        def __init__(self, n: int) -> None:
+            self.n = n
+
+        def model_dump_json(self) -> str:
+            return json.dumps({"n": self.n})
+
+    # only the sink under test: the global registry also holds this session's index
+    # pollers, which after_fork(in_child=False) deliberately leaves stopped
+    monkeypatch.setattr(prefork, "_OBJECTS", weakref.WeakSet())
+    sink = AuditSink(str(tmp_path / "audit.ndjson"), fsync="never")
+    assert list(prefork._OBJECTS) == [sink]
+    sink.enqueue(Event(0))
+    prefork.before_fork()
+    try:
+        def child() -> None:
+            prefork.after_fork(in_child=True)
+            sink.enqueue(Event(1))
+            assert sink.flush()
+        _in_child(child)
+    finally:
+        prefork.after_fork(in_child=False)
+    sink.enqueue(Event(2))
+    sink.close()
+    lines = (tmp_path / "audit.ndjson").read_text().splitlines()
+    assert sorted(json.loads(line)["n"] for line in lines) == [0, 1, 2]
+
+
+def test_shared_checkpointer_leases_a_thread_to_one_worker(tmp_path: Path) -> None:
+    path = str(tmp_path / "checkpoints.db")
+    workers = [SqliteCheckpointer(path), SqliteCheckpointer(path)]
+    for cp in workers:  # what each forked worker does: shared mode, its own lease owner
+        cp._before_fork()
+        cp._after_fork(in_child=True)
+    a, b = workers
+    try:
+        assert a.claim("t1")
+        assert not b.claim("t1")
+        assert b.claim("t2")  # other threads are unaffected
+        a.unclaim("t1")
+        assert b.claim("t1")
+
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        b._leases.execute("UPDATE thread_leases SET pid = ? WHERE thread_id = 't1'", (dead.pid,))
+        assert a.claim("t1")  # its worker is gone: the lease is taken over
+    finally:
+        for cp in workers:
+            cp.close()
+
+
+def _get(url: str) -> tuple[int, str]:
+    try:
+        with urllib.request.urlopen(url, timeout=5) as r:
+            return r.status, r.read().decode()
+    except OSError:
+        return 0, ""
+
+
+def test_serve_prefork_workers_report_shared_totals() -> None:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "src.app.serve", "--workers", "2", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=REPO_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while _get(f"{base}/readyz")[0] != 200:
+            assert time.monotonic() < deadline and proc.poll() is None
+            time.sleep(0.1)
+        for i in range(10):
+            req = urllib.request.Request(
+                f"{base}/run", data=json.dumps({"input": f"x{i}"}).encode(), headers={"content-type": "application/json"}
+            )
+            with urllib.request.urlopen(req, timeout=5) as r:
+                assert json.loads(r.read())["status"] == "done"
+        for _ in range(3):  # whichever worker answers reports the same totals
+            text = _get(f"{base}/metrics")[1]
+            assert 'http_request_duration_seconds_count{method="POST",route="/run",status_code="200"} 10' in text
+    finally:
+        proc.terminate()
+        assert proc.wait(timeout=15) == 0
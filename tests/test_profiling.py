@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import tracemalloc
+
+from fastapi.testclient import TestClient
+
+from src.app.main import app
+from src.middleware import profiling
+from src.middleware.spans import TRACE_STORE, Span
+
+client = TestClient(app)
+
+
+def test_x_profile_attaches_per_node_profiles_to_the_trace(monkeypatch) -> None:
+    # the header is ignored unless enabled
+    client.post("/run", json={"input": "prof", "max_steps": 1}, headers={"X-Profile": "1", "X-Trace-Id": "T-HDR-OFF"})
+    assert client.get("/debug/profiles/T-HDR-OFF").status_code == 404
+
+    monkeypatch.setattr(profiling, "PROFILE_HEADER_ENABLED", True)
+    r = client.post("/run", json={"input": "prof", "max_steps": 1}, headers={"X-Profile": "1", "X-Trace-Id": "T-PROF"})
+    assert r.status_code == 200
+
+    body = client.get("/debug/profiles/T-PROF").json()
+    assert [p["name"] for p in body["profiles"]] == ["plan", "verify", "finish"]
+    plan = body["profiles"][0]
+    assert any("(aplan)" in f["function"] or "(plan)" in f["function"] for f in plan["cpu"])
+    assert not any("spans.py" in f["function"] or "profiling.py" in f["function"] for f in plan["cpu"])
+    assert all(a["size_bytes"] > 0 and ":" in a["site"] for a in plan["alloc"])
+    assert client.get("/debug/profiles").json()["traces"][0] == "T-PROF"
+    assert not tracemalloc.is_tracing()  # stopped with the last profiled span
+
+    # off by default: no profile attrs, nothing to show
+    client.post("/run", json={"input": "prof", "max_steps": 1}, headers={"X-Trace-Id": "T-NOPROF"})
+    assert client.get("/debug/profiles/T-NOPROF").json()["detail"] == "profile_not_found"
+    assert all("profile" not in s.attrs for s in TRACE_STORE.get("T-NOPROF"))
+
+
+def test_outermost_span_profiles_and_sampling(monkeypatch) -> None:
+    def busy() -> list[str]:
+        return [str(i) for i in range(20_000)]
+
+    with profiling.profile_trace("T-MANUAL"):
+        with Span("outer", "T-MANUAL", log=False) as outer:
+            with Span("inner", "T-MANUAL", log=False) as inner:
+                kept = busy()
+    assert "profile" not in inner.attrs  # same thread: covered by the outer profile
+
+    # another trace's span while this thread is profiling (async nodes on one loop): skipped, counted
+    skipped = profiling.skipped_spans()
+    with profiling.profile_trace("T-A"), Span("a", "T-A", log=False) as a:
+        with profiling.profile_trace("T-B"), Span("b", "T-B", log=False) as b:
+            pass
+    assert "profile" in a.attrs and "profile" not in b.attrs
+    assert client.get("/debug/profiles").json()["skipped_spans"] == skipped + 1
+    top = outer.attrs["profile"]["cpu"][0]
+    assert "(busy)" in top["function"] and top["calls"] == 1
+    assert outer.attrs["profile"]["alloc"][0]["size_bytes"] > 100_000
+    assert len(kept) == 20_000
+
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1.0)
+    client.post("/run", json={"input": "sampled", "max_steps": 1}, headers={"X-Trace-Id": "T-SAMPLED"})
+    assert len(client.get("/debug/profiles/T-SAMPLED").json()["profiles"]) == 3
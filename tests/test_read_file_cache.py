@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import os
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import src.tools.read_file as read_file
+import src.tools.registry as registry
+from src.app.main import app
+from src.tools.file_cache import FileContentCache, file_identity
+
+client = TestClient(app)
+
+OLD_NS = 1_600_000_000 * 10**9  # well outside the racy window
+
+
+def _write(path: Path, data: bytes, mtime_ns: int = OLD_NS) -> os.stat_result:
+    path.write_bytes(data)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return os.stat(path)
+
+
+def test_hit_then_invalidated_on_identity_change(tmp_path: Path) -> None:
+    f = tmp_path / "a.txt"
+    cache = FileContentCache()
+    st = _write(f, b"hello")
+    cache.put(str(f), st, b"hello")
+
+    assert cache.get(str(f), file_identity(os.stat(f))).text == "hello"
+
+    # same size, different mtime -> different identity, never served
+    st = _write(f, b"HELLO", OLD_NS + 1)
+    assert cache.get(str(f), file_identity(st)) is None
+
+    s = cache.stats()
+    assert (s.hits, s.misses, s.invalidations, s.entries) == (1, 1, 1, 0)
+
+
+def test_recently_modified_files_are_not_stored(tmp_path: Path) -> None:
+    f = tmp_path / "fresh.txt"
+    f.write_bytes(b"new")
+    cache = FileContentCache()
+    _, stored = cache.put(str(f), os.stat(f), b"new")
+    assert not stored
+    assert cache.stats().bypassed == 1
+
+
+def test_lru_eviction_by_byte_budget(tmp_path: Path) -> None:
+    cache = FileContentCache(max_bytes=40)  # each 10-byte file costs 20 (bytes + text)
+    for name in ("a", "b", "c"):
+        f = tmp_path / name
+        cache.put(str(f), _write(f, b"0123456789"), b"0123456789")
+    s = cache.stats()
+    assert (s.entries, s.evictions, s.bytes) == (2, 1, 40)
+    assert cache.get(str(tmp_path / "a"), file_identity(os.stat(tmp_path / "a"))) is None
+
+
+def test_non_ascii_text_is_budgeted_in_bytes(tmp_path: Path) -> None:
+    data = "データ".encode() * 10  # 30 characters, 90 bytes
+    f = tmp_path / "ja.txt"
+    cache = FileContentCache(max_bytes=150)
+    _, stored = cache.put(str(f), _write(f, data), data)
+    assert not stored  # 90 raw + 90 text bytes > 150, though only 30 characters
+    cache = FileContentCache(max_bytes=180)
+    cache.put(str(f), _write(f, data), data)
+    assert cache.stats().bytes == 180
+
+
+def test_read_file_safe_uses_cache_and_sees_changes(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(read_file, "_CACHE", FileContentCache())
+    (tmp_path / "data").mkdir()
+    f = tmp_path / "data" / "doc.txt"
+    _write(f, b"version one")
+
+    first = read_file.read_file_safe(repo_root=tmp_path, relative_path="data/doc.txt")
+    second = read_file.read_file_safe(repo_root=tmp_path, relative_path="data/doc.txt", offset=8, length=3)
+    assert (first.cache, first.content) == ("miss", "version one")
+    assert (second.cache, second.content) == ("hit", "one")
+
+    _write(f, b"version two", OLD_NS + 5)
+    third = read_file.read_file_safe(repo_root=tmp_path, relative_path="data/doc.txt")
+    assert (third.cache, third.content) == ("miss", "version two")
+
+    with pytest.raises(read_file.ReadFileError, match="file_not_found"):
+        read_file.read_file_safe(repo_root=tmp_path, relative_path="data/missing.txt")
+
+
+def test_stats_in_audit_summary_and_debug_endpoint(monkeypatch) -> None:
+    monkeypatch.setenv("MCP_ALLOWED_TOOLS", "read_file")
+    monkeypatch.setattr(read_file, "_CACHE", FileContentCache())
+    # other tests swap in spy specs built from the core fields only
+    spec = replace(registry.get_tool("read_file"), summarize=read_file._summarize_read_file)
+    monkeypatch.setitem(registry._REGISTRY, "read_file", spec)
+
+    calls = [{"tool": "read_file", "args": {"path": "data/sample.txt"}}]
+    res = client.post("/mcp/tools:batch", json={"calls": calls}).json()["results"][0]
+    assert res["result"]["cache"] in ("miss", "bypass")
+    assert "misses=1" in res["audit"]["result_summary"]
+
+    r = client.get("/debug/read_file/cache")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["enabled"] is True
+    assert body["misses"] == 1
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import src.mcp.pipeline as pipeline_mod
+from src.app.main import app
+from src.mcp.pipeline import ToolPipeline
+from src.tools.registry import get_tool
+from src.tools.read_file import (
+    MMAP_THRESHOLD,
+    ReadFileError,
+    open_file_stream,
+    read_file_safe,
+)
+
+client = TestClient(app)
+
+
+@pytest.fixture()
+def repo(tmp_path: Path) -> Path:
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "small.txt").write_bytes(b"0123456789")
+    # big enough to take the mmap path; position-dependent content
+    (data / "big.bin").write_bytes(bytes(i % 251 for i in range(MMAP_THRESHOLD * 2)))
+    (data / "sub").mkdir()
+    return tmp_path
+
+
+def test_ranged_reads(repo: Path) -> None:
+    r = read_file_safe(repo_root=repo, relative_path="data/small.txt", offset=2, length=3)
+    assert (r.content, r.length, r.bytes, r.eof) == ("234", 3, 10, False)
+
+    r = read_file_safe(repo_root=repo, relative_path="data/small.txt", offset=7)
+    assert (r.content, r.eof) == ("789", True)
+
+    r = read_file_safe(repo_root=repo, relative_path="data/small.txt", offset=10)
+    assert (r.content, r.length, r.eof) == ("", 0, True)
+
+
+def test_mmap_slice_matches_file(repo: Path) -> None:
+    offset = MMAP_THRESHOLD + 17
+    r = read_file_safe(repo_root=repo, relative_path="data/big.bin", offset=offset, length=1000)
+    expected = bytes(i % 251 for i in range(offset, offset + 1000)).decode("utf-8", errors="replace")
+    assert r.length == 1000
+    assert r.content == expected
+
+
+@pytest.mark.parametrize(
+    ("path", "kwargs", "error"),
+    [
+        ("data/../../etc/passwd", {}, "path_outside_data_dir"),
+        ("data/missing.txt", {}, "file_not_found"),
+        ("data/sub", {}, "file_not_found"),
+        ("data/big.bin", {}, "file_too_large"),  # unranged read of a big file
+        ("data/big.bin", {"length": 64_001}, "range_too_large"),
+        ("data/small.txt", {"offset": 11}, "offset_out_of_range"),
+    ],
+)
+def test_guardrails_still_apply(repo: Path, path: str, kwargs: dict, error: str) -> None:
+    with pytest.raises(ReadFileError, match=error):
+        read_file_safe(repo_root=repo, relative_path=path, **kwargs)
+
+
+def test_stream_yields_range_in_chunks(repo: Path) -> None:
+    s = open_file_stream(repo_root=repo, relative_path="data/big.bin", offset=5, length=200_000, chunk_size=65_536)
+    chunks = list(s.chunks)
+    assert [len(c) for c in chunks] == [65_536, 65_536, 65_536, 3_392]
+    assert b"".join(chunks) == bytes(i % 251 for i in range(5, 200_005))
+
+    with pytest.raises(ReadFileError, match="path_outside_data_dir"):
+        open_file_stream(repo_root=repo, relative_path="data/../secrets.txt")
+
+
+def test_stream_is_audited_when_its_iterator_finishes(repo: Path, monkeypatch) -> None:
+    monkeypatch.setenv("MCP_ALLOWED_TOOLS", "read_file")
+    events: list[dict] = []
+    monkeypatch.setattr(pipeline_mod, "audit_tool_attempt", lambda **kw: events.append(kw))
+    pipeline = ToolPipeline(get_tool("read_file"), repo)
+    call = {"path": "data/big.bin", "length": 200_000}
+
+    _, chunks, evt = asyncio.run(pipeline.arun_stream(call, trace_id="t"))
+    assert evt is None and events == []  # nothing sent yet
+    assert sum(len(c) for c in chunks) == 200_000
+    assert [e["outcome"] for e in events] == ["ok"]
+
+    _, chunks, _ = asyncio.run(pipeline.arun_stream(call, trace_id="t"))
+    next(chunks)
+    chunks.close()  # client went away after the first chunk
+    assert (events[-1]["outcome"], events[-1]["result_summary"]) == ("error", "stream_aborted sent=65536")
+
+    _, chunks, _ = asyncio.run(pipeline.arun_stream(call, trace_id="t"))
+    chunks.close()  # response never iterated
+    assert events[-1]["result_summary"] == "stream_aborted sent=0"
+
+
+def test_mcp_ranged_and_streamed(monkeypatch) -> None:
+    monkeypatch.setenv("MCP_ALLOWED_TOOLS", "read_file")
+
+    r = client.post("/mcp/tools/read_file", json={"path": "data/sample.txt", "offset": 1, "length": 3})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["ok"] is True
+    assert body["content"] == "afa"
+    assert body["bytes"] == 6
+
+    r = client.post("/mcp/tools/read_file:stream", json={"path": "data/sample.txt", "offset": 2})
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/octet-stream"
+    assert r.headers["content-range"] == "bytes 2-5/6"
+    assert r.content == b"fafq"
+
+    r = client.post("/mcp/tools/read_file:stream", json={"path": "../../etc/passwd"})
+    assert r.status_code == 200
+    assert r.json()["error"] == "path_outside_data_dir"
+
+    r = client.post("/mcp/tools/read_file:stream", json={"path": "data/plans.secret"})
+    assert r.status_code == 403
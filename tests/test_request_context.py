@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import logging
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.app.main import app
+from src.middleware.request_context import RequestContextMiddleware
+
+client = TestClient(app)
+
+
+def _ends(caplog) -> list[logging.LogRecord]:
+    return [r for r in caplog.records if r.getMessage() == "request_end"]
+
+
+def test_trace_id_is_echoed_or_generated(caplog) -> None:
+    caplog.set_level(logging.INFO)
+    r = client.get("/healthz", headers={"X-Trace-Id": "MW-ECHO"})
+    assert r.headers["X-Trace-Id"] == "MW-ECHO"
+
+    generated = client.get("/healthz").headers["X-Trace-Id"]
+    assert len(generated) == 32
+
+    end = [e for e in _ends(caplog) if e.trace_id == "MW-ECHO"][0]
+    assert end.status_code == 200
+    assert isinstance(end.duration_ms, int)
+    assert any(r.getMessage() == "request_start" and r.trace_id == "MW-ECHO" for r in caplog.records)
+
+
+def test_unhandled_error_returns_500_with_trace_header(caplog) -> None:
+    caplog.set_level(logging.INFO)
+    bad = FastAPI()
+    bad.add_middleware(RequestContextMiddleware)
+
+    @bad.get("/boom")
+    def boom() -> None:
+        raise RuntimeError("boom")
+
+    r = TestClient(bad).get("/boom", headers={"X-Trace-Id": "MW-500"})
+    assert r.status_code == 500
+    assert r.headers["X-Trace-Id"] == "MW-500"
+    assert any(rec.getMessage() == "request_error" for rec in caplog.records)
+    assert _ends(caplog)[-1].status_code == 500
+
+
+def test_streaming_body_passes_through_and_ends_after_last_chunk(caplog) -> None:
+    caplog.set_level(logging.INFO)
+    streaming = FastAPI()
+    streaming.add_middleware(RequestContextMiddleware)
+    chunks_sent = []
+
+    @streaming.get("/chunks")
+    def chunks() -> StreamingResponse:
+        def gen():
+            for i in range(3):
+                chunks_sent.append(i)
+                yield f"{i}\n"
+        return StreamingResponse(gen(), media_type="text/plain")
+
+    r = TestClient(streaming).get("/chunks", headers={"X-Trace-Id": "MW-STREAM"})
+    assert r.text == "0\n1\n2\n"
+    assert r.headers["X-Trace-Id"] == "MW-STREAM"
+    assert len(_ends(caplog)) == 1 and chunks_sent == [0, 1, 2]
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from src.app.main import app
+from src.graphs.basic_agent.run import run_graph, run_graph_async
+
+client = TestClient(app)
+
+
+def test_async_and_sync_paths_agree() -> None:
+    sync_final = run_graph(input="same", trace_id="T-SYNC")
+    async_final = asyncio.run(run_graph_async(input="same", trace_id="T-ASYNC"))
+
+    assert async_final.history == sync_final.history
+    assert async_final.result == sync_final.result == "ok:same"
+
+
+def test_run_endpoint_done_and_error() -> None:
+    ok = client.post("/run", headers={"X-Trace-Id": "RUN-OK"}, json={"input": "hello"})
+    assert ok.status_code == 200
+    assert ok.json() == {"trace_id": "RUN-OK", "status": "done", "result": "ok:hello"}
+
+    failed = client.post("/run", headers={"X-Trace-Id": "RUN-FAIL"}, json={"input": "fail"})
+    assert failed.status_code == 200
+    assert failed.json() == {"trace_id": "RUN-FAIL", "status": "error", "result": None}
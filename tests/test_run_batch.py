@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import json
+
+from fastapi.testclient import TestClient
+
+from src.app.main import app
+from src.graphs.basic_agent.run import BatchItem, run_graph_batch
+
+client = TestClient(app)
+
+
+def test_run_batch_streams_ndjson_and_isolates_failures() -> None:
+    inputs = ["a", "fail", "b", "c"]
+    r = client.post(
+        "/run/batch",
+        headers={"X-Trace-Id": "BATCH"},
+        json={"items": [{"input": x} for x in inputs], "max_concurrency": 2},
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in r.text.splitlines() if line]
+    assert sorted(line["index"] for line in lines) == [0, 1, 2, 3]
+
+    by_index = {line["index"]: line for line in lines}
+    for i, x in enumerate(inputs):
+        assert by_index[i]["trace_id"] == f"BATCH-{i}"
+        if x == "fail":
+            assert by_index[i]["status"] == "error"
+            assert by_index[i]["result"] is None
+        else:
+            assert by_index[i]["status"] == "done"
+            assert by_index[i]["result"] == f"ok:{x}"
+
+
+def test_run_graph_batch_yields_every_item_once() -> None:
+    items = [BatchItem(input=str(i), trace_id=f"T-{i}") for i in range(20)]
+    results = list(run_graph_batch(items, max_concurrency=3))
+
+    assert sorted(r.index for r in results) == list(range(20))
+    assert all(r.status == "done" and r.result == f"ok:{r.index}" for r in results)
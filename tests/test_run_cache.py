@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+import src.graphs.basic_agent.run as run_mod
+from src.graphs.basic_agent.cache import GraphResultCache
+from src.graphs.basic_agent.graph import build_graph, graph_fingerprint
+from src.graphs.basic_agent.state import GraphState
+
+
+def _state(trace_id: str = "T", result: str = "r") -> GraphState:
+    return GraphState(trace_id=trace_id, input="x", history=["finish"], result=result)
+
+
+def test_lru_ttl_and_byte_budget() -> None:
+    now = [0.0]
+    cache = GraphResultCache(max_entries=2, ttl_s=10.0, clock=lambda: now[0])
+
+    cache.get_or_compute("a", lambda: _state(result="a"))
+    cache.get_or_compute("b", lambda: _state(result="b"))
+    cache.get_or_compute("a", lambda: pytest.fail("should hit"))  # a is now most recent
+    cache.get_or_compute("c", lambda: _state(result="c"))  # evicts b
+
+    st = cache.stats()
+    assert (st.hits, st.misses, st.evictions, st.entries) == (1, 3, 1, 2)
+
+    now[0] = 11.0
+    assert cache.get_or_compute("a", lambda: _state(result="a2")).result == "a2"
+    assert cache.stats().expirations == 1
+
+    one = len(_state().model_dump_json())
+    tiny = GraphResultCache(max_bytes=one * 2)
+    for k in "xyz":
+        tiny.get_or_compute(k, lambda: _state())
+    assert tiny.stats().entries == 2
+    assert tiny.stats().bytes <= one * 2
+
+
+def test_single_flight_shares_one_execution() -> None:
+    cache = GraphResultCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = {"n": 0}
+
+    def slow() -> GraphState:
+        calls["n"] += 1
+        started.set()
+        release.wait(5)
+        return _state()
+
+    results: list[GraphState] = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_compute("k", slow)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", slow))) for _ in range(4)]
+    for t in followers:
+        t.start()
+    release.set()
+    for t in [leader, *followers]:
+        t.join(5)
+
+    assert calls["n"] == 1
+    assert len(results) == 5
+    assert cache.stats().misses == 1
+
+
+def test_async_single_flight_propagates_errors_without_caching() -> None:
+    cache = GraphResultCache()
+    calls = {"n": 0}
+
+    async def boom() -> GraphState:
+        calls["n"] += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def main() -> list[object]:
+        return await asyncio.gather(*(cache.aget_or_compute("k", boom) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert calls["n"] == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert cache.stats().entries == 0
+
+
+def test_async_leader_cancellation_does_not_cancel_followers() -> None:
+    cache = GraphResultCache()
+    state = _state("T-L")
+
+    async def slow() -> GraphState:
+        await asyncio.sleep(0.05)
+        return state
+
+    async def main() -> GraphState:
+        leader = asyncio.ensure_future(cache.aget_or_compute("k", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(cache.aget_or_compute("k", slow))
+        await asyncio.sleep(0.01)
+        leader.cancel()  # e.g. the leader's client disconnected
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) is state
+    assert cache.stats().entries == 1  # the run finished and was stored
+
+
+def test_run_graph_cache_restamps_trace_id(monkeypatch) -> None:
+    monkeypatch.setattr(run_mod, "_CACHE", GraphResultCache())
+
+    first = run_mod.run_graph(input="cached", trace_id="T-1")
+    second = run_mod.run_graph(input="cached", trace_id="T-2")
+    third = asyncio.run(run_mod.run_graph_async(input="cached", trace_id="T-3"))
+
+    assert (first.trace_id, second.trace_id, third.trace_id) == ("T-1", "T-2", "T-3")
+    assert first.history == second.history == third.history
+    assert run_mod.cache_stats().hits == 2
+
+
+def test_fingerprint_tracks_topology() -> None:
+    graph = build_graph()
+    assert graph_fingerprint(graph) == graph_fingerprint(build_graph())
+
+    from langgraph.graph import END, StateGraph
+
+    g = StateGraph(GraphState)
+    g.add_node("finish", lambda s: {"result": "x"})
+    g.set_entry_point("finish")
+    g.add_edge("finish", END)
+    assert graph_fingerprint(g.compile()) != graph_fingerprint(graph)
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import json
+
+from fastapi.testclient import TestClient
+
+import src.graphs.basic_agent.run as run_mod
+from src.app.main import app
+
+client = TestClient(app)
+
+
+def _parse_sse(text: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_run_stream_emits_node_patches_then_result() -> None:
+    r = client.post("/run/stream", headers={"X-Trace-Id": "STREAM"}, json={"input": "hi"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+
+    events = _parse_sse(r.text)
+    nodes = [data for name, data in events if name == "node"]
+    assert [n["node"] for n in nodes] == ["plan", "verify", "plan", "verify", "plan", "verify", "finish"]
+    assert all(n["history"] == [n["node"]] for n in nodes)
+    assert [n["step"] for n in nodes] == [1, 1, 2, 2, 3, 3, 3]
+    assert all(isinstance(n["duration_ms"], int) for n in nodes)
+
+    assert events[-1] == ("result", {"trace_id": "STREAM", "status": "done", "result": "ok:hi"})
+
+
+def test_run_stream_failure_ends_with_error_result() -> None:
+    r = client.post("/run/stream", headers={"X-Trace-Id": "STREAM-FAIL"}, json={"input": "fail"})
+    events = _parse_sse(r.text)
+
+    assert [name for name, _ in events] == ["result"]
+    assert events[0][1] == {"trace_id": "STREAM-FAIL", "status": "error", "result": None}
+
+
+def test_run_stream_on_a_busy_thread_is_409_like_run(monkeypatch) -> None:
+    monkeypatch.setattr(run_mod, "_ACTIVE_THREADS", {"busy-thread"})  # another run holds it
+    body = {"input": "hi", "thread_id": "busy-thread"}
+
+    for path in ("/run", "/run/stream"):
+        r = client.post(path, json=body)
+        assert (r.status_code, r.json()) == (409, {"detail": "thread_busy"}), path
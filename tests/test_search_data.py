@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app.main import app
+from src.mcp.pipeline import ToolCallRejected, ToolPipeline
+from src.tools.data_index import DataIndex
+from src.tools.registry import get_tool
+from src.tools.search_index import SearchIndex
+
+client = TestClient(app)
+
+
+def _tree(tmp_path: Path) -> Path:
+    root = tmp_path / "data"
+    (root / "notes").mkdir(parents=True)
+    (root / "alpha.txt").write_text("The quick brown fox jumps over the lazy dog. Fox again: FOX!")
+    (root / "notes" / "beta.txt").write_text("A lazy afternoon; no foxes here, just a dog.")
+    (root / "notes" / "café.txt").write_text("Ünïcode prefix then fox at the end", encoding="utf-8")
+    (root / "blob.bin").write_bytes(b"fox\x00\x01\x02")
+    return root
+
+
+def test_ranked_hits_with_byte_offsets(tmp_path: Path) -> None:
+    root = _tree(tmp_path)
+    idx = SearchIndex(DataIndex(root))
+    idx.sync()
+
+    hits = idx.search("fox")
+    assert [h.path for h in hits] == ["data/alpha.txt", "data/notes/café.txt"]  # tf=3 ranks first; binary skipped
+    assert idx.stats().skipped == 1
+
+    for h in hits:
+        raw = (tmp_path / h.path).read_bytes()
+        assert h.matches and all(raw[m.offset : m.offset + m.length].lower() == b"fox" for m in h.matches)
+        assert "fox" in h.snippet.lower()
+    assert len(hits[0].matches) == 3  # "foxes" is a different word
+
+    assert [h.path for h in idx.search("lazy dog", prefix="data/notes")] == ["data/notes/beta.txt"]
+    assert [h.path for h in idx.search("fox", keep=lambda p: "alpha" not in p)] == ["data/notes/café.txt"]
+    assert idx.search("   ") == []
+
+
+def test_incremental_sync_updates_and_removes(tmp_path: Path) -> None:
+    root = _tree(tmp_path)
+    data_index = DataIndex(root)
+    idx = SearchIndex(data_index)
+    idx.sync()
+    assert idx.sync() == 0  # same snapshot: nothing to do
+
+    (root / "alpha.txt").write_text("now about badgers")
+    os.utime(root / "alpha.txt", ns=(1, 1))  # make the change visible even within one mtime tick
+    (root / "notes" / "beta.txt").unlink()
+    data_index.refresh(full=True)
+
+    assert idx.sync() == 2
+    assert [h.path for h in idx.search("badgers")] == ["data/alpha.txt"]
+    assert [h.path for h in idx.search("fox")] == ["data/notes/café.txt"]
+    assert idx.search("afternoon") == []
+    assert idx.stats().files == 2
+
+
+
+def test_non_ascii_terms_get_byte_offsets(tmp_path: Path) -> None:
+    root = tmp_path / "data"
+    root.mkdir()
+    (root / "release.txt").write_text("Notes: ÉDITION spéciale, then Édition 2 and édition.", encoding="utf-8")
+    idx = SearchIndex(DataIndex(root))
+    idx.sync()
+
+    [hit] = idx.search("édition")
+    raw = (tmp_path / hit.path).read_bytes()
+    assert [raw[m.offset : m.offset + m.length].decode() for m in hit.matches] == ["ÉDITION", "Édition", "édition"]
+    assert "ÉDITION" in hit.snippet
+
+    [hit] = idx.search("then")  # ASCII term in a non-ASCII file: offset past multi-byte chars
+    assert raw[hit.matches[0].offset : hit.matches[0].offset + 4] == b"then"
+
+
+def test_files_changed_since_sync_are_skipped(tmp_path: Path) -> None:
+    root = _tree(tmp_path)
+    idx = SearchIndex(DataIndex(root))
+    idx.sync()
+
+    (root / "alpha.txt").write_text("x" * 10_000 + " fox")  # grown, not yet re-synced
+    assert [h.path for h in idx.search("fox")] == ["data/notes/café.txt"]
+
+def test_pipeline_confinement_and_secret_approval(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("MCP_ALLOWED_TOOLS", "search_data")
+    root = _tree(tmp_path)
+    (root / "plans.secret").write_text("fox plans")
+    pipeline = ToolPipeline(get_tool("search_data"), tmp_path)
+
+    resp, evt = pipeline.run({"query": "fox plans"}, trace_id="t-search")
+    assert "data/plans.secret" not in [h.path for h in resp.hits]
+    assert resp.withheld == 1 and resp.complete
+    assert evt.outcome == "ok"
+
+    with pytest.raises(ToolCallRejected) as exc:
+        pipeline.run({"query": "fox", "include_approval_required": True}, trace_id="t-search")
+    assert exc.value.detail == "approval_required"
+
+    resp, _ = pipeline.run({"query": "plans", "include_approval_required": True}, trace_id="t", approval="approved")
+    assert [h.path for h in resp.hits] == ["data/plans.secret"]
+
+    resp, evt = pipeline.run({"query": "fox", "path": "data/../src"}, trace_id="t-search")
+    assert (resp.ok, resp.error, evt.outcome) == (False, "path_outside_data_dir", "blocked")
+
+
+def test_endpoint_and_debug_stats(monkeypatch) -> None:
+    monkeypatch.setenv("MCP_ALLOWED_TOOLS", "search_data")
+    r = client.post("/mcp/tools/search_data", json={"query": "dafafq"})
+    assert r.status_code == 200
+    assert [h["path"] for h in r.json()["hits"]] == ["data/sample.txt"]
+
+    stats = client.get("/debug/search_data/index").json()
+    assert stats["files"] >= 1 and stats["ready"] is True
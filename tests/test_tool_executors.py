@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from dataclasses import replace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import src.tools.registry as registry
+from src.app.main import app
+from src.mcp.executors import ToolExecutor, ToolQueueFull
+
+client = TestClient(app)
+
+
+def test_executor_rejects_past_queue_depth() -> None:
+    ex = ToolExecutor("unit", max_concurrency=1, max_queue=1)
+    gate = threading.Event()
+    try:
+        running = ex.submit(gate.wait)
+        queued = ex.submit(lambda: "queued")
+        with pytest.raises(ToolQueueFull):
+            ex.submit(lambda: "rejected")
+
+        s = ex.stats()
+        assert (s.running, s.queued, s.rejected) == (1, 1, 1)
+
+        gate.set()
+        assert running.result(timeout=1) is True
+        assert queued.result(timeout=1) == "queued"
+        # slots are released once calls finish
+        assert ex.call(lambda: "again") == "again"
+    finally:
+        gate.set()
+        ex.shutdown()
+
+
+def test_cancelled_queued_call_gives_its_slot_back() -> None:
+    ex = ToolExecutor("unit-cancel", max_concurrency=1, max_queue=1)
+    gate = threading.Event()
+
+    async def scenario() -> None:
+        running = asyncio.ensure_future(ex.acall(gate.wait))
+        await asyncio.sleep(0.05)
+        for _ in range(3):  # more cancellations than max_concurrency + max_queue
+            queued = asyncio.ensure_future(ex.acall(lambda: "never"))
+            await asyncio.sleep(0)
+            queued.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await queued
+        s = ex.stats()
+        assert (s.running, s.queued) == (1, 0)
+        gate.set()
+        assert await running is True
+
+    try:
+        asyncio.run(scenario())
+        assert ex.call(lambda: "again") == "again"
+        assert ex.stats().queued == 0
+    finally:
+        gate.set()
+        ex.shutdown()
+
+
+def test_saturated_tool_returns_429_and_is_audited(monkeypatch) -> None:
+    monkeypatch.setenv("MCP_ALLOWED_TOOLS", "read_file")
+    spec = registry.get_tool("read_file")
+
+    def slow_handler(**kwargs):
+        time.sleep(0.1)
+        return spec.handler(**kwargs)
+
+    monkeypatch.setitem(
+        registry._REGISTRY,
+        "read_file",
+        replace(spec, handler=slow_handler, max_concurrency=1, max_queue=1),
+    )
+    calls = [{"tool": "read_file", "args": {"path": "data/sample.txt"}}] * 4
+    res = client.post("/mcp/tools:batch", json={"calls": calls, "max_concurrency": 4}).json()["results"]
+
+    codes = sorted(r["status_code"] for r in res)
+    assert codes == [200, 200, 429, 429]
+    rejected = [r for r in res if r["status_code"] == 429]
+    assert all(r["error"] == "tool_queue_full" for r in rejected)
+    assert all(r["audit"]["outcome"] == "blocked" and r["audit"]["reason"] == "queue_full" for r in rejected)
+
+    ex = next(e for e in client.get("/debug/tools/executors").json()["executors"] if e["max_queue"] == 1)
+    assert ex["tool"] == "read_file"
+    assert ex["rejected"] == 2
+
+
+def test_queue_wait_and_exec_time_are_separate_metrics(monkeypatch) -> None:
+    monkeypatch.setenv("MCP_ALLOWED_TOOLS", "read_file")
+    client.post("/mcp/tools/read_file", json={"path": "data/sample.txt"})
+
+    text = client.get("/metrics").text
+    assert 'tool_queue_wait_seconds_count{tool="read_file"}' in text
+    assert 'tool_exec_duration_seconds_count{tool="read_file",status="ok"}' in text
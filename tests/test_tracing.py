@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import logging
+
+from fastapi.testclient import TestClient
+
+from src.app.main import app
+from src.middleware.logging import TraceContextFilter
+from src.middleware.spans import TRACE_STORE, Span, TraceStore, current_trace_id
+
+client = TestClient(app)
+
+
+def _walk(node: dict, depth: int = 0):
+    yield depth, node
+    for child in node["children"]:
+        yield from _walk(child, depth + 1)
+
+
+def test_run_trace_nests_request_graph_nodes() -> None:
+    r = client.post("/run", json={"input": "hello"}, headers={"X-Trace-Id": "trace-tree-1"})
+    assert r.status_code == 200
+
+    t = client.get("/debug/traces/trace-tree-1")
+    assert t.status_code == 200
+    body = t.json()
+    assert body["trace_id"] == "trace-tree-1"
+    assert len(body["spans"]) == 1
+
+    root = body["spans"][0]
+    assert root["kind"] == "request"
+    assert root["attrs"]["route"] == "/run"
+    assert root["attrs"]["status_code"] == 200
+
+    graph = root["children"][0]
+    assert graph["kind"] == "graph"
+    nodes = [c["name"] for c in graph["children"]]
+    assert nodes == ["plan", "verify", "plan", "verify", "plan", "verify", "finish"]
+    assert all(c["kind"] == "node" and c["status"] == "ok" for c in graph["children"])
+
+    # children start inside their parent and never outlast it
+    for _, n in _walk(root):
+        for c in n["children"]:
+            assert c["offset_us"] >= n["offset_us"]
+            assert c["duration_us"] <= n["duration_us"]
+
+
+def test_failed_node_marks_span_error() -> None:
+    client.post("/run", json={"input": "fail"}, headers={"X-Trace-Id": "trace-tree-fail"})
+    root = client.get("/debug/traces/trace-tree-fail").json()["spans"][0]
+    graph = root["children"][0]
+    assert graph["status"] == "error"
+    assert graph["children"][0]["name"] == "plan"
+    assert graph["children"][0]["status"] == "error"
+
+
+def test_unknown_trace_is_404() -> None:
+    r = client.get("/debug/traces/does-not-exist")
+    assert r.status_code == 404
+    assert r.json() == {"detail": "trace_not_found"}
+
+
+def test_trace_store_is_bounded() -> None:
+    store = TraceStore(max_traces=2, max_spans=3)
+    import src.middleware.spans as spans
+
+    old, spans.TRACE_STORE = spans.TRACE_STORE, store
+    try:
+        for tid in ("a", "b", "c"):
+            with Span("s", tid, log=False):
+                pass
+        with Span("outer", "c", log=False):
+            for _ in range(5):
+                with Span("inner", log=False):
+                    pass
+    finally:
+        spans.TRACE_STORE = old
+
+    assert store.get("a") is None  # oldest trace evicted
+    assert store.tree("c")["span_count"] == 3
+    assert store.tree("c")["spans_dropped"] == 4  # 7 spans recorded for "c", 3 kept
+
+
+def test_ambient_trace_id_reaches_logs() -> None:
+    record = logging.LogRecord("x", logging.INFO, __file__, 1, "helper_log", None, None)
+    with Span("outer", "trace-ambient", log=False):
+        assert current_trace_id() == "trace-ambient"
+        TraceContextFilter().filter(record)
+    assert record.trace_id == "trace-ambient"
+    assert current_trace_id() is None
+    TRACE_STORE.clear()